@@ -0,0 +1,365 @@
+#! /usr/bin/python3
+"""
+Benchmarks of the PictureManager component. Run them from this folder:
+
+    python3 benchmark.py exif [pictures directory]
+    python3 benchmark.py previews [pictures directory] [preview width]
+    python3 benchmark.py prefetch [pictures directory] [seconds per picture]
+    python3 benchmark.py tiles [pictures directory]
+    python3 benchmark.py prescreen [pictures directory] [number of processes]
+    python3 benchmark.py memory [number of pictures]
+    python3 benchmark.py move [number of pictures] [number of moved pictures]
+    python3 benchmark.py delete [number of pictures] [number of deleted pictures]
+    python3 benchmark.py sort [number of pictures] [number of changed pictures]
+    python3 benchmark.py path [number of pictures]
+    python3 benchmark.py clusters [number of pictures] [number of added pictures]
+
+By default, the pictures of the ImageDataset_SceauxCastle submodule are used.
+"""
+import sys, os, glob, time, gc, math, tracemalloc
+
+# Adding the path of another package (for persistence), as done in __init__.py
+current_folder = os.path.dirname(os.path.abspath(__file__))
+component_folder = os.path.dirname(os.path.dirname(current_folder))
+sys.path.append(os.path.join(os.path.join(component_folder,"Python"), "Persistence"))
+
+SCEAUX_CASTLE = os.path.join(os.path.dirname(os.path.dirname(component_folder)), \
+    "ImageDataset_SceauxCastle", "images")
+
+def listPictures(directory):
+    """
+    List the JPEG files of a directory
+    """
+    files = []
+    for pattern in ["*.jpg", "*.JPG", "*.jpeg", "*.JPEG"]:
+        files.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(set(files))
+
+def timed(function, *args):
+    """
+    Run a function and return its result along with the elapsed time in seconds
+    """
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+def benchmarkExif(directory = SCEAUX_CASTLE):
+    """
+    Compare the in-process EXIF reader with the exiftool subprocess
+    """
+    import exiftool, exifreader
+    from pictureManager import PictureModel
+    files = listPictures(directory)
+    if len(files) == 0:
+        print("No JPEG file found in " + directory)
+        return
+    tags = PictureModel.METADATA_TAGS
+    print("Reading " + str(len(tags)) + " tags from " + str(len(files)) + " files")
+
+    (inProcess, unsupported), inProcessTime = timed(exifreader.get_tags_batch, tags, files)
+
+    def subprocessBatch():
+        with exiftool.ExifTool() as et:
+            return et.get_tags_batch(tags, files)
+
+    def subprocessPerFile():
+        with exiftool.ExifTool() as et:
+            return [ et.get_tags(tags, f) for f in files ]
+
+    batch, batchTime = timed(subprocessBatch)
+    _, perFileTime = timed(subprocessPerFile)
+
+    report = lambda name, elapsed: print("  {:<28} {:8.3f}s  {:8.3f}ms/file  x{:.1f}".format(\
+        name, elapsed, 1000 * elapsed / len(files), perFileTime / max(elapsed, 1e-9)))
+    report("exiftool, one file/request", perFileTime)
+    report("exiftool, one batch request", batchTime)
+    report("in-process reader", inProcessTime)
+
+    # Both readers should agree on every decoded value
+    expected = { d['SourceFile']: d for d in batch }
+    mismatches = [ d['SourceFile'] for d in inProcess \
+        if any(abs(float(d[t]) - float(expected[d['SourceFile']].get(t, 0))) > 1e-6 \
+            for t in ['EXIF:GPSLatitude', 'EXIF:GPSLongitude'] if t in d) ]
+    print("  unsupported files: " + str(len(unsupported)) + ", mismatches: " + str(len(mismatches)))
+
+def syntheticPictures(count, resourcesPath = "/resources"):
+    """
+    Build detached pictures with realistic paths and metadata
+    """
+    from pictureManager import Picture, PictureState
+    return [ Picture(resourcesPath, "/home/user/workspace/scene_1/pictures_set/IMG_%06d.JPG" % i, \
+        43.0 + i * 1e-6, 1.25 + i * 1e-6, 1425204672 + i, PictureState.NEW, altitude = 120.5, \
+        focalLength = 4.2, focalLength35mm = 28.0, make = "Canon", model = "PowerShot", \
+        width = 4000, height = 3000, orientation = 1) for i in range(count) ]
+
+def benchmarkPreviews(directory = SCEAUX_CASTLE, width = 600):
+    """
+    Compare a full decode of the pictures, as the viewer used to do, with the previews
+    of the thumbnail provider: decoded scaled down, then read from disk and from memory
+    """
+    import tempfile, shutil
+    from PyQt5.QtGui import QImage
+    from thumbnailProvider import ThumbnailProvider
+    files = listPictures(directory)
+    if len(files) == 0:
+        print("No JPEG file found in " + directory)
+        return
+    size = (int(width), 0)
+    cacheDirectory = tempfile.mkdtemp()
+    try:
+        _, fullTime = timed(lambda: [ QImage(f) for f in files ])
+        provider = ThumbnailProvider(cacheDirectory)
+        _, decodeTime = timed(lambda: [ provider.preview(f, size) for f in files ])
+        _, memoryTime = timed(lambda: [ provider.preview(f, size) for f in files ])
+        _, diskTime = timed(lambda: [ ThumbnailProvider(cacheDirectory).preview(f, size) \
+            for f in files ])
+    finally:
+        shutil.rmtree(cacheDirectory)
+    print("Showing {} pictures, {} pixels wide".format(len(files), size[0]))
+    for name, elapsed in [("full decode", fullTime), ("scaled decode", decodeTime), \
+        ("disk cache", diskTime), ("memory cache", memoryTime)]:
+        print("  {:<16} {:8.3f}ms/picture".format(name, 1000 * elapsed / len(files)))
+
+def benchmarkPrefetch(directory = SCEAUX_CASTLE, delay = 0.2, width = 600):
+    """
+    Step through the pictures as a user would, waiting some time on each picture, and
+    measure how long the viewer waits for each preview, with and without prefetching
+    """
+    from PyQt5.QtCore import QSize
+    from pictureManager import PictureModel, Picture, PictureState
+    from thumbnailProvider import ThumbnailProvider
+    from prefetcher import Prefetcher
+    files = listPictures(directory)
+    if len(files) == 0:
+        print("No JPEG file found in " + directory)
+        return
+    delay = float(delay)
+    model = PictureModel("/resources")
+    model.addAll([ Picture("/resources", f, 0.0, 0.0, 0, PictureState.NEW) for f in files ])
+    manager = model.instantiateManager()
+    for prefetching in [False, True]:
+        provider = ThumbnailProvider()
+        prefetcher = Prefetcher(provider, manager)
+        size = provider._target(QSize(int(width), 0))
+        waits = []
+        for row in range(manager.rowCount()):
+            path = model._store.get(manager.mapToSource(manager.index(row, 0)).row(), 'path')
+            _, elapsed = timed(provider.preview, path, size)
+            waits.append(elapsed)
+            if prefetching:
+                prefetcher.focusOn(row, size[0], size[1])
+            time.sleep(delay)
+        provider.pool.waitForDone()
+        print("{:<18} {:8.3f}ms/picture waited, {:8.3f}ms at most".format(\
+            "with prefetch" if prefetching else "without prefetch", \
+            1000 * sum(waits) / len(waits), 1000 * max(waits)))
+
+def benchmarkTiles(directory = SCEAUX_CASTLE):
+    """
+    Compare a full decode of the pictures with the tiles of a 1024x768 view of their
+    pyramids: at full resolution and fitting the whole picture, when the pyramid is
+    built, then once persisted. Levels are available as soon as they are cut, and
+    persisted in the background
+    """
+    import tempfile, shutil
+    from PyQt5.QtGui import QImage
+    from tilePyramid import TilePyramid
+    files = listPictures(directory)
+    if len(files) == 0:
+        print("No JPEG file found in " + directory)
+        return
+    cacheDirectory = tempfile.mkdtemp()
+    def view(pyramid, path, level):
+        # The tiles of a 1024x768 view at the center of the picture
+        width, height = pyramid.levelSize(*pyramid.levels(path)[:2], level)
+        size = pyramid.TILE_SIZE
+        x0, y0 = max(0, (width - 1024) // 2) // size, max(0, (height - 768) // 2) // size
+        return [ pyramid.tile(path, level, x, y) \
+            for x in range(x0, x0 + 4) for y in range(y0, y0 + 3) ]
+    def fitLevel(pyramid, path):
+        width, height, levels = pyramid.levels(path)
+        return min(levels - 1, max(0, int(math.floor(math.log2(max(width / 1024.0, \
+            height / 768.0))))))
+    try:
+        _, fullTime = timed(lambda: [ QImage(f) for f in files ])
+        pyramid = TilePyramid(cacheDirectory)
+        _, fitBuildTime = timed(lambda: [ view(pyramid, f, fitLevel(pyramid, f)) for f in files ])
+        _, buildTime = timed(lambda: [ view(pyramid, f, 0) for f in files ])
+        # Pyramids are persisted in the background
+        pyramid.pool.waitForDone()
+        pyramid = TilePyramid(cacheDirectory)
+        _, fitTime = timed(lambda: [ view(pyramid, f, fitLevel(pyramid, f)) for f in files ])
+        _, readTime = timed(lambda: [ view(pyramid, f, 0) for f in files ])
+    finally:
+        shutil.rmtree(cacheDirectory)
+    print("Inspecting {} pictures in a 1024x768 view".format(len(files)))
+    for name, elapsed in [("full decode", fullTime), ("fit, building", fitBuildTime), \
+        ("100%, building", buildTime), ("fit, persisted", fitTime), \
+        ("100%, persisted", readTime)]:
+        print("  {:<16} {:8.3f}ms/picture".format(name, 1000 * elapsed / len(files)))
+
+def benchmarkPrescreen(directory = SCEAUX_CASTLE, workers = None):
+    """
+    Measure the image quality of the pictures in a single process, then in a pool of
+    processes, one per core by default
+    """
+    import prescreen
+    files = listPictures(directory)
+    if len(files) == 0:
+        print("No JPEG file found in " + directory)
+        return
+    workers = int(workers or os.cpu_count() or 1)
+    _, serialTime = timed(lambda: [ prescreen.measure(f) for f in files ])
+    qualities, poolTime = timed(lambda: list(prescreen.measureAll(files, workers)))
+    print("Prescreened {} pictures ({}), {} unreadable".format(len(files), \
+        "NumPy" if prescreen.numpy != None else "pure Python", \
+        sum(1 for _, quality in qualities if quality == None)))
+    for name, elapsed in [("1 process", serialTime), \
+        ("{} processes".format(workers), poolTime)]:
+        print("  {:<16} {:8.3f}s ({:.1f}ms/picture)".format(name, elapsed, \
+            1000 * elapsed / len(files)))
+
+def benchmarkMemory(count = 100000):
+    """
+    Measure the memory held by a picture model
+    """
+    from pictureManager import PictureModel
+    count = int(count)
+    model = PictureModel("/resources")
+    pictures = syntheticPictures(count)
+    gc.collect()
+    tracemalloc.start()
+    model.addAll(pictures)
+    del pictures
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("{} pictures: {:.1f} MB, {:.0f} bytes/picture".format(count, size / 1e6, size / count))
+
+def benchmarkMove(count = 50000, moved = 1000):
+    """
+    Drag a scattered selection of pictures to the middle of the list, as movePictures does
+    """
+    import random
+    from pictureManager import PictureModel
+    count, moved = int(count), int(moved)
+    model = PictureModel("/resources")
+    model.addAll(syntheticPictures(count))
+    manager = model.instantiateManager()
+    rows = random.Random(0).sample(range(count), moved)
+    _, elapsed = timed(manager.moveAll, rows, count // 2)
+    print("Moved {} of {} pictures in {:.3f}s ({:.3f}ms/picture)".format(\
+        moved, count, elapsed, 1000 * elapsed / moved))
+
+def benchmarkDelete(count = 100000, deleted = 10000):
+    """
+    Delete a scattered selection of pictures
+    """
+    import random
+    from pictureManager import PictureModel
+    count, deleted = int(count), int(deleted)
+    model = PictureModel("/resources")
+    model.addAll(syntheticPictures(count))
+    manager = model.instantiateManager()
+    rows = random.Random(0).sample(range(count), deleted)
+    _, elapsed = timed(manager.deleteAll, [ manager.index(row, 0) for row in rows ])
+    print("Deleted {} of {} pictures in {:.3f}s, {} left".format(\
+        deleted, count, elapsed, model.rowCount()))
+
+def benchmarkSort(count = 100000, changed = 1000):
+    """
+    Sort the pictures by each key, then change the status of some of them while they
+    are kept sorted by status
+    """
+    import random
+    from pictureManager import PictureModel, PictureState
+    count, changed = int(count), int(changed)
+    model = PictureModel("/resources")
+    model.addAll(syntheticPictures(count))
+    manager = model.instantiateManager()
+    for key in PictureModel.SORT_KEYS:
+        _, elapsed = timed(manager.sortBy, key)
+        print("Sorted {} pictures by {} in {:.3f}s".format(count, key, elapsed))
+    manager.sortBy("status")
+    rows = random.Random(0).sample(range(count), changed)
+    _, elapsed = timed(model.setStatuses, rows, PictureModel.DISCARD)
+    print("Kept {} pictures sorted after {} status changes in {:.3f}s".format(\
+        count, changed, elapsed))
+    discarded = model.rowsWithStatus([PictureState.DISCARDED])
+    _, elapsed = timed(model.setStatuses, discarded[len(discarded) // 2:][:1], PictureModel.RENEW)
+    print("Kept {} pictures sorted after 1 status change in {:.4f}s".format(count, elapsed))
+
+def benchmarkPath(count = 20000):
+    """
+    Order along the capture path pictures taken during a random walk, added in random
+    order
+    """
+    import random, math
+    from pictureManager import PictureModel
+    count = int(count)
+    generator = random.Random(0)
+    pictures = syntheticPictures(count)
+    latitude, longitude, heading = 43.0, 1.25, 0.0
+    for picture in pictures:
+        heading += generator.gauss(0.0, 0.5)
+        latitude += 5e-5 * math.cos(heading)
+        longitude += 5e-5 * math.sin(heading)
+        picture.latitude, picture.longitude = latitude, longitude
+    generator.shuffle(pictures)
+    model = PictureModel("/resources")
+    model.addAll(pictures)
+    manager = model.instantiateManager()
+    _, elapsed = timed(manager.orderAlongCapturePath)
+    print("Ordered {} pictures along their capture path in {:.3f}s".format(count, elapsed))
+
+def benchmarkClusters(count = 100000, added = 1000):
+    """
+    Cluster pictures spread over a city at several zoom levels, add pictures while the
+    clusters are kept up to date, then pan the map
+    """
+    import random
+    from pictureManager import PictureModel
+    count, added = int(count), int(added)
+    generator = random.Random(0)
+    pictures = syntheticPictures(count + added)
+    for picture in pictures:
+        picture.latitude = generator.gauss(48.85, 0.05)
+        picture.longitude = generator.gauss(2.35, 0.05)
+    model = PictureModel("/resources")
+    model.addAll(pictures[:count])
+    manager = model.instantiateManager()
+    clusters, elapsed = timed(lambda: manager.clusters)
+    print("Clustered {} pictures in {:.3f}s".format(count, elapsed))
+    for level in [10, 14, 18]:
+        _, elapsed = timed(clusters.setZoomLevel, level)
+        print("Zoom level {}: {} clusters in {:.3f}s".format(level, clusters.rowCount(), elapsed))
+    _, elapsed = timed(model.addAll, pictures[count:])
+    print("Added {} pictures to the clusters in {:.3f}s".format(added, elapsed))
+    # A 1024x768 map at zoom level 18, panned by 16 pixels at a time
+    width, height = 1024 * 360.0 / (256 << 18), 768 * 360.0 / (256 << 18)
+    def pan(step):
+        west = 2.35 + step * width / 64 - width / 2
+        clusters.setViewport(18, 48.85 + height / 2, west, 48.85 - height / 2, west + width)
+    _, elapsed = timed(lambda: [ pan(step) for step in range(256) ])
+    print("Panned over {} clusters, {} shown, in {:.3f}s ({:.2f}ms/pan)".format(\
+        len(clusters._cells), clusters.rowCount(), elapsed, elapsed * 1000 / 256))
+
+BENCHMARKS = {
+    "exif": benchmarkExif,
+    "previews": benchmarkPreviews,
+    "prefetch": benchmarkPrefetch,
+    "tiles": benchmarkTiles,
+    "prescreen": benchmarkPrescreen,
+    "memory": benchmarkMemory,
+    "move": benchmarkMove,
+    "delete": benchmarkDelete,
+    "sort": benchmarkSort,
+    "path": benchmarkPath,
+    "clusters": benchmarkClusters,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: python3 benchmark.py {" + "|".join(sorted(BENCHMARKS)) + "} [args]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,317 @@
+import math, time
+
+# Mean radius of the Earth, in meters
+EARTH_RADIUS = 6371000.0
+
+class PointGrid(object):
+    """
+    A uniform grid over planar points, each cell holding the indexes of the points it
+    contains. Used to find the nearest points of a point without comparing it to every
+    other one, when ordering pictures along their path and when prefetching previews.
+
+    Attributes:
+        size  (float): The width of a cell
+        cells (dict<(int, int), list<int>>): The points of each non empty cell
+    """
+    # Mean number of points per non empty cell above which cells are shrunk
+    MAX_OCCUPANCY = 3
+    MAX_RESIZES = 4
+    MIN_SIZE = 1e-3
+    def __init__(self, xs, ys):
+        self.xs, self.ys = xs, ys
+        self.left, self.bottom = min(xs), min(ys)
+        width, height = max(xs) - self.left, max(ys) - self.bottom
+        # About two points per cell when they are evenly spread, along a line when they
+        # are collinear. Pictures gather along the path, so cells are shrunk until non
+        # empty cells hold few points
+        area = max(width * height, max(width, height) ** 2 / len(xs))
+        self.size = max(math.sqrt(2.0 * area / len(xs)), self.MIN_SIZE)
+        for attempt in range(self.MAX_RESIZES + 1):
+            self.cells = dict()
+            for p in range(len(xs)):
+                self.cells.setdefault(self.cell(p), []).append(p)
+            occupancy = len(xs) / len(self.cells)
+            if occupancy <= self.MAX_OCCUPANCY or self.size <= self.MIN_SIZE or \
+                attempt == self.MAX_RESIZES:
+                break
+            # The cells are rebuilt with the new size
+            self.size = max(self.size / math.sqrt(occupancy / 2.0), self.MIN_SIZE)
+        self.width = int(width / self.size) + 1
+        self.height = int(height / self.size) + 1
+        self._rings = [[(0, 0)]]
+
+    def cell(self, p):
+        return (int((self.xs[p] - self.left) / self.size), \
+            int((self.ys[p] - self.bottom) / self.size))
+
+    def remove(self, p):
+        cell = self.cell(p)
+        points = self.cells[cell]
+        points.remove(p)
+        if len(points) == 0:
+            del self.cells[cell]
+
+    def ring(self, cell, radius):
+        """
+        Returns:
+            list<list<int>>: The non empty cells at a given distance (in cells) of a cell
+        """
+        while len(self._rings) <= radius:
+            r = len(self._rings)
+            offsets = [ (dx, dy) for dx in range(-r, r + 1) for dy in (-r, r) ]
+            offsets.extend((dx, dy) for dx in (-r, r) for dy in range(-r + 1, r))
+            self._rings.append(offsets)
+        cx, cy = cell; cells = self.cells
+        return [ cells[c] for c in ((cx + dx, cy + dy) for dx, dy in self._rings[radius]) \
+            if c in cells ]
+
+    def maxRadius(self, cell):
+        """
+        Returns:
+            int: The ring radius beyond which there is no cell of the grid
+        """
+        return max(cell[0], self.width - cell[0], cell[1], self.height - cell[1])
+
+    def around(self, cell):
+        """
+        Iterate over the non empty cells around a cell, ring after ring. Once the rings
+        searched hold more cells than the grid has non empty cells, the remaining non
+        empty cells are returned at once rather than walking empty rings.
+
+        Yields:
+            (float, list<list<int>>): The distance from a point of the cell within\
+                    which every point has been yielded, and the non empty cells of the\
+                    next ring
+        """
+        cx, cy = cell
+        maxRadius = self.maxRadius(cell)
+        for radius in range(maxRadius + 1):
+            if radius > 0 and 4 * radius * (radius + 1) > len(self.cells):
+                yield math.inf, [ points for (x, y), points in self.cells.items() \
+                    if max(abs(x - cx), abs(y - cy)) >= radius ]
+                return
+            yield radius * self.size if radius < maxRadius else math.inf, \
+                self.ring(cell, radius)
+
+    def nearest(self, p, count, maxDistance = math.inf, accept = None):
+        """
+        Find the points closest to a point of the grid
+
+        Args:
+            p           (int): The index of the point
+            count       (int): The number of points to find
+            maxDistance (float): The distance beyond which points are left out
+            accept      (function<int, bool>): Whether a point may be returned, all\
+                    points if None
+
+        Returns:
+            list<int>: Up to count closest points, nearest first, p left out
+        """
+        x, y = self.xs[p], self.ys[p]
+        hypot = math.hypot
+        found = []
+        for reach, cells in self.around(self.cell(p)):
+            for points in cells:
+                for q in points:
+                    if q != p and (accept == None or accept(q)):
+                        distance = hypot(self.xs[q] - x, self.ys[q] - y)
+                        if distance <= maxDistance:
+                            found.append((distance, q))
+            found.sort()
+            # Points of the next rings are farther than the reach
+            if reach >= maxDistance or (len(found) >= count and found[count - 1][0] <= reach):
+                break
+        return [ q for _, q in found[:count] ]
+
+def project(latitudes, longitudes):
+    """
+    Project coordinates on a plane, in meters, with an equirectangular projection
+    around their mean latitude
+
+    Returns:
+        (list<float>, list<float>): The abscissa and the ordinate of each point
+    """
+    meanLatitude = sum(latitudes) / len(latitudes)
+    scale = EARTH_RADIUS * math.pi / 180.0
+    xScale = scale * math.cos(math.radians(meanLatitude))
+    return [ longitude * xScale for longitude in longitudes ], \
+        [ latitude * scale for latitude in latitudes ]
+
+def _neighbours(xs, ys, grid, count):
+    """
+    Find the nearest points of each point, among the points of the surrounding cells
+
+    Returns:
+        (list<list<int>>, list<float>): Up to count close points of each point, nearest\
+                first, and the squared distance within which they are the nearest points
+    """
+    neighbours = []; reaches = []
+    hypot = math.hypot
+    for p in range(len(xs)):
+        x, y = xs[p], ys[p]
+        candidates = []
+        for radius, (reach, cells) in enumerate(grid.around(grid.cell(p))):
+            for points in cells:
+                candidates.extend(points)
+            if radius >= 1 and len(candidates) > count:
+                break
+        candidates.remove(p)
+        distances = [ hypot(xs[q] - x, ys[q] - y) for q in candidates ]
+        nearest = sorted(range(len(candidates)), key=distances.__getitem__)[:count]
+        neighbours.append([ candidates[i] for i in nearest ])
+        # Every point closer than the rings searched is a candidate
+        if len(nearest) == count:
+            reach = min(reach, distances[nearest[-1]])
+        reach = reach * reach
+        reaches.append(reach)
+    return neighbours, reaches
+
+def _greedyTour(xs, ys, dates, grid, first, neighbours, reaches):
+    """
+    Build a path visiting every point, going each time to the nearest point not
+    visited yet. Among points at the same distance, the closest in time is taken.
+    The nearest points of each point are looked for in its neighbours first, then in
+    the grid, from which visited points are removed.
+    """
+    tour = [first]
+    visited = [False] * len(xs)
+    visited[first] = True
+    grid.remove(first)
+    current = first
+    for _ in range(len(xs) - 1):
+        x, y, date = xs[current], ys[current], dates[current]
+        best = -1; bestDistance = math.inf; bestDelay = math.inf
+        for p in neighbours[current]:
+            if visited[p]:
+                continue
+            dx = xs[p] - x; dy = ys[p] - y
+            distance = dx * dx + dy * dy
+            if distance > bestDistance:
+                break
+            if distance < bestDistance or abs(dates[p] - date) < bestDelay:
+                best, bestDistance, bestDelay = p, distance, abs(dates[p] - date)
+        if best < 0 or bestDistance >= reaches[current]:
+            # Not among the neighbours, or the neighbours may be missing a closer point
+            for reach, cells in grid.around(grid.cell(current)):
+                for points in cells:
+                    for p in points:
+                        dx = xs[p] - x; dy = ys[p] - y
+                        distance = dx * dx + dy * dy
+                        if distance < bestDistance or (distance == bestDistance and \
+                            abs(dates[p] - date) < bestDelay):
+                            best, bestDistance, bestDelay = p, distance, abs(dates[p] - date)
+                # Points of the next rings are farther than the reach
+                if best >= 0 and bestDistance <= reach * reach:
+                    break
+        grid.remove(best)
+        visited[best] = True
+        tour.append(best)
+        current = best
+    return tour
+
+def _twoOpt(tour, xs, ys, neighbours, deadline):
+    """
+    Shorten a path by reversing segments, as long as reconnecting two of its edges
+    differently makes it shorter. Only edges towards the close points of a point are
+    tried, and points whose edges did not change are not tried again. Stops at the
+    deadline.
+
+    Returns:
+        int: The number of reversed segments
+    """
+    position = [0] * len(tour)
+    for i, p in enumerate(tour):
+        position[p] = i
+    last = len(tour) - 1
+    hypot = math.hypot
+    queue = list(tour); queued = [True] * len(tour)
+    moves = 0; tries = 0
+    while len(queue) > 0:
+        tries += 1
+        if tries % 256 == 0 and time.time() > deadline:
+            break
+        a = queue.pop(); queued[a] = False
+        i = position[a]
+        xa, ya = xs[a], ys[a]
+        # Replace the edge after a (direction 1) or before a (direction -1)
+        for direction in (1, -1):
+            if not 0 <= i + direction <= last:
+                continue
+            b = tour[i + direction]
+            ab = hypot(xa - xs[b], ya - ys[b])
+            moved = False
+            for c in neighbours[a]:
+                ac = hypot(xa - xs[c], ya - ys[c])
+                if ac >= ab:
+                    break
+                j = position[c]
+                if not 0 <= j + direction <= last:
+                    continue
+                d = tour[j + direction]
+                if d == a or c == b:
+                    continue
+                if ac + hypot(xs[b] - xs[d], ys[b] - ys[d]) - ab - \
+                    hypot(xs[c] - xs[d], ys[c] - ys[d]) >= -1e-9:
+                    continue
+                # Reconnect a to c and b to d, reversing the path between them
+                if direction == 1:
+                    first, end = (i + 1, j) if i < j else (j + 1, i)
+                else:
+                    first, end = (j, i - 1) if j < i else (i, j - 1)
+                tour[first:end + 1] = tour[end:first - 1 if first > 0 else None:-1]
+                for k in range(first, end + 1):
+                    position[tour[k]] = k
+                for p in (a, b, c, d):
+                    if not queued[p]:
+                        queue.append(p); queued[p] = True
+                moves += 1
+                moved = True
+                break
+            if moved:
+                break
+    return moves
+
+def capturePathOrder(latitudes, longitudes, dates, timeLimit = 0.8, neighbourCount = 6):
+    """
+    Order pictures along the path of the photographer: a nearest neighbour tour over
+    their coordinates, starting from the earliest picture and shortened with 2-opt
+    moves. Close points are found through a uniform grid. Pictures taken at the same
+    place follow each other in capture order, and capture times break the ties between
+    places at the same distance.
+
+    Pictures without coordinates follow the others, ordered by capture time. If no
+    picture has coordinates, all pictures are ordered by capture time. Pictures with
+    unknown dates (0) come last among pictures without coordinates.
+
+    Args:
+        latitudes      (sequence<float>): The latitude of each picture, 0.0 if unknown
+        longitudes     (sequence<float>): The longitude of each picture, 0.0 if unknown
+        dates          (sequence<int>): The capture time of each picture, 0 if unknown
+        timeLimit      (float): Seconds after which 2-opt refinement stops, counted\
+                from the call
+        neighbourCount (int): Number of close points tried by 2-opt moves
+
+    Returns:
+        list<int>: The current index of each picture, in the new order
+    """
+    start = time.time()
+    byTime = lambda p: (dates[p] == 0, dates[p], p)
+    # Pictures taken at the same place are visited at once, in capture order
+    places = dict()
+    for p in range(len(latitudes)):
+        if latitudes[p] != 0.0 or longitudes[p] != 0.0:
+            places.setdefault((latitudes[p], longitudes[p]), []).append(p)
+    unlocated = sorted(set(range(len(latitudes))).difference(*places.values()), key=byTime)
+    groups = [ sorted(pictures, key=byTime) for pictures in places.values() ]
+    if len(groups) < 2:
+        return [ p for group in groups for p in group ] + unlocated
+    xs, ys = project([ latitudes[group[0]] for group in groups ], \
+        [ longitudes[group[0]] for group in groups ])
+    # A place is as old as its first picture, unknown dates being the latest
+    placeDates = [ dates[group[0]] or math.inf for group in groups ]
+    grid = PointGrid(xs, ys)
+    neighbours, reaches = _neighbours(xs, ys, grid, neighbourCount)
+    first = min(range(len(groups)), key=placeDates.__getitem__)
+    tour = _greedyTour(xs, ys, placeDates, grid, first, neighbours, reaches)
+    _twoOpt(tour, xs, ys, neighbours, start + timeLimit)
+    return [ p for place in tour for p in groups[place] ] + unlocated
@@ -0,0 +1,345 @@
+"""
+An in-process reader of the EXIF metadata embedded in JPEG files.
+
+Only the APP1 segment holding the EXIF data is memory-mapped, and the IFD0, EXIF
+and GPS directories are decoded directly, which is way cheaper than a round trip
+to an ``exiftool`` process when only a few tags are needed. The image dimensions
+are read from the frame header which follows the metadata segments.
+
+The JPEG thumbnail embedded in the IFD1 directory can be extracted as well, see
+:py:func:`read_thumbnail`.
+
+Tags are named and valued as ``exiftool -G -n -j`` would report them, so that
+results of both readers can be used interchangeably. Files which are not JPEG
+(or whose EXIF data can not be decoded) raise :py:class:`UnsupportedFormat`, and
+should be handed to :py:class:`exiftool.ExifTool` instead.
+
+Example usage::
+
+    import exifreader
+
+    tags = ["EXIF:GPSLatitude", "EXIF:GPSLongitude"]
+    metadata, unsupported = exifreader.get_tags_batch(tags, files)
+"""
+
+import mmap
+import struct
+
+# JPEG markers
+_SOI = 0xD8
+_SOS = 0xDA
+_EOI = 0xD9
+_APP1 = 0xE1
+# Start of frame markers, holding the image dimensions (0xC4, 0xC8 and 0xCC are not)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - set([0xC4, 0xC8, 0xCC])
+# Markers which are not followed by a segment length
+_STANDALONE_MARKERS = set([0x01] + list(range(0xD0, 0xD8)))
+_EXIF_HEADER = b"Exif\x00\x00"
+
+# Pointers to sub directories in IFD0
+_EXIF_IFD_POINTER = 0x8769
+_GPS_IFD_POINTER = 0x8825
+# Offset and length of the JPEG thumbnail, in IFD1
+_THUMBNAIL_OFFSET = 0x0201
+_THUMBNAIL_LENGTH = 0x0202
+_ORIENTATION = 0x0112
+
+# Size in bytes of each TIFF field type
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+# struct format of each TIFF numeric field type
+_TYPE_FORMATS = {1: "B", 3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 11: "f", 12: "d"}
+
+# Decoded tags, per directory, and the exiftool name they are reported with
+IFD0_TAGS = {
+    0x010F: "EXIF:Make",
+    0x0110: "EXIF:Model",
+    0x0112: "EXIF:Orientation",
+}
+EXIF_TAGS = {
+    0x9003: "EXIF:DateTimeOriginal",
+    0x920A: "EXIF:FocalLength",
+    0xA002: "EXIF:ExifImageWidth",
+    0xA003: "EXIF:ExifImageHeight",
+    0xA405: "EXIF:FocalLengthIn35mmFormat",
+}
+GPS_TAGS = {
+    0x0001: "EXIF:GPSLatitudeRef",
+    0x0002: "EXIF:GPSLatitude",
+    0x0003: "EXIF:GPSLongitudeRef",
+    0x0004: "EXIF:GPSLongitude",
+    0x0005: "EXIF:GPSAltitudeRef",
+    0x0006: "EXIF:GPSAltitude",
+}
+
+class UnsupportedFormat(Exception):
+    """
+    Raised when a file can not be decoded by this reader
+    """
+    pass
+
+def _scan_markers(f):
+    """
+    Walk through the JPEG markers until the image data, looking for the EXIF APP1
+    segment and the frame header. Only segment headers are read, payloads are skipped.
+
+    Args:
+        f (file): The JPEG file, opened in binary mode
+
+    Returns:
+        ((int, int), (int, int)): The offset and the length of the EXIF segment payload,\
+            and the width and height of the image. Each of them is None if missing.
+    """
+    if f.read(2) != b"\xff" + bytes([_SOI]):
+        raise UnsupportedFormat("Not a JPEG file")
+    segment = size = None
+    while segment is None or size is None:
+        header = f.read(2)
+        if len(header) < 2 or header[0] != 0xFF:
+            raise UnsupportedFormat("Corrupted JPEG marker")
+        marker = header[1]
+        if marker == 0xFF:
+            # Fill bytes, the marker follows
+            f.seek(-1, 1)
+            continue
+        if marker in _STANDALONE_MARKERS:
+            continue
+        if marker in (_SOS, _EOI):
+            # Image data starts, metadata segments are all behind us
+            break
+        length = f.read(2)
+        if len(length) < 2:
+            raise UnsupportedFormat("Truncated JPEG segment")
+        length = struct.unpack(">H", length)[0] - 2
+        offset = f.tell()
+        if marker == _APP1 and segment is None and length >= len(_EXIF_HEADER):
+            if f.read(len(_EXIF_HEADER)) == _EXIF_HEADER:
+                segment = (offset + len(_EXIF_HEADER), length - len(_EXIF_HEADER))
+        elif marker in _SOF_MARKERS and length >= 5:
+            frame = f.read(5)
+            if len(frame) < 5:
+                raise UnsupportedFormat("Truncated SOF segment")
+            height, width = struct.unpack(">xHH", frame)
+            size = (width, height)
+        f.seek(offset + length)
+    return segment, size
+
+class _TiffReader(object):
+    """
+    Decode IFD entries from a TIFF structure (the payload of the EXIF segment)
+    """
+    def __init__(self, data):
+        self.data = data
+        byteOrder = bytes(data[0:2])
+        if byteOrder == b"II":
+            self.endian = "<"
+        elif byteOrder == b"MM":
+            self.endian = ">"
+        else:
+            raise UnsupportedFormat("Invalid TIFF byte order")
+        if self._unpack("H", 2)[0] != 42:
+            raise UnsupportedFormat("Invalid TIFF header")
+        self.ifd0 = self._unpack("I", 4)[0]
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def entries(self, offset):
+        """
+        Iterate over the entries of the directory starting at offset
+
+        Yields:
+            (int, int, int, int): The tag, its type, its count and the offset of its value
+        """
+        count = self._unpack("H", offset)[0]
+        for i in range(count):
+            entry = offset + 2 + 12 * i
+            tag, kind, n = self._unpack("HHI", entry)
+            size = _TYPE_SIZES.get(kind, 1) * n
+            valueOffset = entry + 8
+            if size > 4:
+                valueOffset = self._unpack("I", entry + 8)[0]
+            if valueOffset + size > len(self.data):
+                continue
+            yield tag, kind, n, valueOffset
+
+    def value(self, kind, count, offset):
+        """
+        Decode the value of an entry, as exiftool does with its -n option
+
+        Returns:
+            The decoded value : a str for ASCII entries, a number if count is 1, a tuple
+            of numbers otherwise
+        """
+        if kind == 2:
+            raw = bytes(self.data[offset:offset + count])
+            return raw.split(b"\x00", 1)[0].decode("utf-8", "replace").strip()
+        if kind in (5, 10):
+            fmt = kind == 5 and "I" or "i"
+            values = self._unpack(fmt * (2 * count), offset)
+            values = tuple(values[i] / values[i + 1] if values[i + 1] else 0.0 \
+                for i in range(0, len(values), 2))
+        elif kind in _TYPE_FORMATS:
+            values = self._unpack(_TYPE_FORMATS[kind] * count, offset)
+        else:
+            return bytes(self.data[offset:offset + count])
+        if count == 1:
+            return values[0]
+        return values
+
+    def next_directory(self, offset):
+        """
+        Returns:
+            int: The offset of the directory following the one at offset, 0 if none
+        """
+        count = self._unpack("H", offset)[0]
+        return self._unpack("I", offset + 2 + 12 * count)[0]
+
+    def read_directory(self, offset, tags, result):
+        """
+        Decode the tags of interest of a directory into result
+
+        Returns:
+            dict<int, (int, int, int)>: The type, count and value offset of every entry\
+                of the directory
+        """
+        offsets = dict()
+        for tag, kind, count, valueOffset in self.entries(offset):
+            offsets[tag] = (kind, count, valueOffset)
+            if tag in tags:
+                result[tags[tag]] = self.value(kind, count, valueOffset)
+        return offsets
+
+def _gps_coordinate(value):
+    """
+    Convert a (degrees, minutes, seconds) GPS coordinate to decimal degrees
+    """
+    if not isinstance(value, tuple):
+        return float(value)
+    coordinate = 0.0
+    for factor, part in zip((1.0, 60.0, 3600.0), value):
+        coordinate += part / factor
+    return coordinate
+
+def read_exif(filename):
+    """
+    Read all the tags supported by this reader from a JPEG file.
+
+    Args:
+        filename (str): The path to the JPEG file
+
+    Returns:
+        dict<str, ?>: The found tags, in exiftool format. The dictionary contains the
+            name of the file in the key ``"SourceFile"``.
+
+    Raises:
+        UnsupportedFormat: If the file is not a JPEG file or its EXIF data are corrupted
+        OSError: If the file can not be read
+    """
+    result = {"SourceFile": filename}
+    with open(filename, "rb") as f:
+        segment, size = _scan_markers(f)
+        if size is not None:
+            result["File:ImageWidth"], result["File:ImageHeight"] = size
+        if segment is None:
+            return result
+        offset, length = segment
+        # Only map the EXIF segment; mmap offsets must be aligned on the granularity
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        mapped = mmap.mmap(f.fileno(), offset + length - start, \
+            offset=start, access=mmap.ACCESS_READ)
+    try:
+        data = memoryview(mapped)[offset - start:]
+        try:
+            tiff = _TiffReader(data)
+            ifd0 = tiff.read_directory(tiff.ifd0, IFD0_TAGS, result)
+            for pointer, tags in ((_EXIF_IFD_POINTER, EXIF_TAGS), (_GPS_IFD_POINTER, GPS_TAGS)):
+                if pointer in ifd0:
+                    kind, count, valueOffset = ifd0[pointer]
+                    tiff.read_directory(tiff.value(kind, count, valueOffset), tags, result)
+        except (struct.error, TypeError):
+            raise UnsupportedFormat("Corrupted EXIF data")
+        finally:
+            data.release()
+    finally:
+        mapped.close()
+    for tag in ("EXIF:GPSLatitude", "EXIF:GPSLongitude"):
+        if tag in result:
+            result[tag] = _gps_coordinate(result[tag])
+    return result
+
+def read_thumbnail(filename):
+    """
+    Extract the JPEG thumbnail embedded in the EXIF data of a JPEG file, without
+    decoding it.
+
+    Args:
+        filename (str): The path to the JPEG file
+
+    Returns:
+        (bytes, int): The JPEG data of the thumbnail, None if there is none, and the\
+            EXIF orientation of the picture (which applies to the thumbnail), None if\
+            unknown
+
+    Raises:
+        UnsupportedFormat: If the file is not a JPEG file or its EXIF data are corrupted
+        OSError: If the file can not be read
+    """
+    with open(filename, "rb") as f:
+        segment, _ = _scan_markers(f)
+        if segment is None:
+            return None, None
+        offset, length = segment
+        f.seek(offset)
+        data = f.read(length)
+    try:
+        tiff = _TiffReader(data)
+        result = dict()
+        tiff.read_directory(tiff.ifd0, {_ORIENTATION: "Orientation"}, result)
+        ifd1 = tiff.next_directory(tiff.ifd0)
+        if ifd1 == 0 or ifd1 >= len(data):
+            return None, result.get("Orientation")
+        tiff.read_directory(ifd1, {_THUMBNAIL_OFFSET: "Offset", \
+            _THUMBNAIL_LENGTH: "Length"}, result)
+    except (struct.error, TypeError):
+        raise UnsupportedFormat("Corrupted EXIF data")
+    start, size = result.get("Offset"), result.get("Length")
+    if not isinstance(start, int) or not isinstance(size, int) or size == 0 or \
+        start + size > len(data):
+        return None, result.get("Orientation")
+    return data[start:start + size], result.get("Orientation")
+
+def get_tags(tags, filename):
+    """
+    Return only specified tags for a single file, in the same format as
+    :py:meth:`exiftool.ExifTool.get_tags`.
+
+    Raises:
+        UnsupportedFormat: If the file can not be decoded by this reader
+    """
+    exif = read_exif(filename)
+    result = {"SourceFile": filename}
+    for tag in tags:
+        if tag in exif:
+            result[tag] = exif[tag]
+    return result
+
+def get_tags_batch(tags, filenames):
+    """
+    Return only specified tags for the given files.
+
+    Args:
+        tags      (list<str>): The tags to retrieve, in the format <group>:<tag>
+        filenames (list<str>): The files to read
+
+    Returns:
+        (list<dict>, list<str>): The tags of each decoded file, in the same format as\
+            :py:meth:`exiftool.ExifTool.get_tags_batch`, and the files which could not\
+            be decoded and should be handed to exiftool.
+    """
+    result = []; unsupported = []
+    for filename in filenames:
+        try:
+            result.append(get_tags(tags, filename))
+        except (UnsupportedFormat, OSError, ValueError, struct.error):
+            unsupported.append(filename)
+    return result, unsupported
@@ -59,8 +59,10 @@ import sys
 import subprocess
 import os
 import json
+import csv
 import warnings
 import codecs
+import collections
 
 try:        # Py3k compatibility
     basestring
@@ -75,13 +77,18 @@ If the executable is not located in one of the paths listed in the
 """
 
 # Sentinel indicating the end of the output of a sequence of commands.
-# The standard value should be fine.
-sentinel = b"{ready}"
+# Every request is sent with ``-execute<id>``, so the sentinel is followed
+# by the request id and a closing brace, e.g. ``{ready12}``.
+sentinel = b"{ready"
 
 # The block size when reading from exiftool.  The standard value
 # should be fine, though other values might give better performance in
 # some cases.
-block_size = 4096
+block_size = 65536
+
+# The maximum number of requests sent to exiftool before reading their
+# output when pipelining.  Keeping it low avoids filling both pipes.
+max_pending = 4
 
 # This code has been adapted from Lib/os.py in the Python source tree
 # (sha1 265e36e277f3)
@@ -173,6 +180,17 @@ class ExifTool(object):
                 stdin=subprocess.PIPE, stdout=subprocess.PIPE,
                 stderr=devnull)
         self.running = True
+        # Output read from exiftool and not yet returned
+        self._buffer = bytearray()
+        # Number of bytes of the buffer already searched for the next sentinel
+        self._searched = 0
+        # Ids of the submitted requests whose output has not been read, in order
+        self._pending = collections.deque()
+        # Output of requests read while waiting for a later one
+        self._results = dict()
+        # Ids of the pending requests whose output is dropped once read
+        self._discarded = set()
+        self._next_id = 1
 
     def terminate(self):
         """Terminate the ``exiftool`` process of this instance.
@@ -197,6 +215,121 @@ class ExifTool(object):
     def __del__(self):
         self.terminate()
 
+    def submit(self, *params):
+        """Send the given batch of parameters to ``exiftool`` without
+        waiting for its output.
+
+        The batch is tagged with a request id, which must be given to
+        :py:meth:`collect()` to retrieve the output.  Several batches
+        can be submitted before collecting them, so that ``exiftool``
+        always has work to do while the output of the previous ones is
+        parsed.  The parameters are the same as :py:meth:`execute()`.
+
+        Returns:
+            int: The request id
+        """
+        if not self.running:
+            raise ValueError("ExifTool instance not running.")
+        request_id = self._next_id
+        self._next_id += 1
+        execute = b"-execute" + str(request_id).encode("ascii") + b"\n"
+        self._process.stdin.write(b"\n".join(params + (execute,)))
+        self._process.stdin.flush()
+        self._pending.append(request_id)
+        return request_id
+
+    def _find_sentinel(self, marker):
+        """Find the sentinel of a request at the beginning of a line of
+        the buffer, searching only the bytes not searched yet.
+        """
+        start = max(0, self._searched - len(marker))
+        while True:
+            position = self._buffer.find(marker, start)
+            if position < 0 or position == 0 or self._buffer[position - 1] == 10:
+                break
+            start = position + 1
+        if position < 0:
+            self._searched = len(self._buffer)
+        return position
+
+    def collect(self, request_id):
+        """Read the output of a request submitted with :py:meth:`submit()`.
+
+        The output of the requests submitted before this one is read
+        and kept aside for their own call to :py:meth:`collect()`.  The
+        output is accumulated in a growable buffer and only the newly
+        read bytes are searched for the sentinel, so that reading is
+        linear in the output size.
+
+        Returns:
+            bytes: The raw output of the request, excluding the sentinel
+        """
+        if request_id in self._results:
+            return self._results.pop(request_id)
+        if not request_id in self._pending:
+            raise ValueError("Unknown ExifTool request " + str(request_id) + ".")
+        fd = self._process.stdout.fileno()
+        while True:
+            expected = self._pending[0]
+            marker = sentinel + str(expected).encode("ascii") + b"}"
+            position = self._find_sentinel(marker)
+            if position < 0:
+                data = os.read(fd, block_size)
+                if not data:
+                    # The output is closed once the process exits
+                    self._process.wait()
+                    self.running = False
+                    raise ValueError("ExifTool process terminated unexpectedly.")
+                self._buffer += data
+                continue
+            output = bytes(memoryview(self._buffer)[:position]).strip()
+            del self._buffer[:position + len(marker)]
+            self._searched = 0
+            self._pending.popleft()
+            if expected == request_id:
+                return output
+            if expected in self._discarded:
+                self._discarded.remove(expected)
+            else:
+                self._results[expected] = output
+
+    def discard(self, request_ids):
+        """Forget requests submitted with :py:meth:`submit()` whose
+        output will not be collected, e.g. after an error.  Outputs
+        already read are dropped, the others are dropped once read.
+        """
+        for request_id in request_ids:
+            if self._results.pop(request_id, None) is None and \
+                    request_id in self._pending:
+                self._discarded.add(request_id)
+
+    def pipeline(self, batches):
+        """Execute several batches of parameters, keeping up to
+        ``max_pending`` of them in flight.
+
+        Args:
+            batches (iterable): The batches, each one a tuple of parameters
+                as given to :py:meth:`execute()`
+
+        Yields:
+            bytes: The raw output of each batch, in order
+        """
+        in_flight = collections.deque()
+        try:
+            for params in batches:
+                in_flight.append(self.submit(*params))
+                if len(in_flight) >= max_pending:
+                    output = self.collect(in_flight[0])
+                    in_flight.popleft()
+                    yield output
+            while in_flight:
+                output = self.collect(in_flight[0])
+                in_flight.popleft()
+                yield output
+        finally:
+            # Batches left in flight by an error are never collected
+            self.discard(in_flight)
+
     def execute(self, *params):
         """Execute the given batch of parameters with ``exiftool``.
 
@@ -216,15 +349,7 @@ class ExifTool(object):
         .. note:: This is considered a low-level method, and should
            rarely be needed by application developers.
         """
-        if not self.running:
-            raise ValueError("ExifTool instance not running.")
-        self._process.stdin.write(b"\n".join(params + (b"-execute\n",)))
-        self._process.stdin.flush()
-        output = b""
-        fd = self._process.stdout.fileno()
-        while not output[-32:].strip().endswith(sentinel):
-            output += os.read(fd, block_size)
-        return output.strip()[:-len(sentinel)]
+        return self.collect(self.submit(*params))
 
     def execute_json(self, *params):
         """Execute the given batch of parameters and parse the JSON output.
@@ -251,6 +376,67 @@ class ExifTool(object):
         params = map(fsencode, params)
         return json.loads(self.execute(b"-j", *params).decode("utf-8"))
 
+    @staticmethod
+    def parse_csv(output):
+        """Parse the CSV output of ``exiftool -csv``.
+
+        The return value has the same format as :py:meth:`execute_json()`,
+        except that tags missing from a file are left out instead of
+        being empty, and that values are converted to numbers whenever
+        they look like numbers.
+        """
+        result = []
+        for row in csv.DictReader(output.decode("utf-8").splitlines()):
+            entry = dict()
+            for tag, value in row.items():
+                if value == "":
+                    continue
+                if tag != "SourceFile":
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        try:
+                            value = float(value)
+                        except ValueError:
+                            pass
+                entry[tag] = value
+            result.append(entry)
+        return result
+
+    def execute_csv(self, *params):
+        """Execute the given batch of parameters and parse the CSV output.
+
+        This is a lighter alternative to :py:meth:`execute_json()` for
+        tag-only queries: the output is more compact and is parsed by
+        the ``csv`` module.  See :py:meth:`parse_csv()` for the format
+        of the return value.
+        """
+        params = map(fsencode, params)
+        return self.parse_csv(self.execute(b"-csv", *params))
+
+    def get_tags_batches(self, tags, batches):
+        """Return only specified tags for several batches of files.
+
+        The batches are pipelined to ``exiftool`` (see
+        :py:meth:`pipeline()`) and requested in the CSV output mode, so
+        that the output of a batch is parsed while ``exiftool`` reads
+        the next one.
+
+        The first argument is an iterable of tags, the second one an
+        iterable of lists of file names.  The return value is a single
+        list with the format described in :py:meth:`parse_csv()`.
+        """
+        if isinstance(tags, basestring):
+            raise TypeError("The argument 'tags' must be "
+                            "an iterable of strings")
+        params = [fsencode("-" + t) for t in tags]
+        requests = ([b"-csv"] + params + [fsencode(f) for f in filenames]
+                    for filenames in batches)
+        result = []
+        for output in self.pipeline(tuple(r) for r in requests):
+            result.extend(self.parse_csv(output))
+        return result
+
     def get_metadata_batch(self, filenames):
         """Return all meta-data for the given files.
 
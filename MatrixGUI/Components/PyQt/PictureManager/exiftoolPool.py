@@ -0,0 +1,230 @@
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor
+import exiftool
+
+class ExifToolError(Exception):
+    """
+    Raised when an exiftool process can not be started, or died again once restarted
+    """
+    pass
+
+class _Worker(object):
+    """
+    A long-lived exiftool process, restarted whenever it died or has been stopped
+    after being idle for too long.
+    """
+    def __init__(self, executable = None):
+        self.executable = executable
+        self.lock = threading.Lock()
+        self.lastUse = time.time()
+        self._exifparser = None
+
+    def _ensureRunning(self):
+        """
+        Start the exiftool process if it is not running (anymore)
+        """
+        if self._isRunning():
+            return
+        self.stop()
+        self._exifparser = exiftool.ExifTool(self.executable)
+        self._exifparser.start()
+
+    def _isRunning(self):
+        return self._exifparser != None and self._exifparser.running and \
+            self._exifparser._process.poll() == None
+
+    def stop(self):
+        """
+        Terminate the exiftool process, if any
+        """
+        if self._exifparser == None:
+            return
+        try:
+            self._exifparser.terminate()
+        except (OSError, ValueError):
+            # The process already died, nothing to clean
+            self._exifparser.running = False
+        self._exifparser = None
+
+    def call(self, method, *args):
+        """
+        Call a method of the underlying ExifTool instance. If the process could not be
+        started or died during the call, it is restarted and the call is made once more.
+
+        Raises:
+            ExifToolError: If the process could not be started or died again
+        """
+        with self.lock:
+            self.lastUse = time.time()
+            for attempt in range(2):
+                try:
+                    self._ensureRunning()
+                    return getattr(self._exifparser, method)(*args)
+                except (OSError, ValueError) as e:
+                    if self._isRunning():
+                        # The process is fine, the request itself failed
+                        raise
+                    if attempt > 0:
+                        raise ExifToolError("exiftool process failed twice: " + str(e))
+                    print("exiftool process failed (" + str(e) + "), restarting it")
+                finally:
+                    self.lastUse = time.time()
+
+class ExifToolPool(object):
+    """
+    A pool of long-lived exiftool processes, shared across the application.
+
+    Workers are started on demand and stay alive between requests, so that the
+    process startup is only paid once per session. A worker idle for more than
+    idleTimeout seconds is stopped, and restarted on its next use. Batches of files
+    are split in shards, one per worker, so that all cores are used.
+
+    Use the shared pool through :py:meth:`instance()` rather than creating new ones.
+
+    Attributes:
+        size        (int): The number of workers
+        idleTimeout (float): Seconds of inactivity after which a worker is stopped
+        requests    (int): Number of requests sent to exiftool processes so far
+    """
+    IDLE_TIMEOUT = 120
+    # Smallest number of files worth a request to another worker
+    MIN_SHARD_SIZE = 8
+    # Number of files per request pipelined to a worker
+    PIPELINE_BATCH_SIZE = 64
+
+    _instance = None
+    _instanceLock = threading.Lock()
+
+    def __init__(self, size = None, idleTimeout = IDLE_TIMEOUT, executable = None):
+        """
+        Create a pool of exiftool processes
+
+        Args:
+            size        (int): The number of workers, the number of cores by default
+            idleTimeout (float): Seconds of inactivity after which a worker is stopped
+            executable  (str): The exiftool executable, see exiftool.executable
+        """
+        self.size = size or os.cpu_count() or 1
+        self.idleTimeout = idleTimeout
+        self.requests = 0
+        self._workers = [ _Worker(executable) for _ in range(self.size) ]
+        self._executor = ThreadPoolExecutor(self.size)
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns:
+            ExifToolPool: The pool shared across the application
+        """
+        with cls._instanceLock:
+            if cls._instance == None:
+                cls._instance = ExifToolPool()
+            return cls._instance
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Terminate the shared pool, if it has been created
+        """
+        with cls._instanceLock:
+            if cls._instance != None:
+                cls._instance.terminate()
+                cls._instance = None
+
+    def terminate(self):
+        """
+        Stop all workers of the pool
+        """
+        with self._lock:
+            if self._reaper != None:
+                self._reaper.cancel()
+                self._reaper = None
+        for worker in self._workers:
+            with worker.lock:
+                worker.stop()
+
+    def _scheduleReaper(self):
+        """
+        Schedule the next check for idle workers
+        """
+        with self._lock:
+            if self._reaper != None:
+                return
+            self._reaper = threading.Timer(self.idleTimeout, self._reapIdleWorkers)
+            self._reaper.daemon = True
+            self._reaper.start()
+
+    def _reapIdleWorkers(self):
+        """
+        Stop the workers that have not been used for idleTimeout seconds
+        """
+        with self._lock:
+            self._reaper = None
+        busy = False
+        for worker in self._workers:
+            if not worker.lock.acquire(False):
+                busy = True
+                continue
+            try:
+                if time.time() - worker.lastUse >= self.idleTimeout:
+                    worker.stop()
+                elif worker._exifparser != None:
+                    busy = True
+            finally:
+                worker.lock.release()
+        if busy:
+            self._scheduleReaper()
+
+    def _readShard(self, worker, tags, filenames):
+        """
+        Read the tags of a shard of files, as batches pipelined to the worker. If a
+        request fails, files are requested one by one so that only the faulty files
+        are missing.
+        """
+        batches = [ filenames[i:i + self.PIPELINE_BATCH_SIZE] \
+            for i in range(0, len(filenames), self.PIPELINE_BATCH_SIZE) ]
+        try:
+            self._countRequests(len(batches))
+            return worker.call("get_tags_batches", tags, batches)
+        except ValueError:
+            result = []
+            for filename in filenames:
+                try:
+                    self._countRequests(1)
+                    result.append(worker.call("get_tags", tags, filename))
+                except (ValueError, IndexError):
+                    print("Unable to read EXIF data of " + filename)
+            return result
+
+    def _countRequests(self, count):
+        with self._lock:
+            self.requests += count
+
+    def get_tags_batch(self, tags, filenames):
+        """
+        Return only specified tags for the given files, reading shards of files in
+        parallel on the workers.
+
+        Args:
+            tags      (list<str>): The tags to retrieve, in the format <group>:<tag>
+            filenames (list<str>): The files to read
+
+        Returns:
+            list<dict>: The tags of each readable file, in the same format as\
+                :py:meth:`exiftool.ExifTool.get_tags_batch`
+        """
+        filenames = list(filenames)
+        if len(filenames) == 0:
+            return []
+        shards = min(self.size, max(1, len(filenames) // self.MIN_SHARD_SIZE))
+        shardSize = -(-len(filenames) // shards)
+        futures = [ self._executor.submit(self._readShard, worker, tags, \
+            filenames[i * shardSize:(i + 1) * shardSize]) \
+                for i, worker in enumerate(self._workers[:shards]) ]
+        result = []
+        for future in futures:
+            result.extend(future.result())
+        self._scheduleReaper()
+        return result
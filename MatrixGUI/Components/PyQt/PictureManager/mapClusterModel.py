@@ -0,0 +1,496 @@
+from PyQt5.QtCore import *
+import math
+
+class MapClusterModel(QAbstractListModel):
+    """
+    The geotagged pictures of a PictureManager, grouped into clusters for the map. The
+    map is cut into square cells of CELL_SIZE pixels at the current zoom level, in Web
+    Mercator coordinates as the map tiles, and each non empty cell is a cluster placed
+    at the mean position of its pictures. Zooming in splits clusters.
+
+    The cells double as a spatial index: only the clusters inside the viewport of the
+    map, extended by VIEWPORT_MARGIN on each side, are rows of the model, so that the
+    map never creates delegates for clusters out of view. Panning inserts and removes
+    the clusters entering and leaving the extended viewport, and nothing at all while
+    the viewport stays inside it.
+
+    Each cluster takes the color of the most frequent status among its pictures, as
+    the pictures did before being clustered.
+
+    Clusters follow the rows of the manager: inserted and removed rows only update the
+    count of their clusters. Status changes of shown pictures are gathered until the
+    event loop runs again, then the statuses of their clusters are counted again. Clusters are rebuilt from the columns of the source model
+    when the zoom level, the status filter, the source model or the coordinates of
+    pictures change.
+
+    Attributes:
+        level (int): The zoom level the clusters are computed for
+    """
+    # Roles of the model, used in QML side
+    LATITUDE_ROLE = Qt.UserRole + 1
+    LONGITUDE_ROLE = Qt.UserRole + 2
+    COUNT_ROLE = Qt.UserRole + 3
+    STATUS_ROLE = Qt.UserRole + 4
+    COLOR_ROLE = Qt.UserRole + 5
+    _roles = {
+        LATITUDE_ROLE: "latitude",
+        LONGITUDE_ROLE: "longitude",
+        COUNT_ROLE: "count",
+        STATUS_ROLE: "status",
+        COLOR_ROLE: "circleColor",
+    }
+
+    # Width of a cell, in pixels of the map
+    CELL_SIZE = 64
+    # Width of the map tiles, in pixels
+    TILE_SIZE = 256
+    # Zoom level beyond which clusters are not split anymore
+    MAX_LEVEL = 20
+    # Number of removed clusters beyond which the views are reset instead of being
+    # told about each removed cluster
+    REMOVE_LIMIT = 64
+    # Part of the width and the height of the viewport exposed beyond each side
+    VIEWPORT_MARGIN = 0.5
+    # The whole world, as north, west, south and east edges in degrees
+    WORLD = (85.0, -180.0, -85.0, 180.0)
+
+    def __init__(self, manager, colors, level = 17, parent = None):
+        """
+        Initialize the clusters of a manager
+
+        Args:
+            manager (PictureManager): The filtered pictures to cluster
+            colors  (dict<int, str>): The color of each status, e.g. Picture.COLORS
+            level   (int): The initial zoom level
+            parent  (QObject): Parent Element
+        """
+        super(MapClusterModel, self).__init__(parent)
+        self._manager = manager
+        self._colors = colors
+        self.level = min(max(int(level), 0), self.MAX_LEVEL)
+        # Cluster of each non empty cell: [number of pictures, sum of latitudes, sum of
+        # longitudes, cell, number of pictures per status]
+        self._cells = dict()
+        # The clusters of the extended viewport, as rows of the model
+        self._clusters = []
+        # Row of the cluster of each cell of the extended viewport
+        self._rows = dict()
+        # Viewport of the map, as north, west, south and east edges in degrees, None to
+        # expose every cluster
+        self._viewport = None
+        # Exposed cells, as first and last columns then first and last lines
+        self._range = None
+        # False while the manager filters its rows again, clusters being rebuilt after
+        self._following = True
+        # Cells of the pictures whose status changed, counted again by _recount
+        self._dirty = set()
+        self._recountTimer = QTimer(self)
+        self._recountTimer.setSingleShot(True)
+        self._recountTimer.setInterval(0)
+        self._recountTimer.timeout.connect(self._recount)
+        manager.statusFilterAboutToChange.connect(self._stopFollowing)
+        manager.statusFilterChanged.connect(self.rebuild)
+        manager.rowsInserted.connect(self._rowsInserted)
+        manager.rowsAboutToBeRemoved.connect(self._rowsAboutToBeRemoved)
+        manager.dataChanged.connect(self._dataChanged)
+        manager.modelReset.connect(self.rebuild)
+        self.rebuild()
+
+    def rowCount(self, parent = QModelIndex()):
+        return len(self._clusters)
+
+    def roleNames(self):
+        return self._roles
+
+    def data(self, index, role = COUNT_ROLE):
+        """
+        Args:
+            index (QModelIndex): The index of a cluster
+            role  (int): One of the roles of the model
+
+        Returns:
+            QVariant: The mean coordinates, the number of pictures, or the most frequent\
+                    status and its color
+        """
+        if not index.isValid() or index.row() >= len(self._clusters):
+            return QVariant()
+        count, latitudes, longitudes, _, statuses = self._clusters[index.row()]
+        if role == self.LATITUDE_ROLE:
+            return latitudes / count
+        if role == self.LONGITUDE_ROLE:
+            return longitudes / count
+        if role == self.COUNT_ROLE:
+            return count
+        if role in (self.STATUS_ROLE, self.COLOR_ROLE):
+            # Ties go to the lowest status, the statuses may be counted again
+            status = max(sorted(statuses), key=statuses.get) if len(statuses) > 0 \
+                else min(self._colors)
+            return status if role == self.STATUS_ROLE else self._colors[status]
+        return QVariant()
+
+    def _cellOf(self, latitude, longitude):
+        """
+        Returns:
+            (int, int): The cell of a position at the current zoom level, in Web\
+                    Mercator coordinates
+        """
+        cells = float(self.TILE_SIZE << self.level) / self.CELL_SIZE
+        latitude = min(max(latitude, -85.0), 85.0)
+        y = 0.5 - math.asinh(math.tan(math.radians(latitude))) / (2 * math.pi)
+        return (int((longitude + 180.0) / 360.0 * cells), int(y * cells))
+
+    def _cellBounds(self, cell):
+        """
+        Returns:
+            (float, float, float, float): The north, west, south and east edges of a\
+                    cell at the current zoom level, in degrees
+        """
+        cells = float(self.TILE_SIZE << self.level) / self.CELL_SIZE
+        latitude = lambda y: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / cells))))
+        x, y = cell
+        return (latitude(y), x / cells * 360.0 - 180.0, latitude(y + 1), \
+            (x + 1) / cells * 360.0 - 180.0)
+
+    def _sourceRows(self, first, last):
+        """
+        Returns:
+            list<int>: The rows of the source model of rows of the manager
+        """
+        manager = self._manager
+        return [ manager.mapToSource(manager.index(row, 0)).row() \
+            for row in range(first, last + 1) ]
+
+    def _deltas(self, sourceRows, sign):
+        """
+        Sum the pictures of source rows per cell, pictures without coordinates being
+        left out
+
+        Args:
+            sourceRows (iterable<int>): The rows of the source model
+            sign       (int): 1 for added pictures, -1 for removed pictures
+
+        Returns:
+            dict<(int, int), list>: The number of pictures, the sums of their\
+                    coordinates and the number of pictures per status, multiplied by sign
+        """
+        store = self._manager.sourceModel()._store
+        latitudes, longitudes = store.column('latitude'), store.column('longitude')
+        status = store.column('status')
+        cellOf = self._cellOf
+        deltas = dict()
+        for row in sourceRows:
+            latitude, longitude = latitudes[row], longitudes[row]
+            if latitude == 0.0 and longitude == 0.0:
+                continue
+            cell = cellOf(latitude, longitude)
+            delta = deltas.get(cell)
+            if delta == None:
+                deltas[cell] = [sign, sign * latitude, sign * longitude, {status[row]: sign}]
+            else:
+                delta[0] += sign; delta[1] += sign * latitude; delta[2] += sign * longitude
+                delta[3][status[row]] = delta[3].get(status[row], 0) + sign
+        return deltas
+
+    def _apply(self, deltas):
+        """
+        Update the clusters with the per cell sums of added or removed pictures, then
+        the exposed clusters
+        """
+        changed = []; added = []; emptied = []
+        for cell, (count, latitudes, longitudes, statuses) in deltas.items():
+            cluster = self._cells.get(cell)
+            if cluster == None:
+                cluster = self._cells[cell] = [count, latitudes, longitudes, cell, statuses]
+                if self._inRange(cell):
+                    added.append(cluster)
+                continue
+            cluster[0] += count; cluster[1] += latitudes; cluster[2] += longitudes
+            for status, statusCount in statuses.items():
+                statusCount += cluster[4].get(status, 0)
+                if statusCount > 0:
+                    cluster[4][status] = statusCount
+                else:
+                    cluster[4].pop(status, None)
+            if cluster[0] <= 0:
+                del self._cells[cell]
+            row = self._rows.get(cell)
+            if row != None:
+                (changed if cluster[0] > 0 else emptied).append(row)
+        self._update(emptied, changed, added)
+
+    def _update(self, removed, changed, added):
+        """
+        Update the exposed clusters. New clusters are appended at once, and removed
+        clusters are replaced by the last one, so that other clusters keep their rows.
+
+        Args:
+            removed (list<int>): The rows of the clusters to remove
+            changed (list<int>): The rows of the clusters whose values changed
+            added   (list<list>): The clusters to append
+        """
+        if len(removed) > self.REMOVE_LIMIT:
+            self.beginResetModel()
+            removed = set(removed)
+            self._clusters = [ cluster for row, cluster in enumerate(self._clusters) \
+                if not row in removed ]
+            self._clusters.extend(added)
+            self._rows = dict((cluster[3], row) \
+                for row, cluster in enumerate(self._clusters))
+            self.endResetModel()
+            return
+        for row in sorted(removed, reverse=True):
+            last = len(self._clusters) - 1
+            del self._rows[self._clusters[row][3]]
+            if row != last:
+                self._clusters[row] = self._clusters[last]
+                self._rows[self._clusters[row][3]] = row
+                changed.append(row)
+            self.beginRemoveRows(QModelIndex(), last, last)
+            self._clusters.pop()
+            self.endRemoveRows()
+        changed = [ row for row in changed if row < len(self._clusters) ]
+        if len(changed) > 0:
+            self.dataChanged.emit(self.index(min(changed)), self.index(max(changed)), \
+                list(self._roles))
+        if len(added) > 0:
+            first = len(self._clusters)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for cluster in added:
+                self._rows[cluster[3]] = len(self._clusters)
+                self._clusters.append(cluster)
+            self.endInsertRows()
+
+    def _cellRange(self, north, west, south, east, margin):
+        """
+        Returns:
+            (int, int, int, int): The first and last columns, then the first and last\
+                    lines of the cells covering an area extended by a margin. Columns\
+                    wrap around the world, the first one may come after the last one.
+        """
+        cells = (self.TILE_SIZE << self.level) // self.CELL_SIZE
+        (x0, y0), (x1, y1) = self._cellOf(north, west), self._cellOf(south, east)
+        if x1 < x0:
+            # Crossing the antimeridian
+            x1 += cells
+        dx, dy = int((x1 - x0) * margin) + 1, int((y1 - y0) * margin) + 1
+        x0, x1, y0, y1 = x0 - dx, x1 + dx, max(y0 - dy, 0), min(y1 + dy, cells - 1)
+        if x1 - x0 + 1 >= cells:
+            return (0, cells - 1, y0, y1)
+        return (x0 % cells, x1 % cells, y0, y1)
+
+    def _inRange(self, cell):
+        """
+        Returns:
+            bool: True if a cell is exposed
+        """
+        if self._range == None:
+            return True
+        x0, x1, y0, y1 = self._range
+        cells = (self.TILE_SIZE << self.level) // self.CELL_SIZE
+        return (cell[0] - x0) % cells <= (x1 - x0) % cells and y0 <= cell[1] <= y1
+
+    def _rangeCells(self):
+        """
+        Returns:
+            list<list>: The clusters of the exposed cells, found by visiting either the\
+                    exposed cells or the clusters, whichever are fewer
+        """
+        if self._range == None:
+            return list(self._cells.values())
+        cells = (self.TILE_SIZE << self.level) // self.CELL_SIZE
+        x0, x1, y0, y1 = self._range
+        width = (x1 - x0) % cells + 1
+        if width * (y1 - y0 + 1) > len(self._cells):
+            return [ cluster for cell, cluster in self._cells.items() if self._inRange(cell) ]
+        found = (self._cells.get(((x0 + dx) % cells, y)) \
+            for dx in range(width) for y in range(y0, y1 + 1))
+        return [ cluster for cluster in found if cluster != None ]
+
+    def _stopFollowing(self):
+        self._following = False
+
+    def _rowsInserted(self, parent, first, last):
+        if self._following:
+            self._apply(self._deltas(self._sourceRows(first, last), 1))
+
+    def _rowsAboutToBeRemoved(self, parent, first, last):
+        if self._following:
+            deltas = self._deltas(self._sourceRows(first, last), -1)
+            self._apply(deltas)
+            # Rows hidden by a status change are removed with their new status
+            self._dirty.update(deltas)
+            self._recountTimer.start()
+
+    def _dataChanged(self, topLeft, bottomRight, roles = []):
+        """
+        Rebuild the clusters when the coordinates of pictures may have changed, and
+        count the statuses of their clusters again when their status changed
+        """
+        if not self._following:
+            return
+        source = self._manager.sourceModel()
+        moving = [source.LATITUDE_ROLE, source.LONGITUDE_ROLE, source.ITEM_ROLE]
+        if len(roles) == 0 or any(role in moving for role in roles):
+            self.rebuild()
+        elif source.STATUS_ROLE in roles:
+            self._dirty.update(self._deltas(self._sourceRows(topLeft.row(), \
+                bottomRight.row()), 1))
+            self._recountTimer.start()
+
+    def _recount(self):
+        """
+        Count again the pictures per status of the clusters of the pictures whose
+        status changed. Only the pictures inside the bounds of these clusters are
+        located in cells.
+        """
+        cells = [ cell for cell in self._dirty if cell in self._cells ]
+        self._dirty = set()
+        if len(cells) == 0:
+            return
+        bounds = [ self._cellBounds(cell) for cell in cells ]
+        north, west = max(b[0] for b in bounds), min(b[1] for b in bounds)
+        south, east = min(b[2] for b in bounds), max(b[3] for b in bounds)
+        counts = dict((cell, dict()) for cell in cells)
+        store = self._manager.sourceModel()._store
+        latitudes, longitudes = store.column('latitude'), store.column('longitude')
+        status = store.column('status')
+        accepted = self._manager._acceptedStatuses()
+        for row in range(len(status)):
+            latitude, longitude = latitudes[row], longitudes[row]
+            if south <= latitude <= north and west <= longitude <= east and \
+                status[row] in accepted and (latitude != 0.0 or longitude != 0.0):
+                statuses = counts.get(self._cellOf(latitude, longitude))
+                if statuses != None:
+                    statuses[status[row]] = statuses.get(status[row], 0) + 1
+        for cell, statuses in counts.items():
+            self._cells[cell][4] = statuses
+        rows = [ self._rows[cell] for cell in cells if cell in self._rows ]
+        if len(rows) > 0:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), \
+                [self.STATUS_ROLE, self.COLOR_ROLE])
+
+    @pyqtSlot()
+    def rebuild(self):
+        """
+        Recompute all clusters from the columns of the source model, keeping the
+        pictures accepted by the status filter of the manager
+        """
+        self.beginResetModel()
+        self._following = True
+        self._cells = dict()
+        self._dirty = set()
+        source = self._manager.sourceModel()
+        if source != None:
+            # The manager only tells about changes of the rows it has been asked for
+            self._manager.rowCount()
+            accepted = self._manager._acceptedStatuses()
+            status = source._store.column('status')
+            rows = [ row for row in range(len(status)) if status[row] in accepted ]
+            for cell, (count, latitudes, longitudes, statuses) in \
+                self._deltas(rows, 1).items():
+                self._cells[cell] = [count, latitudes, longitudes, cell, statuses]
+        if self._viewport != None:
+            self._range = self._cellRange(*self._viewport, margin=self.VIEWPORT_MARGIN)
+        self._clusters = self._rangeCells()
+        self._rows = dict((cluster[3], row) for row, cluster in enumerate(self._clusters))
+        self.endResetModel()
+
+    @pyqtSlot(float)
+    def setZoomLevel(self, zoomLevel):
+        """
+        Follow the zoom level of the map, clusters being recomputed when its integer
+        part changes
+
+        Args:
+            zoomLevel (float): The zoom level of the map
+        """
+        level = min(max(int(zoomLevel), 0), self.MAX_LEVEL)
+        if level != self.level:
+            self.level = level
+            self.rebuild()
+
+    @pyqtSlot(float, float, float, float, float)
+    def setViewport(self, zoomLevel, north, west, south, east):
+        """
+        Follow the viewport of the map. Clusters entering or leaving the viewport
+        extended by VIEWPORT_MARGIN are inserted or removed, unless the viewport stays
+        in the exposed cells.
+
+        Args:
+            zoomLevel (float): The zoom level of the map
+            north     (float): The latitude of the top edge, NaN if out of the world
+            west      (float): The longitude of the left edge
+            south     (float): The latitude of the bottom edge
+            east      (float): The longitude of the right edge
+        """
+        viewport = (north, west, south, east)
+        if any(edge != edge for edge in viewport):
+            # Zoomed out beyond the edges of the world
+            viewport = self.WORLD
+        self._viewport = tuple(min(max(edge, -180.0), 180.0) for edge in viewport)
+        level = min(max(int(zoomLevel), 0), self.MAX_LEVEL)
+        if level != self.level:
+            self.level = level
+            self.rebuild()
+            return
+        cells = (self.TILE_SIZE << self.level) // self.CELL_SIZE
+        x0, x1, y0, y1 = self._cellRange(*self._viewport, margin=0)
+        if self._range != None and self._inRange((x0, y0)) and self._inRange((x1, y1)) \
+            and (x1 - x0) % cells <= (self._range[1] - self._range[0]) % cells:
+            return
+        self._range = self._cellRange(*self._viewport, margin=self.VIEWPORT_MARGIN)
+        removed = [ row for row, cluster in enumerate(self._clusters) \
+            if not self._inRange(cluster[3]) ]
+        added = [ cluster for cluster in self._rangeCells() if not cluster[3] in self._rows ]
+        self._update(removed, [], added)
+
+    @pyqtSlot(int, result=bool)
+    def canSplit(self, row):
+        """
+        Returns:
+            bool: True if zooming in may split a cluster
+        """
+        return self._clusters[row][0] > 1 and self.level < self.MAX_LEVEL
+
+    @pyqtSlot(int, result=int)
+    def pictureIndex(self, row):
+        """
+        Find a picture of a cluster, visiting the rows of the manager
+
+        Args:
+            row (int): The row of the cluster
+
+        Returns:
+            int: The row of the picture in the manager, -1 if there is none
+        """
+        if row < 0 or row >= len(self._clusters):
+            return -1
+        cell = self._clusters[row][3]
+        store = self._manager.sourceModel()._store
+        latitudes, longitudes = store.column('latitude'), store.column('longitude')
+        sourceRows = self._sourceRows(0, self._manager.rowCount() - 1)
+        for managerRow, sourceRow in enumerate(sourceRows):
+            latitude, longitude = latitudes[sourceRow], longitudes[sourceRow]
+            if (latitude != 0.0 or longitude != 0.0) and \
+                self._cellOf(latitude, longitude) == cell:
+                return managerRow
+        return -1
+
+    @pyqtSlot(int, result=int)
+    def clusterOf(self, index):
+        """
+        Args:
+            index (int): The row of a picture in the manager
+
+        Returns:
+            int: The row of the cluster of the picture, -1 if it has no coordinates
+        """
+        if index < 0 or index >= self._manager.rowCount():
+            return -1
+        sourceRow = self._sourceRows(index, index)[0]
+        store = self._manager.sourceModel()._store
+        latitude = store.column('latitude')[sourceRow]
+        longitude = store.column('longitude')[sourceRow]
+        if latitude == 0.0 and longitude == 0.0:
+            return -1
+        return self._rows.get(self._cellOf(latitude, longitude), -1)
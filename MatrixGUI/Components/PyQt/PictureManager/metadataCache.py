@@ -0,0 +1,154 @@
+import os, json, sqlite3, hashlib, threading
+
+class MetadataCache(object):
+    """
+    A persistent cache of the EXIF tags read from pictures files, stored as an SQLite
+    database in a scene directory.
+
+    Entries are keyed by the file path, and are only considered valid while the size
+    and the modification time of the file are unchanged. A hash of the beginning of
+    the file (where the EXIF data live) is also stored, so that a file that has been
+    copied or moved is still found.
+
+    Attributes:
+        path  (str): The path of the database file
+        tags  (str): The tags cached for each file, sorted and comma separated. Entries\
+                cached with another set of tags are ignored.
+    """
+    TABLE = "metadata"
+    # Number of bytes hashed at the beginning of each file
+    HASH_SIZE = 64 * 1024
+    # Maximum number of parameters bound to a single SQLite query
+    QUERY_SIZE = 500
+
+    def __init__(self, directory, tags, file_name = "metadata.sqlite"):
+        """
+        Open (or create) the metadata cache of a directory
+
+        Args:
+            directory (str): The directory that holds the cache, usually a scene
+            tags      (list<str>): The tags cached for each file
+            file_name (str): The name of the database file
+        """
+        self.path = os.path.join(directory, file_name)
+        self.tags = ",".join(sorted(tags))
+        # Files fingerprinted during the last lookup, reused when storing their tags
+        self._fingerprints = dict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread = False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS " + self.TABLE + \
+                " (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT," + \
+                " tagset TEXT, tags TEXT)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS " + self.TABLE + \
+                "_hash ON " + self.TABLE + " (hash)")
+
+    def close(self):
+        """
+        Close the underlying database, forgetting the files fingerprinted but not stored
+        """
+        with self._lock:
+            self._connection.close()
+            self._fingerprints.clear()
+
+    @staticmethod
+    def contentHash(path, size = HASH_SIZE):
+        """
+        Hash the beginning of a file
+
+        Args:
+            path (str): The path to the file
+            size (int): The number of bytes to hash
+
+        Returns:
+            str: The hexadecimal digest
+        """
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read(size)).hexdigest()
+
+    def _query(self, column, keys):
+        """
+        Select the rows whose column value is in keys, by chunks of QUERY_SIZE keys
+        """
+        rows = []
+        for first in range(0, len(keys), self.QUERY_SIZE):
+            chunk = keys[first:first + self.QUERY_SIZE]
+            rows.extend(self._connection.execute(\
+                "SELECT path, size, mtime, hash, tags FROM " + self.TABLE + \
+                " WHERE tagset = ? AND " + column + " IN (" + ",".join("?" * len(chunk)) + ")", \
+                [self.tags] + chunk).fetchall())
+        return rows
+
+    def lookup(self, paths):
+        """
+        Retrieve the cached tags of several files at once
+
+        Args:
+            paths (list<str>): The files to look for
+
+        Returns:
+            (dict<str, dict>, list<str>): The cached tags per path, and the paths missing\
+                from the cache (or whose file changed since)
+        """
+        stats = dict()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stats[path] = (stat.st_size, stat.st_mtime)
+            except OSError:
+                pass
+
+        found = dict()
+        with self._lock:
+            for path, size, mtime, _, tags in self._query("path", list(stats)):
+                if stats[path] == (size, mtime):
+                    found[path] = json.loads(tags)
+                    found[path]['SourceFile'] = path
+
+            # Files unknown by path may be copies of cached files
+            hashes = dict()
+            for path in stats:
+                if path in found:
+                    continue
+                try:
+                    digest = self.contentHash(path)
+                except OSError:
+                    continue
+                hashes.setdefault(digest, []).append(path)
+                self._fingerprints[path] = stats[path] + (digest,)
+            copies = []
+            for _, size, _, digest, tags in self._query("hash", list(hashes)):
+                for path in hashes.get(digest, []):
+                    if not path in found and stats[path][0] == size:
+                        found[path] = json.loads(tags)
+                        found[path]['SourceFile'] = path
+                        copies.append((path,) + self._fingerprints.pop(path) + (self.tags, tags))
+            # Copies are cached under their own path as well
+            with self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO " + self.TABLE + \
+                    " VALUES (?, ?, ?, ?, ?, ?)", copies)
+
+        return found, [ p for p in paths if not p in found ]
+
+    def store(self, metadata):
+        """
+        Store the tags of several files
+
+        Args:
+            metadata (dict<str, dict>): The tags per path, in exiftool format
+        """
+        entries = []
+        for path, tags in metadata.items():
+            try:
+                with self._lock:
+                    fingerprint = self._fingerprints.pop(path, None)
+                if fingerprint == None:
+                    stat = os.stat(path)
+                    fingerprint = (stat.st_size, stat.st_mtime, self.contentHash(path))
+            except OSError:
+                continue
+            tags = dict((k, v) for k, v in tags.items() if k != 'SourceFile')
+            entries.append((path,) + fingerprint + (self.tags, json.dumps(tags)))
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO " + self.TABLE + \
+                " VALUES (?, ?, ?, ?, ?, ?)", entries)
@@ -0,0 +1,83 @@
+import exifreader
+from exiftoolPool import ExifToolPool, ExifToolError
+
+class MetadataReader(object):
+    """
+    Read the EXIF tags of pictures files. Each file is looked for, in order, in the
+    metadata cache (if any), then decoded by the in-process JPEG reader, and finally
+    sent to the shared pool of exiftool processes. Newly read tags are stored back in
+    the cache. If exiftool can not be run, the files it should have read are left
+    without tags::
+
+        reader = MetadataReader(tags, cache)
+        metadata = reader.read(files)
+
+    Attributes:
+        tags      (list<str>): The tags to read, in the format <group>:<tag>
+        cache     (MetadataCache): The persistent cache to use, may be None
+        pool      (ExifToolPool): The exiftool processes to use
+        cached    (int): Number of files found in the cache
+        decoded   (int): Number of files decoded in-process
+        delegated (int): Number of files read by exiftool
+        requests  (int): Number of requests sent to exiftool
+    """
+    def __init__(self, tags, cache = None, pool = None):
+        self.tags, self.cache = tags, cache
+        self.pool = pool or ExifToolPool.instance()
+        self.cached = self.decoded = self.delegated = self.requests = 0
+
+    def read(self, paths):
+        """
+        Read the tags of several files
+
+        Args:
+            paths (list<str>): The files to read
+
+        Returns:
+            dict<str, dict>: The tags per path, in exiftool format. Files that could not be\
+                read are missing.
+        """
+        metadata = dict()
+        misses = paths
+        if self.cache != None:
+            metadata, misses = self.cache.lookup(paths)
+            self.cached += len(metadata)
+
+        batch, unsupported = exifreader.get_tags_batch(self.tags, misses)
+        read = { d['SourceFile']: d for d in batch }
+        self.decoded += len(batch)
+        if len(unsupported) > 0:
+            read.update(self._readWithExiftool(unsupported))
+            self.delegated += len(unsupported)
+
+        if self.cache != None and len(read) > 0:
+            self.cache.store(read)
+        metadata.update(read)
+        return metadata
+
+    def _readWithExiftool(self, paths):
+        """
+        Retrieve the tags of files from the exiftool pool
+
+        Args:
+            paths (list<str>): List of path to the pictures
+
+        Returns:
+            dict<str, dict>: The EXIF data per path, empty if exiftool can not be run
+        """
+        requests = self.pool.requests
+        try:
+            batch = self.pool.get_tags_batch(self.tags, paths)
+        except ExifToolError as e:
+            print("Unable to read EXIF data of " + str(len(paths)) + " files: " + str(e))
+            batch = []
+        self.requests += self.pool.requests - requests
+        return { d.get('SourceFile'): d for d in batch }
+
+    def summary(self):
+        """
+        Returns:
+            str: A human readable summary of where the tags came from
+        """
+        return "{} cached, {} decoded in-process, {} read by exiftool in {} requests".format(\
+            self.cached, self.decoded, self.delegated, self.requests)
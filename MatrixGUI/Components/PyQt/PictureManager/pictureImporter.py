@@ -0,0 +1,103 @@
+import threading, time
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot
+
+class PictureImporter(QObject):
+    """
+    Import pictures files into a picture model without blocking the GUI thread.
+
+    Files are prepared (e.g. copied into the workspace) and their metadata read, chunk
+    by chunk, on a dedicated QThread. Every chunk of ready pictures is sent back
+    through the picturesReady signal, which Qt delivers to receivers of the GUI thread
+    through a queued connection. Connect it to a slot of an object living in the GUI
+    thread, that adds the pictures to the model: the model is only modified in its own
+    thread, and fills in while the import is still running::
+
+        importer = PictureImporter(model, files, PictureState.NEW, prepare=copyFiles)
+        importer.picturesReady.connect(receiver.addPictures)
+        importer.start()
+
+    Attributes:
+        model      (PictureModel): The model the pictures are built for
+
+    Args:
+        model      (PictureModel): The model the pictures are built for
+        files      (list<str>): The files to import
+        status     (int): The initial status of the pictures
+        prepare    (function): Called on each chunk of files before reading them,\
+                returns the paths of the files to read. Files it drops (e.g. duplicates)\
+                are counted as skipped. May be None.
+        chunkSize  (int): Number of files handled per chunk
+    """
+    # Signals
+    picturesReady = pyqtSignal(object)
+    """``pyqtSignal(list<Picture>)`` A chunk of pictures is ready to be added"""
+
+    progress = pyqtSignal(int, int)
+    """``pyqtSignal(int, int)`` Number of files handled so far, and total number of files"""
+
+    finished = pyqtSignal(int, int)
+    """``pyqtSignal(int, int)`` The import is over, cancelled or not. Gives the number of\
+    pictures imported, and the number of files skipped by prepare"""
+
+    def __init__(self, model, files, status, prepare = None, chunkSize = None):
+        QObject.__init__(self)
+        self.model, self._files, self._status = model, list(files), status
+        self._prepare, self._chunkSize = prepare, chunkSize or model.POPULATE_CHUNK_SIZE
+        self._cancelled = threading.Event()
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._run)
+        # Quit from the thread itself, even once the event loop of the GUI is over
+        self.finished.connect(self._thread.quit, Qt.DirectConnection)
+
+    def start(self):
+        """
+        Start the import in the background
+        """
+        self._thread.start()
+
+    def cancel(self):
+        """
+        Ask the import to stop. Already sent chunks are kept, the chunk being prepared
+        is dropped.
+        """
+        self._cancelled.set()
+
+    def isRunning(self):
+        return self._thread.isRunning()
+
+    def wait(self):
+        """
+        Block until the import thread is over
+        """
+        self._thread.wait()
+
+    @pyqtSlot()
+    def _run(self):
+        """
+        Executed by the import thread : prepare and read every chunk of files.
+        """
+        startTime = time.time()
+        imported = 0; skipped = 0; total = len(self._files)
+        try:
+            self.progress.emit(0, total)
+            for first in range(0, total, self._chunkSize):
+                if self._cancelled.is_set():
+                    break
+                chunk = self._files[first:first + self._chunkSize]
+                if self._prepare != None:
+                    prepared = self._prepare(chunk)
+                    skipped += len(chunk) - len(prepared)
+                    chunk = prepared
+                for pictures in self.model.streamPictures(chunk, self._status, self._chunkSize):
+                    if self._cancelled.is_set():
+                        break
+                    self.picturesReady.emit(pictures)
+                    imported += len(pictures)
+                self.progress.emit(min(first + self._chunkSize, total), total)
+        finally:
+            elapsed = max(time.time() - startTime, 1e-6)
+            print("Imported " + str(imported) + "/" + str(total) + " pictures in " + \
+                "{:.2f}s ({:.1f} pictures/s, {} skipped){}".format(elapsed, imported / elapsed, \
+                    skipped, self._cancelled.is_set() and ", cancelled" or ""))
+            self.finished.emit(imported, skipped)
@@ -1,7 +1,11 @@
 from PyQt5.QtCore import *
 from Savable import Savable # Need __init__
+from metadataReader import MetadataReader
+from pictureStore import PictureStore
+from capturePath import capturePathOrder
+from mapClusterModel import MapClusterModel
 import xml.etree.ElementTree as ET
-import os, exiftool
+import os, time, calendar, math
 
 class PictureState():
     """
@@ -15,25 +19,149 @@ class PictureState():
     THUMBNAIL_DISCARDED = 5 # Discard a thumbnail in order to suppress the thumbnail on real import
     DISCARDED = 6 # Discarded pictures will not be used for the reconstruction
   
+def _field(name):
+    """
+    A property of Picture, stored in the picture itself while detached, or in the
+    store of its model
+    """
+    def getter(self):
+        if self._store == None:
+            return self._values[name]
+        return self._store.get(self._row(), name)
+    def setter(self, value):
+        if self._store == None:
+            self._values[name] = value
+        else:
+            self._store.set(self._row(), name, value)
+    return property(getter, setter)
+
 class Picture(object):
     """
     A container used to store all data about a particular picture. It reflects an xml
     structure and is used to manipulate photos as dataModel along the use of the application
+
+    A picture is either detached, holding its own values (e.g. while being imported),
+    or a view on a row of a PictureModel: its values are then read from and written to
+    the columns of the model, and it follows its row when rows move.
+
+    The metadata extracted at import time are kept along the picture, so that files
+    never need to be read again, as well as the image quality measured by the
+    prescreening. Any of them is None when unknown.
     """
+    __slots__ = ('_store', '_key', '_values')
+
+    # Metadata persisted along the picture, besides its position and date
+    METADATA_FIELDS = ['altitude', 'focalLength', 'focalLength35mm', 'make', 'model', \
+        'width', 'height', 'orientation']
+    # Image quality persisted along the picture, see prescreen, higher being better
+    QUALITY_FIELDS = ['sharpness', 'exposure', 'texture']
+    # Quality of the pictures that could not be decoded, so that they are not measured
+    # again. Never below a threshold.
+    UNREADABLE_QUALITY = math.inf
+    # Color of the pictures on the map widget, per status
+    COLORS = {
+        PictureState.NEW: "#1db7ff",
+        PictureState.PROCESSED: "#98cd00",
+        PictureState.RECONSTRUCTION: "#505050",
+        PictureState.REJECTED: "#ff3237",
+        PictureState.DISCARDED: "#ff3237",
+        PictureState.THUMBNAIL: "#ff3237",
+        PictureState.THUMBNAIL_DISCARDED: "#ff3237",
+    }
+
     def __init__(self, resourcesPath, path, latitude, longitude, date = None, \
-        status = PictureState.NEW):
+        status = PictureState.NEW, altitude = None, focalLength = None, \
+        focalLength35mm = None, make = None, model = None, width = None, height = None, \
+        orientation = None, sharpness = None, exposure = None, texture = None):
         """
-          Initialize a picture. 
+          Initialize a detached picture. 
           
           Args: 
-            path    (str): path to the picture file
-            date    (str): the date the photo has been taken 
-            status  (str): the status of the picture, see PictureState upon
+            path            (str): path to the picture file
+            latitude        (float): the GPS latitude, 0.0 if unknown
+            longitude       (float): the GPS longitude, 0.0 if unknown
+            date            (int): the date the photo has been taken, in seconds since\
+                    the epoch (the camera clock is taken as UTC)
+            status          (str): the status of the picture, see PictureState upon
+            altitude        (float): the GPS altitude in meters, negative below sea level
+            focalLength     (float): the focal length of the lens, in mm
+            focalLength35mm (float): the equivalent focal length for a 35mm film, in mm
+            make            (str): the manufacturer of the camera
+            model           (str): the model of the camera
+            width           (int): the width of the image, in pixels
+            height          (int): the height of the image, in pixels
+            orientation     (int): the EXIF orientation of the image, from 1 to 8
+            sharpness       (float): the variance of the Laplacian of the image
+            exposure        (float): the part of the pixels of the image not clipped to\
+                    black or white, from 0 to 1
+            texture         (float): the mean gradient magnitude of the image
+        """
+        self._store = self._key = None
+        self._values = {'resourcesPath': resourcesPath, 'path': path, \
+            'latitude': float(latitude), 'longitude': float(longitude), 'date': date, \
+            'status': status, 'altitude': altitude, 'focalLength': focalLength, \
+            'focalLength35mm': focalLength35mm, 'make': make, 'model': model, \
+            'width': width, 'height': height, 'orientation': orientation, \
+            'sharpness': sharpness, 'exposure': exposure, 'texture': texture}
+
+    @staticmethod
+    def view(store, row):
+        """
+        Create a picture bound to a row of a store
+
+        Args:
+            store (PictureStore): The store of a model
+            row   (int): The row of the picture
+
+        Returns:
+            Picture: The view on that row
+        """
+        picture = Picture.__new__(Picture)
+        picture._store, picture._key, picture._values = store, store.key(row), None
+        return picture
+
+    def _row(self):
+        row = self._store.row(self._key)
+        if row == None:
+            raise LookupError("The picture has been removed from its model")
+        return row
+
+    path = _field('path')
+    status = _field('status')
+    latitude = _field('latitude')
+    longitude = _field('longitude')
+    date = _field('date')
+    altitude = _field('altitude')
+    focalLength = _field('focalLength')
+    focalLength35mm = _field('focalLength35mm')
+    make = _field('make')
+    model = _field('model')
+    width = _field('width')
+    height = _field('height')
+    orientation = _field('orientation')
+    sharpness = _field('sharpness')
+    exposure = _field('exposure')
+    texture = _field('texture')
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def resourcesPath(self):
+        if self._store == None:
+            return self._values['resourcesPath']
+        return self._store.resourcesPath
+
+    @staticmethod
+    def iconPath(resourcesPath, status):
+        """
+        Retrieve the icon corresponding to a status
+
+        Returns:
+            str: The path to the icon file.
         """
-        self.path, self.status, self._resourcesPath = path, status, resourcesPath
-        self.latitude, self.longitude = latitude, longitude
-        self.date = date
-        self.name = os.path.basename(self.path)
+        return os.path.join(resourcesPath, "Icons", str(status) + ".png")
 
     @pyqtProperty(str)
     def icon(self):
@@ -43,7 +171,7 @@ class Picture(object):
         Returns: 
             str: The path to the icon file. 
         """
-        return os.path.join(self._resourcesPath, "Icons", str(self.status) + ".png")
+        return Picture.iconPath(self.resourcesPath, self.status)
 
     @pyqtProperty(str)
     def circleColor(self):
@@ -53,16 +181,7 @@ class Picture(object):
         Return:
             str: The desired color
         """
-        colors = {
-            PictureState.NEW: "#1db7ff",
-            PictureState.PROCESSED: "#98cd00",
-            PictureState.RECONSTRUCTION: "#505050",
-            PictureState.REJECTED: "#ff3237",
-            PictureState.DISCARDED: "#ff3237",
-            PictureState.THUMBNAIL: "#ff3237",
-            PictureState.THUMBNAIL_DISCARDED: "#ff3237",
-        }
-        return colors[self.status]
+        return Picture.COLORS[self.status]
 
     def serialize(self):
         """ Serialize a Picture object.
@@ -73,11 +192,95 @@ class Picture(object):
         serial['longitude'] = self.longitude
         serial['status'] = self.status
         serial['date'] = self.date
+        for field in Picture.METADATA_FIELDS + Picture.QUALITY_FIELDS:
+            serial[field] = getattr(self, field)
         return serial
 
 
 
 class PictureManager(QSortFilterProxyModel):
+    """
+    A proxy over a PictureModel, which filters pictures by status and reorders them.
+    Sorting is done by the source model, the proxy itself does not sort.
+
+    Attributes:
+        ALL_STATUSES (int): The filter mask accepting every status
+    """
+    ALL_STATUSES = -1
+
+    # Signals
+    statusCountsChanged = pyqtSignal()
+    """``pyqtSignal()`` The number of pictures per status of the source model changed"""
+    statusFilterAboutToChange = pyqtSignal()
+    """``pyqtSignal()`` The rows are about to be filtered with other statuses"""
+    statusFilterChanged = pyqtSignal()
+    """``pyqtSignal()`` The rows have been filtered with other statuses"""
+
+    def __init__(self, parent = None):
+        super(PictureManager, self).__init__(parent)
+        # Bit n is set when pictures of status n are accepted
+        self._statusMask = self.ALL_STATUSES
+        # Clusters of the pictures on the map, created when first needed
+        self._clusters = None
+
+    def setSourceModel(self, sourceModel):
+        """
+        Set the model to filter, and follow its status counts
+        """
+        if self.sourceModel() != None:
+            self.sourceModel().statusCountsChanged.disconnect(self.statusCountsChanged)
+        super(PictureManager, self).setSourceModel(sourceModel)
+        sourceModel.statusCountsChanged.connect(self.statusCountsChanged)
+        self.statusCountsChanged.emit()
+
+    @pyqtProperty(QVariant, notify=statusCountsChanged)
+    def statusCounts(self):
+        """
+        The number of pictures per status in the source model, whether filtered or not
+
+        Returns:
+            list<int>: The number of pictures, indexed by status
+        """
+        return self.sourceModel().statusCounts
+
+    @pyqtProperty(QObject, constant=True)
+    def clusters(self):
+        """
+        The clusters of the filtered pictures on the map, kept up to date from then on
+
+        Returns:
+            MapClusterModel: The clusters
+        """
+        if self._clusters == None:
+            self._clusters = MapClusterModel(self, Picture.COLORS, parent=self)
+        return self._clusters
+
+    def setStatusFilter(self, statuses):
+        """
+        Only show the pictures having one of the given statuses
+
+        Args:
+            statuses (list<int>): The accepted statuses, all statuses if None
+        """
+        mask = self.ALL_STATUSES
+        if statuses != None:
+            mask = 0
+            for status in statuses:
+                mask |= 1 << status
+        if mask != self._statusMask:
+            self.statusFilterAboutToChange.emit()
+            self._statusMask = mask
+            self.invalidateFilter()
+            self.statusFilterChanged.emit()
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        """
+        Accept the rows whose status is in the filter, with a single bit test
+        """
+        if self._statusMask == self.ALL_STATUSES:
+            return True
+        return (self._statusMask >> self.sourceModel().statusOf(sourceRow)) & 1 == 1
+
     @pyqtSlot(result=int)
     def count(self):
         """
@@ -91,43 +294,61 @@ class PictureManager(QSortFilterProxyModel):
 
     @pyqtSlot(int, result=str)
     def getName(self, index):
-        return self.sourceModel().data(self.sourceModel().index(index), PictureModel.NAME_ROLE)
+        return self.data(self.index(index, 0), PictureModel.NAME_ROLE)
+
+    def _acceptedStatuses(self):
+        """
+        Returns:
+            list<int>: The statuses accepted by the filter
+        """
+        return [ status for status in range(PictureModel.STATUS_COUNT) \
+            if (self._statusMask >> status) & 1 == 1 ]
 
     @pyqtSlot(result=QVariant)
     def computeCenter(self):
         """
-        Compute the coordinates of the center associated to all pictures
+        Compute the coordinates of the center associated to the filtered pictures, from
+        the sums maintained by the source model
 
         Returns:
-            list<float>: The coordinates, latitude then longitude
+            dict<str, float>: The coordinates, 0 if no picture has coordinates
         """
-        extract = lambda coord: [ float(getattr(d, coord)) for d in self.sourceModel()._data if getattr(d, coord) != "0.0" ]
-        latitudes = extract('latitude'); longitudes = extract('longitude')
+        center = self.sourceModel()._store.center(self._acceptedStatuses())
         coords = {'latitude': 0, 'longitude': 0}
-        if(len(latitudes) > 0 and len(longitudes) > 0):
-            average = lambda list: sum(list) / len(list)
-            coords['latitude'] = average(latitudes)
-            coords['longitude'] = average(longitudes)
+        if center != None:
+            coords['latitude'], coords['longitude'] = center
         #Else, throw an error to inform the user ?
         return coords
 
-    def _iterateOverRows(self, rows):
+    @pyqtSlot(result=QVariant)
+    def computeBounds(self):
+        """
+        Compute the bounding box of the filtered pictures, to fit the map on them
+
+        Returns:
+            dict: The south, west, north and east edges, and the number of pictures\
+                    having coordinates. Edges are 0 if no picture has coordinates
+        """
+        store = self.sourceModel()._store
+        statuses = self._acceptedStatuses()
+        bounds = store.bounds(statuses)
+        box = {'south': 0, 'west': 0, 'north': 0, 'east': 0, \
+            'count': store.geotaggedCount(statuses)}
+        if bounds != None:
+            box['south'], box['west'], box['north'], box['east'] = bounds
+        return box
+
+    def _sourceRows(self, rows):
         """
-        Iterate over rows in the model that may change during the iteration
+        Map rows of the proxy model to rows of the source model
 
         Args:
             rows (list<QModelIndex>): The related rows in the proxy model
+
+        Returns:
+            list<int>: The valid rows of the source model
         """
-        processed = [] # Holds all rows already been processed
-        previousSize = self.count()
-        for row in rows:
-            if row.isValid(): 
-                processed.append(row.row())
-                if previousSize != self.count():
-                    previouslyProcessed = [ p for p in processed if p < row.row() ]
-                    row = self.index(row.row() - len(previouslyProcessed), 0)
-                    previousSize = self.count()
-                yield row #YoloSwagg
+        return [ self.mapToSource(row).row() for row in rows if row.isValid() ]
 
     def discardAll(self, rows):
         """
@@ -136,13 +357,8 @@ class PictureManager(QSortFilterProxyModel):
         Args:
             rows (list<QModelIndex>): The related rows in the proxy model
         """
-        state = True
-        for row in self._iterateOverRows(rows):
-            currentStatus = self.data(row, PictureModel.STATUS_ROLE)
-            newStatus = currentStatus == PictureState.THUMBNAIL and PictureState.THUMBNAIL_DISCARDED\
-                or PictureState.DISCARDED
-            state = state and self.setData(row, newStatus, PictureModel.STATUS_ROLE)
-        return state
+        self.sourceModel().setStatuses(self._sourceRows(rows), PictureModel.DISCARD)
+        return True
 
     def renewAll(self, rows):
         """
@@ -151,13 +367,8 @@ class PictureManager(QSortFilterProxyModel):
         Args:
             rows (list<QModelIndex>): The related rows in the proxy model
         """
-        state = True
-        for row in self._iterateOverRows(rows):
-            currentStatus = self.data(row, PictureModel.STATUS_ROLE)
-            if currentStatus in [PictureState.REJECTED, PictureState.DISCARDED, PictureState.THUMBNAIL_DISCARDED]:
-                newStatus = currentStatus == PictureState.THUMBNAIL_DISCARDED and PictureState.THUMBNAIL or PictureState.NEW
-                state = state and self.setData(row, newStatus, PictureModel.STATUS_ROLE)
-        return state
+        self.sourceModel().setStatuses(self._sourceRows(rows), PictureModel.RENEW)
+        return True
 
     def deleteAll(self, rows):
         """
@@ -166,10 +377,7 @@ class PictureManager(QSortFilterProxyModel):
         Args:
             rows (list<QModelIndex>): The related rows in the proxy model
         """
-        state = True
-        for row in self._iterateOverRows(rows):
-            state = state and self.removeRow(row.row())
-        return state
+        return self.sourceModel().removeAll(self._sourceRows(rows))
 
     def move(self, initRow, finalRow):
         """
@@ -188,36 +396,135 @@ class PictureManager(QSortFilterProxyModel):
         if outOfBounds(initRow.row(), self.rowCount()) or \
             outOfBounds(finalRow.row(), self.rowCount()): return False
 
-        # Find the corresponding index in the real model
-        source = self.sourceModel()
-        initSourceRow = 0; finalSourceRow = 0
-        for i in range(0, source.rowCount()):
-            srcName = source.data(source.index(i), PictureModel.NAME_ROLE)
-            filterInitName = self.data(initRow, PictureModel.NAME_ROLE)
-            filterFinalName = self.data(finalRow, PictureModel.NAME_ROLE)
-            initSourceRow = srcName == filterInitName and i or initSourceRow
-            finalSourceRow = srcName == filterFinalName and i or finalSourceRow
-
-        initIndex = initRow.row(); finalIndex = finalRow.row()
-        if(initIndex < finalIndex):
-            # Moving downside. FinalIndex should be the index of initRow new child. 
-            finalIndex += 1; finalSourceRow += 1
-        elif(initIndex > finalIndex):
-            #Moving upside. We will insert a row before, so the index will be displaced
-            initSourceRow += 1
-        else:
+        if initRow.row() == finalRow.row():
             # Both index are equal, do nothing, there is no move
             return True
 
-        # Move picture from source model and notify the proxy
-        state = self.beginMoveRows(QModelIndex(), initIndex, initIndex, QModelIndex(), finalIndex)
-        source.insertRow(finalSourceRow)
-        source.setData(source.index(finalSourceRow),  \
-            source.data(source.index(initSourceRow), source.ITEM_ROLE), \
-            source.ITEM_ROLE)
-        source.removeRow(initSourceRow)
-        self.endMoveRows()
+        # Ordering by hand, the pictures are not kept sorted anymore
+        self.sourceModel().sortBy(None)
+        # Find the corresponding rows in the real model
+        initSourceRow = self.mapToSource(initRow).row()
+        finalSourceRow = self.mapToSource(finalRow).row()
+        if initSourceRow < finalSourceRow:
+            # Moving downside, the picture goes after finalRow
+            finalSourceRow += 1
+
+        # The proxy follows the move of the source model
+        return self.sourceModel().moveRow(QModelIndex(), initSourceRow, \
+            QModelIndex(), finalSourceRow)
+
+    @pyqtSlot(str)
+    @pyqtSlot(str, bool)
+    def sortBy(self, key, descending = False):
+        """
+        Sort the pictures of the source model, which keeps them sorted until they are
+        moved by hand. The proxy follows the new order of the source model.
+
+        Args:
+            key        (str): One of PictureModel.SORT_KEYS, an empty string or None to\
+                    keep the current order
+            descending (bool): Sort in descending order
 
+        Returns:
+            bool: True if the key is known
+        """
+        return self.sourceModel().sortBy(key or None, descending)
+
+    @pyqtSlot(result=bool)
+    def orderAlongCapturePath(self):
+        """
+        Order the pictures of the source model along the path of the photographer. The
+        proxy follows the new order of the source model.
+
+        Returns:
+            bool: True if the order changed
+        """
+        return self.sourceModel().orderAlongCapturePath()
+
+    def moveAll(self, rows, startIndexTo):
+        """
+        Move several pictures so that they follow each other, in their current order.
+        Pictures coming from above startIndexTo are put after the picture at
+        startIndexTo, pictures coming from below are put before it.
+
+        Args:
+            rows         (list<int>): The rows of the pictures to move
+            startIndexTo (int): The destination row of the first picture
+
+        Returns:
+            bool: True if the pictures have been moved
+        """
+        rows = sorted(set(row for row in rows if 0 <= row < self.rowCount()))
+        if len(rows) == 0 or startIndexTo < 0 or startIndexTo >= self.rowCount():
+            return False
+        moved = set(rows)
+        remaining = [ row for row in range(self.rowCount()) if not row in moved ]
+        # Position of the pictures among the rows which are not moved
+        before = len([ row for row in rows if row < startIndexTo ])
+        position = min(startIndexTo - before + (1 if before > 0 else 0), len(remaining))
+        if position < len(remaining):
+            destination = self.mapToSource(self.index(remaining[position], 0)).row()
+        else:
+            destination = self.sourceModel().rowCount()
+        self.sourceModel().sortBy(None)
+        return self._moveSourceRows([ self.mapToSource(self.index(row, 0)).row() \
+            for row in rows ], destination)
+
+    def moveRows(self, sourceParent, sourceRow, count, destinationParent, destinationChild):
+        """
+        Move contiguous rows of the proxy model, which may be scattered in the source
+        model
+
+        Args:
+            sourceParent      (QModelIndex): The parent of the moved rows, always default
+            sourceRow         (int): The first row to move
+            count             (int): The number of rows to move
+            destinationParent (QModelIndex): The destination parent, always default
+            destinationChild  (int): The row before which the pictures are put
+
+        Returns:
+            bool: True if the pictures have been moved
+        """
+        if count < 1 or sourceRow < 0 or sourceRow + count > self.rowCount() or \
+            destinationChild < 0 or destinationChild > self.rowCount() or \
+            sourceRow <= destinationChild <= sourceRow + count:
+            return False
+        if destinationChild < self.rowCount():
+            destination = self.mapToSource(self.index(destinationChild, 0)).row()
+        else:
+            destination = self.sourceModel().rowCount()
+        self.sourceModel().sortBy(None)
+        return self._moveSourceRows([ self.mapToSource(self.index(row, 0)).row() \
+            for row in range(sourceRow, sourceRow + count) ], destination)
+
+    def _moveSourceRows(self, rows, destination):
+        """
+        Gather rows of the source model before a destination row, in their current
+        order, with one moveRows per contiguous block of rows
+
+        Args:
+            rows        (list<int>): The rows of the source model to move
+            destination (int): The row before which the rows are put, which is not moved
+
+        Returns:
+            bool: True if all blocks have been moved
+        """
+        model = self.sourceModel(); state = True
+        ranges = PictureModel._ranges(rows)
+        # Blocks above the destination move down: the blocks after them move up
+        shift = 0
+        for first, last in [ r for r in ranges if r[0] < destination ]:
+            count = last - first + 1
+            if first - shift + count != destination:
+                state = model.moveRows(QModelIndex(), first - shift, count, \
+                    QModelIndex(), destination) and state
+            shift += count
+        # Blocks below the destination move up, each one after the previous
+        for first, last in [ r for r in ranges if r[0] > destination ]:
+            count = last - first + 1
+            state = model.moveRows(QModelIndex(), first, count, \
+                QModelIndex(), destination) and state
+            destination += count
         return state
 
 class MetaPictureModel(pyqtWrapperType, Savable):
@@ -228,6 +535,9 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
     Represent and handle a list of pictures as a ListModel. Directly implements 
     QAbstractListModel.
 
+    Pictures are kept in the typed columns of a PictureStore, and only built as
+    Picture objects when the whole item is requested.
+
     Attributes:
       PATH_ROLE      (int): Role that handle the picture's path name of an item
       NAME_ROLE      (int): Role that handle the picture's name of an item
@@ -238,8 +548,14 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
       LATITUDE_ROLE  (int): Role related to the latitude of an item
       LONGITUDE_ROLE (int): Roled related to the longitude of an item
       COLOR_ROLE     (int): Role that handle the color of an item on the map
+      SORT_KEY_ROLE  (int): Role related to the numeric key of an item for the current\
+              sort, see sortBy
     """
 
+    # Signals
+    statusCountsChanged = pyqtSignal()
+    """``pyqtSignal()`` The number of pictures per status changed"""
+
     #Roles of our model, used in QML side to retrieve data from our model
     PATH_ROLE = Qt.UserRole + 1
     NAME_ROLE = Qt.UserRole + 2
@@ -249,6 +565,7 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
     LATITUDE_ROLE = Qt.UserRole + 6
     LONGITUDE_ROLE = Qt.UserRole + 7
     COLOR_ROLE = Qt.UserRole + 8
+    SORT_KEY_ROLE = Qt.UserRole + 9
     ITEM_ROLE = Qt.UserRole + 50
     _roles = {
         PATH_ROLE: "path", 
@@ -259,10 +576,57 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         ITEM_ROLE: "item",
         LATITUDE_ROLE: "latitude",
         LONGITUDE_ROLE: "longitude",
-        COLOR_ROLE: "circleColor"
+        COLOR_ROLE: "circleColor",
+        SORT_KEY_ROLE: "sortKey"
+    }
+
+    # Keys the pictures can be sorted by, see sortBy
+    SORT_KEYS = ['date', 'name', 'status', 'distance', 'size']
+    # Roles whose change may move a picture, per sort key
+    _SORT_ROLES = {
+        'date': [DATE_ROLE, ITEM_ROLE],
+        'name': [PATH_ROLE, ITEM_ROLE],
+        'status': [STATUS_ROLE, ITEM_ROLE],
+        'distance': [LATITUDE_ROLE, LONGITUDE_ROLE, ITEM_ROLE],
+        'size': [PATH_ROLE, ITEM_ROLE],
+    }
+
+    # Number of distinct statuses, see PictureState
+    STATUS_COUNT = 7
+    # Status transitions applied by setStatuses, statuses missing from a table are kept
+    DISCARD = dict((status, PictureState.DISCARDED) for status in \
+        [PictureState.NEW, PictureState.RECONSTRUCTION, PictureState.REJECTED, \
+        PictureState.PROCESSED, PictureState.THUMBNAIL_DISCARDED, PictureState.DISCARDED])
+    DISCARD[PictureState.THUMBNAIL] = PictureState.THUMBNAIL_DISCARDED
+    RENEW = {
+        PictureState.REJECTED: PictureState.NEW,
+        PictureState.DISCARDED: PictureState.NEW,
+        PictureState.THUMBNAIL_DISCARDED: PictureState.THUMBNAIL,
+    }
+    START_RECONSTRUCTION = {
+        PictureState.NEW: PictureState.RECONSTRUCTION,
+        PictureState.PROCESSED: PictureState.RECONSTRUCTION,
+    }
+    END_RECONSTRUCTION = {
+        PictureState.RECONSTRUCTION: PictureState.PROCESSED,
+    }
+    CONFIRM_THUMBNAIL = {
+        PictureState.THUMBNAIL: PictureState.NEW,
     }
 
-    def __init__(self, resourcesPath, listPictures = [], parent = None):
+    # Number of contiguous ranges beyond which removing rows resets the views
+    REMOVE_RANGES_LIMIT = 64
+    # Number of files read and inserted at once when populating the model
+    POPULATE_CHUNK_SIZE = 200
+    # EXIF tags extracted from each picture, all at once
+    METADATA_TAGS = ['EXIF:GPSLatitude', 'EXIF:GPSLatitudeRef', \
+        'EXIF:GPSLongitude', 'EXIF:GPSLongitudeRef', \
+        'EXIF:GPSAltitude', 'EXIF:GPSAltitudeRef', \
+        'EXIF:DateTimeOriginal', 'EXIF:FocalLength', 'EXIF:FocalLengthIn35mmFormat', \
+        'EXIF:Make', 'EXIF:Model', 'EXIF:Orientation', \
+        'File:ImageWidth', 'File:ImageHeight', 'EXIF:ExifImageWidth', 'EXIF:ExifImageHeight']
+
+    def __init__(self, resourcesPath, listPictures = None, parent = None):
         """ 
         Initialize a picture model.
 
@@ -274,7 +638,36 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         """
         super(PictureModel, self).__init__(parent)
         self._resourcesPath = resourcesPath
-        self._data = listPictures
+        self._store = PictureStore(resourcesPath)
+        if listPictures != None:
+            self._store.insert(0, listPictures)
+        self._metadataCache = None
+        # The pictures are kept sorted by this key, if not None
+        self._sortKey = None
+        self._sortDescending = False
+        # Center of the scene the distances are sorted from
+        self._sortCenter = None
+        # Any change of the rows may change the status counts
+        for signal in [self.rowsInserted, self.rowsRemoved, self.dataChanged, self.modelReset]:
+            signal.connect(lambda *args: self.statusCountsChanged.emit())
+
+    @pyqtProperty(QVariant, notify=statusCountsChanged)
+    def statusCounts(self):
+        """
+        The number of pictures per status, maintained as pictures are added, removed
+        or change status
+
+        Returns:
+            list<int>: The number of pictures, indexed by status
+        """
+        return [ self._store.statusCount(status) for status in range(self.STATUS_COUNT) ]
+
+    def statusOf(self, row):
+        """
+        Returns:
+            int: The status of the picture of a row
+        """
+        return self._store.column('status')[row]
 
     def instantiateManager(self):
         """
@@ -286,7 +679,6 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         """
         manager = PictureManager()
         manager.setSourceModel(self)
-        manager.setFilterRole(self.STATUS_ROLE) # Status will be used in order to filter pictures
         return manager
 
     def insertRow(self, row, parent = QModelIndex()):
@@ -304,9 +696,9 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
             bool: Return True if the row have been successfully inserted.
         """
         self.beginInsertRows(QModelIndex(), row, row)
-        state = self._data.insert(row, None)
+        self._store.insert(row, [Picture(self._resourcesPath, "", 0.0, 0.0)])
         self.endInsertRows()
-        return state
+        return True
 
     def data(self, index, role = NAME_ROLE):
         """
@@ -322,21 +714,25 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         # Ensure the index
         if not index.isValid():
             return QVariant()
-        elif index.row() > len(self._data):
+        elif index.row() >= len(self._store):
             return QVariant()
 
         # Ensure the role
         if not role in PictureModel._roles:
             return QVariant()
 
-        # Index and role are correct, retrieve the picture and send back the requested information
-        picture = self._data[index.row()]
-        if picture == None:
-            return QVariant()
-
+        # Index and role are correct, send back the requested information. The whole
+        # picture is only built when requested, other roles are read from the columns
+        row = index.row()
         if(role == self.ITEM_ROLE):
-            return picture
-        return getattr(picture, PictureModel._roles[role])
+            return Picture.view(self._store, row)
+        if(role == self.ICON_ROLE):
+            return Picture.iconPath(self._resourcesPath, self._store.get(row, 'status'))
+        if(role == self.COLOR_ROLE):
+            return Picture.COLORS[self._store.get(row, 'status')]
+        if(role == self.SORT_KEY_ROLE):
+            return self._store.column('sortKey')[row]
+        return self._store.get(row, PictureModel._roles[role])
   
     def roleNames(self):
         """
@@ -354,21 +750,49 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         """
         # Append at the end
         if index == None:
-            self.beginInsertRows(QModelIndex(), len(self._data), len(self._data))
-            self._data.append(picture)
+            self.beginInsertRows(QModelIndex(), len(self._store), len(self._store))
+            self._store.insert(len(self._store), [picture])
             self.endInsertRows()
+            self._keepSorted([len(self._store) - 1])
         # Insert in the list
         else:
             # Ensure Index
             if not index.isValid():
                 return False
             row = index.row()
-            if row > len(self._data):
+            if row > len(self._store):
                 return False
             else:
                 self.beginInsertRows(QModelIndex(), row, row)
-                self._data.insert(row, picture)
+                self._store.insert(row, [picture])
                 self.endInsertRows()
+                self._keepSorted([row])
+        return True
+
+    def addAll(self, pictures, index = None):
+        """
+        Add several pictures to the model at once. Views are notified with a single
+        row-range insertion instead of one notification per picture.
+
+        Args:
+            pictures (list<Picture>): The pictures to add
+            index    (QModelIndex): The index where the pictures should be inserted. If None,
+                    the pictures will be appended at the end.
+
+        Returns:
+            bool: True if the pictures have been inserted
+        """
+        if len(pictures) == 0:
+            return True
+        row = len(self._store)
+        if index != None:
+            if not index.isValid() or index.row() > len(self._store):
+                return False
+            row = index.row()
+        self.beginInsertRows(QModelIndex(), row, row + len(pictures) - 1)
+        self._store.insert(row, pictures)
+        self.endInsertRows()
+        self._keepSorted(range(row, row + len(pictures)))
         return True
 
     def removeRows(self, row, count, parent = QModelIndex()):
@@ -381,19 +805,46 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
             parent  (QModelIndex)   : The parent row
         """
         # Ensure the index is correct
-        if len(self._data) <= 0:
+        if len(self._store) <= 0:
             return False
 
         if row < 0 or count < 1 or row + count - 1 >= self.rowCount():
             return False
 
         self.beginRemoveRows(QModelIndex(), row, row + count - 1)
-        #Deleting row starting by the latest index
-        for i in range(0, count):
-            del self._data[row + count - i - 1]
+        self._store.remove(row, count)
         self.endRemoveRows()
         return True
 
+    def removeAll(self, rows):
+        """
+        Remove several pictures, in any order. Rows are merged into contiguous ranges,
+        removed from the last one so that the others keep their rows, with one
+        notification each. Beyond REMOVE_RANGES_LIMIT ranges, the store is compacted in
+        a single pass and views are reset instead.
+
+        Args:
+            rows (list<int>): The rows of the pictures to remove
+
+        Returns:
+            bool: True if the rows were valid
+        """
+        ranges = self._ranges(rows)
+        if len(ranges) == 0:
+            return True
+        if ranges[0][0] < 0 or ranges[-1][1] >= len(self._store):
+            return False
+        if len(ranges) > self.REMOVE_RANGES_LIMIT:
+            self.beginResetModel()
+            self._store.removeAll(rows)
+            self.endResetModel()
+            return True
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._store.remove(first, last - first + 1)
+            self.endRemoveRows()
+        return True
+
     def removeRow(self, row, parent = QModelIndex()):
         """
           Remove a picture from the model
@@ -402,11 +853,36 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         """
         self.removeRows(row, 1, parent)
 
+    def moveRows(self, sourceParent, sourceRow, count, destinationParent, destinationChild):
+        """
+        Move contiguous pictures, with a single notification
+
+        Args:
+            sourceParent      (QModelIndex): The parent of the moved rows, always default
+            sourceRow         (int): The first row to move
+            count             (int): The number of rows to move
+            destinationParent (QModelIndex): The destination parent, always default
+            destinationChild  (int): The row before which the pictures are put
+
+        Returns:
+            bool: True if the pictures have been moved
+        """
+        if count < 1 or sourceRow < 0 or sourceRow + count > len(self._store) or \
+            destinationChild < 0 or destinationChild > len(self._store):
+            return False
+        # Fails when the destination is within the moved rows
+        if not self.beginMoveRows(QModelIndex(), sourceRow, sourceRow + count - 1, \
+            QModelIndex(), destinationChild):
+            return False
+        self._store.move(sourceRow, count, destinationChild)
+        self.endMoveRows()
+        return True
+
     def rowCount(self, parent = QModelIndex()):
         """
           Return the number of element within that model
         """
-        return len(self._data)
+        return len(self._store)
 
     def setData(self, index, value, role):
         """
@@ -420,50 +896,557 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         if not index.isValid() or index.row() > self.rowCount() or not role in PictureModel._roles:
             return False
 
+        if(role in [self.ICON_ROLE, self.COLOR_ROLE, self.NAME_ROLE, self.SORT_KEY_ROLE]):
+            # Computed from other fields
+            return False
         if(role == self.ITEM_ROLE):
-            self._data[index.row()] = value
+            # Read every field before writing, the value may be a view on the same row
+            values = [ (f, getattr(value, f)) for f in PictureStore.FIELDS ]
+            for field, fieldValue in values:
+                self._store.set(index.row(), field, fieldValue)
         else:
-            picture = self._data[index.row()]
-            setattr(picture, PictureModel._roles[role], value)
+            self._store.set(index.row(), PictureModel._roles[role], value)
 
-        self.dataChanged.emit(index, index, [role])
+        # The name follows the path
+        roles = [role, self.NAME_ROLE] if role == self.PATH_ROLE else [role]
+        self.dataChanged.emit(index, index, roles)
+        self._sortRolesChanged([index.row()], roles)
         return True
 
     def printData(self):
-        for picture in self._data:
-            print (picture == None and "-----" or str(picture.status) + " - " + picture.name)
-    
+        for row in range(len(self._store)):
+            print (str(self._store.get(row, 'status')) + " - " + self._store.name(row))
+
+    def rowsWithStatus(self, statuses):
+        """
+        Args:
+            statuses (list<int>): The statuses to look for
+
+        Returns:
+            list<int>: The rows of the pictures having one of the statuses
+        """
+        if all(self._store.statusCount(status) == 0 for status in statuses):
+            return []
+        status = self._store.column('status')
+        return [ row for row in range(len(status)) if status[row] in statuses ]
+
+    def rowOf(self, picture):
+        """
+        Find the current row of a picture of the model, which follows the picture when
+        rows are moved, e.g. to keep the model sorted
+
+        Args:
+            picture (Picture): A view on a row of the model, from the ITEM_ROLE
+
+        Returns:
+            int: The row of the picture
+        """
+        return picture._row()
+
+    def rowForPath(self, path):
+        """
+        Find a picture by its path, through the index of the file names
+
+        Args:
+            path (str): The path of the picture
+
+        Returns:
+            int: The row of the picture, None if it is not in the model
+        """
+        return self._store.rowForPath(path)
+
+    def rowsForNames(self, names, statuses = None):
+        """
+        Find the pictures of several file names, e.g. the files of a camera, through the
+        index of the file names
+
+        Args:
+            names    (iterable<str>): The file names, without directory
+            statuses (list<int>): Only keep the pictures having one of these statuses,\
+                    all pictures if None
+
+        Returns:
+            list<int>: The rows of the pictures, in ascending order
+        """
+        status = self._store.column('status')
+        return sorted(row for name in set(names) for row in self._store.rowsForName(name) \
+            if statuses == None or status[row] in statuses)
+
+    @staticmethod
+    def _ranges(rows):
+        """
+        Group rows into contiguous ranges
+
+        Args:
+            rows (iterable<int>): The rows, in any order
+
+        Returns:
+            list<(int, int)>: The first and last row of each range, in ascending order
+        """
+        ranges = []
+        for row in sorted(set(rows)):
+            if len(ranges) > 0 and ranges[-1][1] == row - 1:
+                ranges[-1] = (ranges[-1][0], row)
+            else:
+                ranges.append((row, row))
+        return ranges
+
+    def setStatuses(self, rows, transition):
+        """
+        Change the status of several pictures at once, following a transition table.
+        Views are notified once per contiguous range of changed rows.
+
+        Args:
+            rows       (list<int>): The rows of the pictures, all pictures if None
+            transition (dict<int, int>): The new status per current status, e.g. DISCARD.\
+                    Pictures whose status is not in the table are left unchanged.
+
+        Returns:
+            int: The number of pictures whose status changed
+        """
+        status = self._store.column('status')
+        rows = range(len(status)) if rows == None else rows
+        changed = []
+        for row in rows:
+            newStatus = transition.get(status[row])
+            if newStatus != None and newStatus != status[row]:
+                self._store.set(row, 'status', newStatus)
+                changed.append(row)
+        for first, last in self._ranges(changed):
+            self.dataChanged.emit(self.index(first), self.index(last), \
+                [self.STATUS_ROLE, self.ICON_ROLE, self.COLOR_ROLE])
+        self._sortRolesChanged(changed, [self.STATUS_ROLE])
+        return len(changed)
+
+    def setQualities(self, qualities):
+        """
+        Store the image quality measured for pictures. No view shows it, so that views
+        are not notified.
+
+        Args:
+            qualities (list<(str, dict<str, float>)>): The path of each picture and its\
+                    value for some of Picture.QUALITY_FIELDS, None if it could not be\
+                    decoded. Pictures not in the model anymore are ignored.
+
+        Returns:
+            list<int>: The rows of the pictures found in the model
+        """
+        rows = []
+        for path, quality in qualities:
+            row = self.rowForPath(path)
+            if row == None:
+                continue
+            if quality == None:
+                quality = dict((field, Picture.UNREADABLE_QUALITY) \
+                    for field in Picture.QUALITY_FIELDS)
+            for field, value in quality.items():
+                self._store.set(row, field, value)
+            rows.append(row)
+        return rows
+
+    def flagBelowThreshold(self, thresholds, rows = None, transition = DISCARD):
+        """
+        Change the status of the pictures whose image quality is below a threshold, e.g.
+        to discard blurred or badly exposed shots before a reconstruction. Pictures
+        whose quality is unknown are left unchanged.
+
+        Args:
+            thresholds (dict<str, float>): The lowest accepted value of some of\
+                    Picture.QUALITY_FIELDS
+            rows       (list<int>): The rows of the pictures to check, all pictures if None
+            transition (dict<int, int>): The new status per current status, see\
+                    setStatuses
+
+        Returns:
+            int: The number of pictures whose status changed
+        """
+        rows = range(len(self._store)) if rows == None else rows
+        # Unknown values are NaN, which are never below a threshold
+        columns = [ (self._store.column(field), threshold) \
+            for field, threshold in thresholds.items() ]
+        flagged = [ row for row in rows \
+            if any(column[row] < threshold for column, threshold in columns) ]
+        return self.setStatuses(flagged, transition) if len(flagged) > 0 else 0
+
+    @property
+    def sortKey(self):
+        """
+        Returns:
+            str: The key the pictures are kept sorted by, None if they are ordered by hand
+        """
+        return self._sortKey
+
+    def sortBy(self, key, descending = False):
+        """
+        Sort the pictures, and keep them sorted as they are added or change. The numeric
+        key of each picture is computed once from the typed columns, and pictures are
+        reordered with a single layout change: Qt never compares pictures itself.
+
+        Pictures whose key is unknown (no date, no coordinates, missing file) come
+        last, or first when sorting in descending order. Distances are computed from
+        the center of the scene at the time of the call.
+
+        Args:
+            key        (str): One of SORT_KEYS, None to keep the current order and stop\
+                    sorting new or changed pictures
+            descending (bool): Sort in descending order
+
+        Returns:
+            bool: True if the key is known
+        """
+        if key != None and not key in self.SORT_KEYS:
+            return False
+        self._sortKey, self._sortDescending = key, descending
+        if key == None:
+            return True
+        if key == 'distance':
+            self._sortCenter = self._store.center(range(self.STATUS_COUNT))
+        rows = range(len(self._store))
+        values = self._sortValues(rows)
+        self._permute(sorted(rows, key=values.__getitem__, reverse=descending))
+        if key == 'name':
+            self._rankNames()
+        else:
+            self._store.setSortKeys(sorted(values, reverse=descending))
+        return True
+
+    def orderAlongCapturePath(self, timeLimit = 0.8):
+        """
+        Order the pictures along the path of the photographer, so that pictures taken
+        close to each other follow each other, and stop sorting them. Pictures are
+        reordered with a single layout change.
+
+        Args:
+            timeLimit (float): Seconds after which the path stops being shortened
+
+        Returns:
+            bool: True if the order changed
+        """
+        self._sortKey = None
+        order = capturePathOrder(self._store.column('latitude'), \
+            self._store.column('longitude'), self._store.column('date'), timeLimit)
+        if order == list(range(len(order))):
+            return False
+        self._permute(order)
+        return True
+
+    def _sortValues(self, rows):
+        """
+        Compute the sort values of rows for the current key: numbers, infinite if
+        unknown, except for names which are compared as strings
+
+        Returns:
+            list: The values, in the same order as rows
+        """
+        store = self._store
+        if self._sortKey == 'name':
+            return [ store.name(row) for row in rows ]
+        if self._sortKey == 'date':
+            date = store.column('date')
+            return [ float(date[row]) if date[row] != 0 else math.inf for row in rows ]
+        if self._sortKey == 'status':
+            status = store.column('status')
+            return [ float(status[row]) for row in rows ]
+        if self._sortKey == 'size':
+            def size(row):
+                try:
+                    return float(os.path.getsize(store.get(row, 'path')))
+                except OSError:
+                    return math.inf
+            return [ size(row) for row in rows ]
+        # Distance, with an equirectangular projection around the center
+        latitude = store.column('latitude'); longitude = store.column('longitude')
+        if self._sortCenter == None:
+            return [ math.inf for row in rows ]
+        centerLatitude, centerLongitude = self._sortCenter
+        scale = math.cos(math.radians(centerLatitude))
+        def distance(row):
+            if latitude[row] == 0.0 and longitude[row] == 0.0:
+                return math.inf
+            return math.hypot(latitude[row] - centerLatitude, \
+                (longitude[row] - centerLongitude) * scale)
+        return [ distance(row) for row in rows ]
+
+    def _rankNames(self):
+        """
+        Use the position of each picture as the numeric key of its name, once sorted
+        """
+        count = len(self._store)
+        self._store.setSortKeys(range(count - 1, -1, -1) if self._sortDescending \
+            else range(count))
+
+    def _sortRolesChanged(self, rows, roles):
+        """
+        Move the changed rows where they belong, if the changed roles affect the order
+        """
+        if self._sortKey != None and \
+            any(role in self._SORT_ROLES[self._sortKey] for role in roles):
+            self._keepSorted(rows)
+
+    def _keepSorted(self, rows):
+        """
+        Put rows which have been added or changed back in order, the other rows being
+        sorted already. A single row is moved to its place, found by binary search.
+        Several rows are sorted on their own, placed among the other rows by binary
+        search, and reordered with a single layout change.
+
+        Args:
+            rows (iterable<int>): The added or changed rows
+        """
+        if self._sortKey == None:
+            return
+        rows = sorted(set(rows))
+        if len(rows) == 0:
+            return
+        values = self._sortValues(rows)
+        if self._sortKey != 'name':
+            self._store.setSortKeys(values, rows)
+            sequence = self._store.column('sortKey')
+        else:
+            sequence = self._store.names()
+        descending = self._sortDescending
+        before = (lambda a, b: a > b) if descending else (lambda a, b: a < b)
+
+        if len(rows) == 1:
+            row, value = rows[0], values[0]
+            if row > 0 and before(value, sequence[row - 1]):
+                destination = self._position(sequence, value, 0, row, before)
+            elif row < len(sequence) - 1 and before(sequence[row + 1], value):
+                destination = self._position(sequence, value, row + 1, len(sequence), before)
+            else:
+                destination = row
+            if destination != row:
+                self.moveRows(QModelIndex(), row, 1, QModelIndex(), destination)
+        else:
+            changed = set(rows)
+            others = [ row for row in range(len(sequence)) if not row in changed ]
+            otherValues = [ sequence[row] for row in others ]
+            # Rows are inserted in order, each one after the previous
+            order = []; start = 0
+            for row in sorted(rows, key=sequence.__getitem__, reverse=descending):
+                position = self._position(otherValues, sequence[row], start, len(others), before)
+                order.extend(others[start:position])
+                order.append(row)
+                start = position
+            order.extend(others[start:])
+            if order != list(range(len(order))):
+                self._permute(order)
+        if self._sortKey == 'name':
+            self._rankNames()
+
+    @staticmethod
+    def _position(sequence, value, low, high, before):
+        """
+        Binary search in a sorted part of a sequence
+
+        Args:
+            sequence (sequence): The values, sorted between low and high
+            value    (?): The value to place
+            low      (int): The first position to search
+            high     (int): The position after the last one to search
+            before   (function): Tells whether a value sorts before another one
+
+        Returns:
+            int: The first position whose value sorts after value, high if none
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if before(value, sequence[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _permute(self, order):
+        """
+        Reorder all rows with a single layout change
+
+        Args:
+            order (list<int>): The current row of each new row
+        """
+        self.layoutAboutToBeChanged.emit()
+        newRows = [0] * len(order)
+        for newRow, row in enumerate(order):
+            newRows[row] = newRow
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(persistent, \
+            [ self.index(newRows[index.row()]) for index in persistent ])
+        self._store.permute(order)
+        self.layoutChanged.emit()
+
     def thumbnails(self):
-        return [p for p in self._data if p.status==PictureState.THUMBNAIL]
+        return [ Picture.view(self._store, row) for row in self.rowsWithStatus([PictureState.THUMBNAIL]) ]
     
     def removeDiscardedThumbnails(self):
-        for i in range(0,self.rowCount()):
-            if self._data[self.rowCount()-i-1].status == PictureState.THUMBNAIL_DISCARDED :
-                del self._data[self.rowCount()-i-1]
+        self.removeAll(self.rowsWithStatus([PictureState.THUMBNAIL_DISCARDED]))
+
+    def picturesWithoutMetadata(self):
+        """
+        Returns:
+            list<Picture>: The pictures none of whose Picture.METADATA_FIELDS is known,\
+                    e.g. loaded from a save older than these fields
+        """
+        get = self._store.get
+        return [ Picture.view(self._store, row) for row in range(len(self._store)) \
+            if all(get(row, field) == None for field in Picture.METADATA_FIELDS) ]
 
-    def populate(self, picturesFiles, status = PictureState.NEW):
+    def setMetadataCache(self, metadataCache):
+        """
+        Set the persistent cache used to avoid parsing the EXIF data of known files again
+
+        Args:
+            metadataCache (MetadataCache): The cache of the current scene, may be None
+        """
+        self._metadataCache = metadataCache
+
+    def populate(self, picturesFiles, status = PictureState.NEW, chunkSize = None):
         """
         Populate the model, i.e. add instance of pictures element. Element are added
         with the status "NEW"
 
+        EXIF data are read by chunks, from the metadata cache first, then by the in-process
+        JPEG reader, and exiftool for other formats. Each chunk is inserted in the model
+        with a single row-range notification.
+
+        Args:
+            picturesFiles   (list<str>) : List of path to the different pictures
+            status          (int) : The initial status to assign to the item
+            chunkSize       (int) : Number of files read per chunk, default is\
+                    POPULATE_CHUNK_SIZE
+        """
+        startTime = time.time()
+        reader = MetadataReader(self.METADATA_TAGS, self._metadataCache)
+        for pictures in self.streamPictures(picturesFiles, status, chunkSize, reader):
+            self.addAll(pictures)
+
+        elapsed = max(time.time() - startTime, 1e-6)
+        print("Populated " + str(len(picturesFiles)) + " pictures in " + \
+            "{:.2f}s ({:.1f} pictures/s, {})".format(\
+                elapsed, len(picturesFiles) / elapsed, reader.summary()))
+
+    def streamPictures(self, picturesFiles, status = PictureState.NEW, chunkSize = None, \
+        reader = None):
+        """
+        Build the pictures of a list of files, chunk by chunk, without adding them to the
+        model. It does not touch the model, hence may run on another thread than the
+        model's one.
+
         Args:
             picturesFiles   (list<str>) : List of path to the different pictures
             status          (int) : The initial status to assign to the item
+            chunkSize       (int) : Number of files read per chunk, default is\
+                    POPULATE_CHUNK_SIZE
+            reader          (MetadataReader) : The reader to use, a new one by default
+
+        Yields:
+            list<Picture>: The pictures of the next chunk of files, ready to be added
+        """
+        chunkSize = chunkSize or self.POPULATE_CHUNK_SIZE
+        reader = reader or MetadataReader(self.METADATA_TAGS, self._metadataCache)
+        for first in range(0, len(picturesFiles), chunkSize):
+            chunk = picturesFiles[first:first + chunkSize]
+            exifData = reader.read(chunk)
+            yield [ self._createPicture(url, exifData.get(url, {}), status) for url in chunk ]
+
+    def refreshMetadata(self, pictures = None):
+        """
+        Read again the metadata of pictures of the model, in bulk from the metadata
+        cache. Only the files missing from the cache are parsed again.
+
+        Args:
+            pictures (list<Picture>): The pictures to refresh, all pictures by default
+        """
+        pictures = pictures if pictures != None else \
+            [ Picture.view(self._store, row) for row in range(len(self._store)) ]
+        if len(pictures) == 0:
+            return
+        reader = MetadataReader(self.METADATA_TAGS, self._metadataCache)
+        exifData = reader.read([ p.path for p in pictures ])
+        for picture in pictures:
+            if picture.path in exifData:
+                for field, value in self._metadata(exifData[picture.path]).items():
+                    setattr(picture, field, value)
+        self.dataChanged.emit(self.index(0), self.index(len(self._store) - 1), \
+            [self.LATITUDE_ROLE, self.LONGITUDE_ROLE, self.DATE_ROLE])
+        self._sortRolesChanged(range(len(self._store)), \
+            [self.LATITUDE_ROLE, self.LONGITUDE_ROLE, self.DATE_ROLE])
+        print("Refreshed metadata of " + str(len(pictures)) + " pictures (" + \
+            reader.summary() + ")")
+
+    @staticmethod
+    def _coordinates(exifData):
+        """
+        Extract the GPS coordinates from EXIF data
+
+        Args:
+            exifData    (dict) : The EXIF tags read for a file
+
+        Returns:
+            (float, float): The latitude and the longitude, 0.0 if unknown
+        """
+        if not ('EXIF:GPSLatitude' in exifData and 'EXIF:GPSLongitude' in exifData):
+            #May raise an error if no GPS data ?
+            return 0.0, 0.0
+        # Coordinates are unsigned in EXIF, the hemisphere is given by the reference tags
+        latitude = abs(float(exifData['EXIF:GPSLatitude']))
+        longitude = abs(float(exifData['EXIF:GPSLongitude']))
+        if exifData.get('EXIF:GPSLatitudeRef') == 'S': latitude = -latitude
+        if exifData.get('EXIF:GPSLongitudeRef') == 'W': longitude = -longitude
+        return latitude, longitude
+
+    @staticmethod
+    def _metadata(exifData):
+        """
+        Convert EXIF data to the typed fields of a picture
+
+        Args:
+            exifData    (dict) : The EXIF tags read for a file
+
+        Returns:
+            dict<str, ?>: The value of each field of Picture, None if unknown
+        """
+        def typed(tag, kind):
+            try:
+                return kind(exifData[tag]) if tag in exifData else None
+            except (TypeError, ValueError):
+                return None
+
+        fields = dict()
+        fields['latitude'], fields['longitude'] = PictureModel._coordinates(exifData)
+        fields['date'] = None
+        try:
+            # The camera clock has no time zone, it is taken as UTC to get a timestamp
+            fields['date'] = calendar.timegm(time.strptime(\
+                str(exifData['EXIF:DateTimeOriginal']).strip(), "%Y:%m:%d %H:%M:%S"))
+        except (KeyError, ValueError, OverflowError):
+            pass
+        fields['altitude'] = typed('EXIF:GPSAltitude', float)
+        if fields['altitude'] != None and typed('EXIF:GPSAltitudeRef', int) == 1:
+            # Below sea level
+            fields['altitude'] = -abs(fields['altitude'])
+        fields['focalLength'] = typed('EXIF:FocalLength', float)
+        fields['focalLength35mm'] = typed('EXIF:FocalLengthIn35mmFormat', float)
+        fields['make'] = typed('EXIF:Make', str)
+        fields['model'] = typed('EXIF:Model', str)
+        fields['orientation'] = typed('EXIF:Orientation', int)
+        # The frame header is authoritative, the EXIF dimensions may be missing or stale
+        fields['width'] = typed('File:ImageWidth', int) or typed('EXIF:ExifImageWidth', int)
+        fields['height'] = typed('File:ImageHeight', int) or typed('EXIF:ExifImageHeight', int)
+        return fields
+
+    def _createPicture(self, url, exifData, status):
+        """
+        Build a picture from its EXIF data
+
+        Args:
+            url         (str) : Path to the picture file
+            exifData    (dict) : The EXIF tags read for that file
+            status      (int) : The initial status to assign to the item
+
+        Returns:
+            Picture: The new picture
         """
-        with exiftool.ExifTool() as exifparser:
-            for url in picturesFiles:
-                print(url)
-                # Get EXIF data
-                exifData = exifparser.get_tags(\
-                    ['EXIF:GPSLatitude', 'EXIF:GPSLongitude'], url)
-                if not ('EXIF:GPSLatitude' in exifData):
-                    #May raise an error if no GPS data ?
-                    exifData['EXIF:GPSLatitude'] = "0.0"
-                    exifData['EXIF:GPSLongitude'] = "0.0"
-
-                self.add(Picture(self._resourcesPath, url, \
-                    str(exifData['EXIF:GPSLatitude']), str(exifData['EXIF:GPSLongitude']), \
-                        status = status))
+        return Picture(self._resourcesPath, url, status = status, **self._metadata(exifData))
 
     def validFiles(self):
         """
@@ -473,15 +1456,16 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
         Returns:
             list<Picture>: The list of all valid pictures in that model
         """
-        return [ p for p in self._data if p.status in [PictureState.NEW, PictureState.PROCESSED] ]
+        return [ Picture.view(self._store, row) \
+            for row in self.rowsWithStatus([PictureState.NEW, PictureState.PROCESSED]) ]
 
     def serialize(self):
         """ Serialize a pictureModel object.
         """
         serial = dict()
         serial['pictures'] = []
-        for picture in self._data:
-            serial['pictures'].append(picture.serialize())
+        for row in range(len(self._store)):
+            serial['pictures'].append(Picture.view(self._store, row).serialize())
         serial['resourcesPath'] = self._resourcesPath
         return serial
 
@@ -493,9 +1477,12 @@ class PictureModel(QAbstractListModel, metaclass=MetaPictureModel):
             serial (dict()): The serialized version of a pictureModel object.
         """
         pictureModel = PictureModel(serial['resourcesPath'])
-        for picture in serial['pictures']:
-            pictureModel.add(Picture(serial['resourcesPath'], picture['path'],\
-                picture['latitude'], picture['longitude'], picture['date'], picture['status']))
+        # Metadata and quality fields missing from older saves are left unknown
+        pictureModel.addAll([ Picture(serial['resourcesPath'], picture['path'],\
+            picture['latitude'], picture['longitude'], picture['date'], picture['status'], \
+                **dict((field, picture.get(field)) for field in \
+                    Picture.METADATA_FIELDS + Picture.QUALITY_FIELDS)) \
+                    for picture in serial['pictures'] ])
 
         return pictureModel
 
@@ -0,0 +1,473 @@
+import os
+from array import array
+from itertools import compress
+
+# Value of unknown floating point fields
+_UNKNOWN = float("nan")
+
+def _toFloat(value):
+    return _UNKNOWN if value == None else float(value)
+
+def _fromFloat(value):
+    # NaN is the only value different from itself
+    return None if value != value else value
+
+def _toInt(value):
+    return 0 if value == None else int(value)
+
+def _fromInt(value):
+    return value or None
+
+class StringTable(object):
+    """
+    A table of interned strings: each distinct string is stored once, and referred to
+    by its index. The index 0 stands for None.
+    """
+    def __init__(self):
+        self._strings = [None]
+        self._indexes = {None: 0}
+
+    def index(self, string):
+        """
+        Returns:
+            int: The index of string, added to the table if needed
+        """
+        index = self._indexes.get(string)
+        if index == None:
+            index = len(self._strings)
+            self._strings.append(string)
+            self._indexes[string] = index
+        return index
+
+    def __getitem__(self, index):
+        return self._strings[index]
+
+    def __len__(self):
+        return len(self._strings)
+
+class PictureStore(object):
+    """
+    The pictures of a model, stored as a struct of arrays: one typed column per field
+    instead of one object per picture. Paths are split in an interned directory and a
+    file name, camera makes and models are interned as well.
+
+    Unknown values are stored as NaN for floating point fields, and 0 for integer and
+    interned fields; they are read back as None. Unknown coordinates are 0.0.
+
+    Each row is given a key which is kept while the row moves, so that a picture can
+    be found again after rows have been inserted or removed before it. The keys of the
+    pictures of each file name are indexed, so that pictures are found by name or path
+    without visiting the rows.
+
+    The number of pictures per status is kept up to date on every change, as well as
+    the sum of the coordinates and the bounding box of the geotagged pictures of each
+    status, so that the center and the extent of any set of statuses are computed
+    without visiting the rows. A bounding box whose edge is removed is recomputed the
+    next time it is needed.
+
+    Attributes:
+        resourcesPath (str): Path to the resources folder of the application
+    """
+    # Fields of a picture, as named on Picture and in the model roles
+    FIELDS = ['path', 'status', 'latitude', 'longitude', 'date', 'altitude', \
+        'focalLength', 'focalLength35mm', 'make', 'model', 'width', 'height', 'orientation', \
+        'sharpness', 'exposure', 'texture']
+    # Typed columns: type code, conversion from and to the Python value
+    _COLUMNS = {
+        'status': ('b', int, int),
+        'latitude': ('d', float, float),
+        'longitude': ('d', float, float),
+        'date': ('q', _toInt, _fromInt),
+        'altitude': ('d', _toFloat, _fromFloat),
+        'focalLength': ('d', _toFloat, _fromFloat),
+        'focalLength35mm': ('d', _toFloat, _fromFloat),
+        'width': ('i', _toInt, _fromInt),
+        'height': ('i', _toInt, _fromInt),
+        'orientation': ('b', _toInt, _fromInt),
+        'sharpness': ('d', _toFloat, _fromFloat),
+        'exposure': ('d', _toFloat, _fromFloat),
+        'texture': ('d', _toFloat, _fromFloat),
+    }
+    # Interned columns, the directory being the one of the path
+    _INTERNED = ['directory', 'make', 'model']
+
+    def __init__(self, resourcesPath):
+        self.resourcesPath = resourcesPath
+        self._columns = dict((field, array(self._COLUMNS[field][0])) for field in self._COLUMNS)
+        self._tables = dict((field, StringTable()) for field in self._INTERNED)
+        for field in self._INTERNED:
+            self._columns[field] = array('i')
+        # Numeric key of each row for the current sort, see setSortKeys
+        self._columns['sortKey'] = array('d')
+        self._names = []
+        self._keys = array('q')
+        self._nextKey = 0
+        # Row of each key, rebuilt on demand after rows are removed or reordered
+        self._rows = None
+        # Key of the picture of each file name, or list of keys if several pictures
+        # share the name
+        self._keysByName = dict()
+        self._statusCounts = dict()
+        # Per status: number of geotagged pictures, sum of latitudes and of longitudes
+        self._coordinateSums = dict()
+        # Per status: [south, west, north, east], None if empty, missing if outdated
+        self._bounds = dict()
+
+    def __len__(self):
+        return len(self._names)
+
+    def column(self, field):
+        """
+        Direct access to a typed column, which must not be modified
+
+        Args:
+            field (str): A field which is neither the path, the make or the model
+
+        Returns:
+            array: The stored values, see the class documentation for unknown values
+        """
+        return self._columns[field]
+
+    def names(self):
+        """
+        Direct access to the file names, which must not be modified
+
+        Returns:
+            list<str>: The file name of each row
+        """
+        return self._names
+
+    def statusCount(self, status):
+        """
+        Returns:
+            int: The number of pictures having a status
+        """
+        return self._statusCounts.get(status, 0)
+
+    def _count(self, statuses, latitudes, longitudes, delta):
+        """
+        Add (delta = 1) or remove (delta = -1) pictures from the per status aggregates
+        """
+        for status, latitude, longitude in zip(statuses, latitudes, longitudes):
+            self._statusCounts[status] = self._statusCounts.get(status, 0) + delta
+            if latitude == 0.0 and longitude == 0.0:
+                continue
+            if not status in self._coordinateSums:
+                # The box of a status never seen is empty, not outdated
+                self._bounds[status] = None
+            sums = self._coordinateSums.setdefault(status, [0, 0.0, 0.0])
+            sums[0] += delta; sums[1] += delta * latitude; sums[2] += delta * longitude
+            if not status in self._bounds:
+                continue
+            bounds = self._bounds[status]
+            if delta > 0 and bounds == None:
+                self._bounds[status] = [latitude, longitude, latitude, longitude]
+            elif delta > 0:
+                bounds[0] = min(bounds[0], latitude); bounds[1] = min(bounds[1], longitude)
+                bounds[2] = max(bounds[2], latitude); bounds[3] = max(bounds[3], longitude)
+            elif sums[0] == 0:
+                self._bounds[status] = None
+            elif latitude in (bounds[0], bounds[2]) or longitude in (bounds[1], bounds[3]):
+                del self._bounds[status]
+
+    def _countRows(self, rows, delta):
+        columns = self._columns
+        self._count([ columns['status'][row] for row in rows ], \
+            [ columns['latitude'][row] for row in rows ], \
+            [ columns['longitude'][row] for row in rows ], delta)
+
+    def geotaggedCount(self, statuses):
+        """
+        Returns:
+            int: The number of pictures having coordinates among the given statuses
+        """
+        return sum(self._coordinateSums.get(status, [0])[0] for status in statuses)
+
+    def center(self, statuses):
+        """
+        The mean coordinates of the geotagged pictures having one of the given statuses
+
+        Args:
+            statuses (iterable<int>): The statuses to consider
+
+        Returns:
+            (float, float): The latitude and the longitude, None if no picture has\
+                    coordinates
+        """
+        count = 0; latitude = 0.0; longitude = 0.0
+        for status in statuses:
+            sums = self._coordinateSums.get(status)
+            if sums != None:
+                count += sums[0]; latitude += sums[1]; longitude += sums[2]
+        if count == 0:
+            return None
+        return latitude / count, longitude / count
+
+    def bounds(self, statuses):
+        """
+        The bounding box of the geotagged pictures having one of the given statuses
+
+        Args:
+            statuses (iterable<int>): The statuses to consider
+
+        Returns:
+            (float, float, float, float): The south, west, north and east edges, None\
+                    if no picture has coordinates
+        """
+        statuses = list(statuses)
+        self._updateBounds([ status for status in statuses \
+            if not status in self._bounds and self.geotaggedCount([status]) > 0 ])
+        boxes = [ self._bounds[status] for status in statuses \
+            if self._bounds.get(status) != None ]
+        if len(boxes) == 0:
+            return None
+        return min(b[0] for b in boxes), min(b[1] for b in boxes), \
+            max(b[2] for b in boxes), max(b[3] for b in boxes)
+
+    def _updateBounds(self, statuses):
+        """
+        Recompute the bounding boxes of some statuses, in a single pass over the rows
+        """
+        if len(statuses) == 0:
+            return
+        for status in statuses:
+            self._bounds[status] = None
+        columns = self._columns
+        for status, latitude, longitude in \
+            zip(columns['status'], columns['latitude'], columns['longitude']):
+            if not status in statuses or (latitude == 0.0 and longitude == 0.0):
+                continue
+            bounds = self._bounds[status]
+            if bounds == None:
+                self._bounds[status] = [latitude, longitude, latitude, longitude]
+            else:
+                bounds[0] = min(bounds[0], latitude); bounds[1] = min(bounds[1], longitude)
+                bounds[2] = max(bounds[2], latitude); bounds[3] = max(bounds[3], longitude)
+
+    def key(self, row):
+        """
+        Returns:
+            int: The key of a row
+        """
+        return self._keys[row]
+
+    def row(self, key):
+        """
+        Returns:
+            int: The current row of a key, None if it has been removed
+        """
+        if self._rows == None:
+            self._rows = dict((key, row) for row, key in enumerate(self._keys))
+        return self._rows.get(key)
+
+    def rowsForName(self, name):
+        """
+        Returns:
+            list<int>: The rows of the pictures of a file name, in any order
+        """
+        keys = self._keysByName.get(name, ())
+        if isinstance(keys, int):
+            return [self.row(keys)]
+        return [ self.row(key) for key in keys ]
+
+    def rowForPath(self, path):
+        """
+        Returns:
+            int: The row of a picture of a path, None if there is none
+        """
+        directory, name = os.path.split(path)
+        for row in self.rowsForName(name):
+            if self._tables['directory'][self._columns['directory'][row]] == directory:
+                return row
+        return None
+
+    def _indexNames(self, names, keys, add):
+        """
+        Add or remove the keys of pictures from the index of the file names
+        """
+        index = self._keysByName
+        for name, key in zip(names, keys):
+            nameKeys = index.get(name)
+            if add:
+                if nameKeys == None:
+                    index[name] = key
+                elif isinstance(nameKeys, int):
+                    index[name] = [nameKeys, key]
+                else:
+                    nameKeys.append(key)
+            elif isinstance(nameKeys, int):
+                del index[name]
+            else:
+                nameKeys.remove(key)
+                if len(nameKeys) == 1:
+                    index[name] = nameKeys[0]
+
+    def name(self, row):
+        """
+        Returns:
+            str: The file name of the picture of a row
+        """
+        return self._names[row]
+
+    def get(self, row, field):
+        """
+        Read a field of a row
+
+        Args:
+            row   (int): The row
+            field (str): One of FIELDS, or 'name'
+
+        Returns:
+            The value of the field, None if unknown
+        """
+        if field == 'name':
+            return self._names[row]
+        if field == 'path':
+            return os.path.join(self._tables['directory'][self._columns['directory'][row]], \
+                self._names[row])
+        if field in self._tables:
+            return self._tables[field][self._columns[field][row]]
+        return self._COLUMNS[field][2](self._columns[field][row])
+
+    def set(self, row, field, value):
+        """
+        Write a field of a row
+
+        Args:
+            row   (int): The row
+            field (str): One of FIELDS
+            value (?): The new value, None if unknown
+        """
+        if field == 'path':
+            self._indexNames([self._names[row]], [self._keys[row]], False)
+            directory, self._names[row] = os.path.split(value)
+            self._indexNames([self._names[row]], [self._keys[row]], True)
+            self._columns['directory'][row] = self._tables['directory'].index(directory)
+        elif field in self._tables:
+            self._columns[field][row] = self._tables[field].index(value)
+        elif field in ('status', 'latitude', 'longitude'):
+            # Move the picture from an aggregate to another
+            self._countRows([row], -1)
+            self._columns[field][row] = self._COLUMNS[field][1](value)
+            self._countRows([row], 1)
+        else:
+            self._columns[field][row] = self._COLUMNS[field][1](value)
+
+    def insert(self, row, pictures):
+        """
+        Insert pictures before a row. Their values are copied, the pictures are left
+        untouched.
+
+        Args:
+            row      (int): The row of the first inserted picture
+            pictures (list<Picture>): The pictures to insert, or any object with an\
+                    attribute per field
+        """
+        values = dict((field, []) for field in self._columns)
+        names = []
+        for picture in pictures:
+            directory, name = os.path.split(picture.path)
+            names.append(name)
+            values['directory'].append(self._tables['directory'].index(directory))
+            for field in ('make', 'model'):
+                values[field].append(self._tables[field].index(getattr(picture, field)))
+            for field, (_, convert, _) in self._COLUMNS.items():
+                values[field].append(convert(getattr(picture, field)))
+        values['sortKey'] = [_UNKNOWN] * len(names)
+        for field, column in self._columns.items():
+            column[row:row] = array(column.typecode, values[field])
+        self._count(values['status'], values['latitude'], values['longitude'], 1)
+        self._names[row:row] = names
+        keys = range(self._nextKey, self._nextKey + len(names))
+        self._nextKey += len(names)
+        if self._rows != None and row == len(self._keys):
+            # Appending does not move other rows
+            self._rows.update((key, row + i) for i, key in enumerate(keys))
+        else:
+            self._rows = None
+        self._keys[row:row] = array('q', keys)
+        self._indexNames(names, keys, True)
+
+    def remove(self, row, count):
+        """
+        Remove contiguous rows
+
+        Args:
+            row   (int): The first row to remove
+            count (int): The number of rows to remove
+        """
+        self._countRows(range(row, row + count), -1)
+        self._indexNames(self._names[row:row + count], self._keys[row:row + count], False)
+        for column in self._columns.values():
+            del column[row:row + count]
+        del self._names[row:row + count]
+        del self._keys[row:row + count]
+        self._rows = None
+
+    def removeAll(self, rows):
+        """
+        Remove several rows in a single pass over the columns
+
+        Args:
+            rows (iterable<int>): The rows to remove, in any order
+        """
+        removed = set(rows)
+        keep = [ not row in removed for row in range(len(self._names)) ]
+        self._countRows(removed, -1)
+        self._indexNames([ self._names[row] for row in removed ], \
+            [ self._keys[row] for row in removed ], False)
+        for field, column in self._columns.items():
+            self._columns[field] = array(column.typecode, compress(column, keep))
+        self._names = list(compress(self._names, keep))
+        self._keys = array('q', compress(self._keys, keep))
+        self._rows = None
+
+    def setSortKeys(self, keys, rows = None):
+        """
+        Write the numeric sort key of rows, read back through column('sortKey')
+
+        Args:
+            keys (iterable<float>): The keys, in the same order as rows
+            rows (iterable<int>): The rows, all rows if None
+        """
+        if rows == None:
+            self._columns['sortKey'] = array('d', keys)
+            return
+        column = self._columns['sortKey']
+        for row, key in zip(rows, keys):
+            column[row] = key
+
+    def permute(self, order):
+        """
+        Reorder all rows at once
+
+        Args:
+            order (list<int>): The current row of each new row
+        """
+        for field, column in self._columns.items():
+            self._columns[field] = array(column.typecode, map(column.__getitem__, order))
+        self._names = [ self._names[row] for row in order ]
+        self._keys = array('q', map(self._keys.__getitem__, order))
+        self._rows = None
+
+    def move(self, row, count, destination):
+        """
+        Move contiguous rows. Values are moved by slices, other rows keep their order.
+
+        Args:
+            row         (int): The first row to move
+            count       (int): The number of rows to move
+            destination (int): The row before which the rows are put, numbered before\
+                    the move (as in QAbstractItemModel.moveRows)
+        """
+        if destination > row:
+            destination -= count
+        for column in list(self._columns.values()) + [self._names, self._keys]:
+            moved = column[row:row + count]
+            del column[row:row + count]
+            column[destination:destination] = moved
+        if self._rows != None:
+            # Only the rows between the old and the new place of the block move
+            first, last = min(row, destination), max(row, destination) + count
+            for shifted in range(first, last):
+                self._rows[self._keys[shifted]] = shifted
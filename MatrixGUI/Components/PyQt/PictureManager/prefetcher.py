@@ -0,0 +1,229 @@
+from PyQt5.QtCore import *
+from capturePath import PointGrid, project
+import threading
+
+class _PlaceIndex(object):
+    """
+    The geotagged pictures of a PictureModel on a PointGrid, to find the pictures
+    taken close to a picture. Pictures are known by their key in the store, so that
+    moving rows does not invalidate the index.
+    """
+    # Meters around a picture, farther pictures are not neighbours
+    MAX_DISTANCE = 200.0
+
+    def __init__(self, store):
+        latitudes, longitudes = store.column('latitude'), store.column('longitude')
+        rows = [ row for row in range(len(store)) \
+            if latitudes[row] != 0.0 or longitudes[row] != 0.0 ]
+        self._keys = [ store.key(row) for row in rows ]
+        self._points = dict((key, point) for point, key in enumerate(self._keys))
+        self._grid = None
+        if len(rows) > 0:
+            xs, ys = project([ latitudes[row] for row in rows ], \
+                [ longitudes[row] for row in rows ])
+            self._grid = PointGrid(xs, ys)
+
+    def nearest(self, key, count, accept):
+        """
+        Find the pictures closest to a picture, up to MAX_DISTANCE meters away
+
+        Args:
+            key    (int): The key of the picture in the store
+            count  (int): The number of pictures to find
+            accept (function<int, bool>): Whether a picture, given by its key, may be\
+                    returned
+
+        Returns:
+            list<int>: The keys of the closest pictures, nearest first
+        """
+        point = self._points.get(key)
+        if point == None or count <= 0:
+            return []
+        keys = self._keys
+        return [ keys[p] for p in self._grid.nearest(point, count, self.MAX_DISTANCE, \
+            lambda p: accept(keys[p])) ]
+
+class _PrefetchJob(QRunnable):
+    """
+    Load a preview in a thread of the pool of the thumbnail provider, unless it has
+    been cancelled before starting
+    """
+    def __init__(self, prefetcher, path, size, cancelled):
+        super(_PrefetchJob, self).__init__()
+        self.prefetcher, self.path, self.size, self.cancelled = \
+            prefetcher, path, size, cancelled
+
+    def run(self):
+        try:
+            if not self.cancelled.is_set():
+                image = self.prefetcher.provider.preview(self.path, self.size)
+                if not image.isNull():
+                    self.prefetcher.previewBytes = image.sizeInBytes()
+        except Exception as e:
+            print("Can not prefetch a preview of " + self.path + ": " + str(e))
+        finally:
+            self.prefetcher._finished(self.path, self.cancelled)
+
+class Prefetcher(QObject):
+    """
+    Load the previews of the pictures the user is likely to look at next, so that
+    the viewer finds them in memory: the ROW_COUNT pictures before and after the
+    focused picture in the order of the manager, and its MAP_COUNT nearest neighbours
+    on the map, among the pictures accepted by the status filter.
+
+    Previews are loaded by the pool of the thumbnail provider with a lower priority
+    than the previews requested by the views. When the focus moves, the previews that
+    are not wanted anymore and did not start yet are cancelled. The pictures are
+    ordered by likelihood, alternating next, previous and nearest pictures, and only
+    as many as fit in MEMORY_BUDGET are prefetched.
+
+    Attributes:
+        provider     (ThumbnailProvider): The provider loading and caching previews
+        previewBytes (int): The size in memory of the last prefetched preview, to\
+                estimate how many previews fit in the budget
+    """
+    ROW_COUNT = 4
+    MAP_COUNT = 4
+    # Bytes of prefetched previews, at most half of the cache of the provider so that
+    # prefetching never drops the focused preview
+    MEMORY_BUDGET = 48 * 1024 * 1024
+    # Priority of the prefetched previews in the pool of the provider
+    PRIORITY = -1
+
+    def __init__(self, provider, manager = None, parent = None):
+        """
+        Args:
+            provider (ThumbnailProvider): The provider loading and caching previews
+            manager  (PictureManager): The pictures the viewer steps through
+            parent   (QObject): Parent Element
+        """
+        super(Prefetcher, self).__init__(parent)
+        self.provider = provider
+        self.previewBytes = 0
+        self._manager = None
+        self._source = None
+        # Index of the geotagged pictures, built when first needed
+        self._places = None
+        # Cancellation flag of each pending preview, by path
+        self._pending = dict()
+        self._lock = threading.Lock()
+        self.setManager(manager)
+
+    def setManager(self, manager):
+        """
+        Follow other pictures, cancelling the pending previews
+
+        Args:
+            manager (PictureManager): The pictures the viewer steps through
+        """
+        if self._source != None:
+            self._source.rowsInserted.disconnect(self._invalidate)
+            self._source.rowsRemoved.disconnect(self._invalidate)
+            self._source.modelReset.disconnect(self._invalidate)
+            self._source.dataChanged.disconnect(self._dataChanged)
+        self.cancel()
+        self._manager = manager
+        self._source = manager.sourceModel() if manager != None else None
+        self._places = None
+        if self._source != None:
+            self._source.rowsInserted.connect(self._invalidate)
+            self._source.rowsRemoved.connect(self._invalidate)
+            self._source.modelReset.connect(self._invalidate)
+            self._source.dataChanged.connect(self._dataChanged)
+
+    def _invalidate(self, *args):
+        self._places = None
+
+    def _dataChanged(self, topLeft, bottomRight, roles = []):
+        """
+        Drop the index of the places when the coordinates of pictures may have changed
+        """
+        moving = [self._source.LATITUDE_ROLE, self._source.LONGITUDE_ROLE, \
+            self._source.ITEM_ROLE]
+        if len(roles) == 0 or any(role in moving for role in roles):
+            self._places = None
+
+    def _sourceRow(self, row):
+        return self._manager.mapToSource(self._manager.index(row, 0)).row()
+
+    def targets(self, row, size):
+        """
+        List the pictures to prefetch around a picture, most likely first
+
+        Args:
+            row  (int): The row of the focused picture in the manager
+            size (int, int): The size of the previews
+
+        Returns:
+            list<str>: The paths of the pictures, the focused picture left out
+        """
+        manager = self._manager
+        if manager == None or row < 0 or row >= manager.rowCount():
+            return []
+        store = self._source._store
+        focused = self._sourceRow(row)
+        nearest = []
+        if self.MAP_COUNT > 0:
+            if self._places == None:
+                self._places = _PlaceIndex(store)
+            accepted = set(manager._acceptedStatuses())
+            status = store.column('status')
+            nearest = [ store.row(key) for key in self._places.nearest(store.key(focused), \
+                self.MAP_COUNT, lambda key: status[store.row(key)] in accepted) ]
+        rows = []
+        for step in range(max(self.ROW_COUNT, self.MAP_COUNT)):
+            if step < self.ROW_COUNT:
+                rows.extend(self._sourceRow(other) for other in (row + step + 1, row - step - 1) \
+                    if 0 <= other < manager.rowCount())
+            if step < len(nearest):
+                rows.append(nearest[step])
+        # As many previews as fit in the budget, estimated from the last one if any
+        width, height = size
+        previewBytes = self.previewBytes or 4 * width * (height or width * 3 // 4)
+        budget = min(self.MEMORY_BUDGET, self.provider.cache.maxBytes // 2)
+        paths = []
+        for sourceRow in rows:
+            path = store.get(sourceRow, 'path')
+            if sourceRow != focused and not path in paths:
+                paths.append(path)
+        return paths[:budget // max(previewBytes, 1)]
+
+    @pyqtSlot(int, int, int)
+    def focusOn(self, row, width, height):
+        """
+        Prefetch the previews around the focused picture of the viewer, and cancel the
+        pending previews not around it anymore
+
+        Args:
+            row    (int): The row of the focused picture in the manager
+            width  (int): The sourceSize of the previews of the viewer, 0 if not set
+            height (int): The sourceSize of the previews of the viewer, 0 if not set
+        """
+        size = self.provider._target(QSize(width, height))
+        paths = self.targets(row, size)
+        with self._lock:
+            for path in [ path for path in self._pending if not path in paths ]:
+                self._pending.pop(path).set()
+            started = [ (path, threading.Event()) for path in paths \
+                if not path in self._pending and not self.provider.isCached(path, size) ]
+            self._pending.update(started)
+        for path, cancelled in started:
+            self.provider.pool.start(_PrefetchJob(self, path, size, cancelled), self.PRIORITY)
+
+    @pyqtSlot()
+    def cancel(self):
+        """
+        Cancel the previews that did not start yet
+        """
+        with self._lock:
+            for cancelled in self._pending.values():
+                cancelled.set()
+            self._pending.clear()
+
+    def _finished(self, path, cancelled):
+        """
+        Forget a loaded or cancelled preview, called from the pool
+        """
+        with self._lock:
+            if self._pending.get(path) is cancelled:
+                del self._pending[path]
@@ -0,0 +1,232 @@
+import threading, time, os, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtCore import Qt, QObject, QThread, QSize, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage, QImageReader
+try:
+    import numpy
+except ImportError:
+    # The metrics are computed in pure Python, much slower
+    numpy = None
+
+# Long side of the decoded pictures, the metrics being only comparable at the same size
+SIZE = 512
+# Gray levels this close to black or white are clipped
+CLIP = 2
+# Lowest accepted quality, see PictureModel.flagBelowThreshold: the variance of the
+# Laplacian, the part of the pixels not clipped and the mean gradient magnitude, in gray
+# levels of the picture decoded at SIZE
+THRESHOLDS = {'sharpness': 50.0, 'exposure': 0.75, 'texture': 2.0}
+
+def _grayLevels(path):
+    """
+    Decode a picture scaled down to SIZE, in gray levels
+
+    Returns:
+        (bytes, int, int, int): The gray levels, line after line, the width, the height\
+                and the number of bytes per line. None if the picture can not be decoded.
+    """
+    reader = QImageReader(path)
+    size = reader.size()
+    if size.isValid():
+        factor = min(1.0, SIZE / float(max(size.width(), size.height())))
+        reader.setScaledSize(QSize(max(3, int(size.width() * factor)), \
+            max(3, int(size.height() * factor))))
+    image = reader.read()
+    if image.isNull() or image.width() < 3 or image.height() < 3:
+        return None
+    image = image.convertToFormat(QImage.Format_Grayscale8)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    return bytes(bits), image.width(), image.height(), image.bytesPerLine()
+
+def _numpyMetrics(data, width, height, bytesPerLine):
+    gray = numpy.frombuffer(data, numpy.uint8).reshape(height, bytesPerLine)[:, :width]
+    levels = gray.astype(numpy.float32)
+    laplacian = levels[1:-1, :-2] + levels[1:-1, 2:] + levels[:-2, 1:-1] + \
+        levels[2:, 1:-1] - 4 * levels[1:-1, 1:-1]
+    histogram = numpy.bincount(gray.ravel(), minlength=256)
+    clipped = histogram[:CLIP + 1].sum() + histogram[255 - CLIP:].sum()
+    dx = levels[:-1, 1:] - levels[:-1, :-1]
+    dy = levels[1:, :-1] - levels[:-1, :-1]
+    return float(laplacian.var()), 1.0 - float(clipped) / gray.size, \
+        float(numpy.hypot(dx, dy).mean())
+
+def _pythonMetrics(data, width, height, bytesPerLine):
+    lines = [ data[y * bytesPerLine:y * bytesPerLine + width] for y in range(height) ]
+    total = 0.0; squares = 0.0; gradients = 0.0
+    for y in range(1, height - 1):
+        above, line, below = lines[y - 1], lines[y], lines[y + 1]
+        for x in range(1, width - 1):
+            value = line[x - 1] + line[x + 1] + above[x] + below[x] - 4 * line[x]
+            total += value; squares += value * value
+    for y in range(height - 1):
+        line, below = lines[y], lines[y + 1]
+        for x in range(width - 1):
+            dx = line[x + 1] - line[x]; dy = below[x] - line[x]
+            gradients += (dx * dx + dy * dy) ** 0.5
+    count = (width - 2) * (height - 2)
+    pixels = b"".join(lines)
+    clipped = sum(pixels.count(bytes([level])) for level in \
+        list(range(CLIP + 1)) + list(range(255 - CLIP, 256)))
+    return squares / count - (total / count) ** 2, 1.0 - float(clipped) / len(pixels), \
+        gradients / ((width - 1) * (height - 1))
+
+def measure(path):
+    """
+    Measure the image quality of a picture, decoded scaled down to SIZE in gray levels:
+
+    - sharpness: the variance of its Laplacian, low when blurred
+    - exposure: the part of its pixels not clipped to black or white
+    - texture: its mean gradient magnitude, low when featureless
+
+    Args:
+        path (str): The path of the picture
+
+    Returns:
+        dict<str, float>: The quality of the picture, per field of\
+                Picture.QUALITY_FIELDS. None if the picture can not be decoded.
+    """
+    decoded = _grayLevels(path)
+    if decoded == None:
+        return None
+    metrics = _numpyMetrics if numpy != None else _pythonMetrics
+    sharpness, exposure, texture = metrics(*decoded)
+    return {'sharpness': sharpness, 'exposure': exposure, 'texture': texture}
+
+def _measureChunk(paths):
+    return [ measure(path) for path in paths ]
+
+def measureAll(paths, workers = None, cancelled = None):
+    """
+    Measure pictures in a pool of processes, one per core by default. Processes are
+    spawned rather than forked, so that they do not inherit the threads of Qt. Once
+    stopped, the chunks not started yet are cancelled and the processes waited for.
+
+    Args:
+        paths     (list<str>): The paths of the pictures
+        workers   (int): The number of processes
+        cancelled (threading.Event): Stops measuring when set. May be None.
+
+    Returns:
+        iterator<(str, dict<str, float>)>: The path and the quality of each picture, in\
+                order, the quality being None if the picture can not be decoded
+    """
+    workers = workers or os.cpu_count() or 1
+    # Chunks handed to the processes can not be cancelled anymore: they are kept to a
+    # fraction of a second of work, the metrics being far slower without NumPy
+    chunkSize = max(1, min(16 if numpy != None else 1, len(paths) // (4 * workers)))
+    executor = ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"))
+    starts = range(0, len(paths), chunkSize)
+    futures = [ executor.submit(_measureChunk, paths[first:first + chunkSize]) \
+        for first in starts ]
+    try:
+        for first, future in zip(starts, futures):
+            for path, quality in zip(paths[first:first + chunkSize], future.result()):
+                if cancelled != None and cancelled.is_set():
+                    return
+                yield path, quality
+    finally:
+        # Executor.shutdown only cancels pending work itself from Python 3.9
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+class Prescreener(QObject):
+    """
+    Measure the image quality of pictures without blocking the GUI thread, see measure,
+    so that bad shots are flagged before a reconstruction.
+
+    The pictures are measured by a pool of processes, driven from a dedicated QThread.
+    The measured qualities are sent back chunk by chunk through the qualitiesReady
+    signal, to be stored in the model from the GUI thread, as done by PictureImporter::
+
+        prescreener = Prescreener(model, paths)
+        prescreener.qualitiesReady.connect(receiver.setQualities)
+        prescreener.start()
+
+    Attributes:
+        model     (PictureModel): The model the pictures are measured for
+        paths     (list<str>): The paths of the pictures to measure
+
+    Args:
+        model     (PictureModel): The model the pictures are measured for
+        paths     (list<str>): The paths of the pictures to measure
+        workers   (int): The number of processes, one per core if None
+        chunkSize (int): Number of qualities sent at once
+    """
+    # Signals
+    qualitiesReady = pyqtSignal(object)
+    """``pyqtSignal(list<(str, dict<str, float>)>)`` The path and the quality of a chunk\
+    of pictures, the quality being None if the picture can not be decoded"""
+
+    progress = pyqtSignal(int, int)
+    """``pyqtSignal(int, int)`` Number of pictures measured so far, and total number of\
+    pictures"""
+
+    finished = pyqtSignal(int, int)
+    """``pyqtSignal(int, int)`` The prescreening is over, cancelled or not. Gives the\
+    number of measured pictures, and the number of pictures that could not be decoded"""
+
+    CHUNK_SIZE = 50
+
+    def __init__(self, model, paths, workers = None, chunkSize = None):
+        QObject.__init__(self)
+        self.model, self.paths, self._workers = model, list(paths), workers
+        self._chunkSize = chunkSize or self.CHUNK_SIZE
+        self._cancelled = threading.Event()
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._run)
+        # Quit from the thread itself, even once the event loop of the GUI is over
+        self.finished.connect(self._thread.quit, Qt.DirectConnection)
+
+    def start(self):
+        """
+        Start measuring in the background
+        """
+        self._thread.start()
+
+    def cancel(self):
+        """
+        Ask the prescreening to stop. Already sent qualities are kept.
+        """
+        self._cancelled.set()
+
+    def isRunning(self):
+        return self._thread.isRunning()
+
+    def wait(self):
+        """
+        Block until the prescreening thread is over
+        """
+        self._thread.wait()
+
+    @pyqtSlot()
+    def _run(self):
+        """
+        Executed by the prescreening thread: measure every picture in the pool
+        """
+        startTime = time.time()
+        measured = 0; failed = 0; total = len(self.paths)
+        chunk = []
+        try:
+            self.progress.emit(0, total)
+            for path, quality in measureAll(self.paths, self._workers, self._cancelled):
+                if quality == None:
+                    failed += 1
+                # Unreadable pictures are recorded too, not to be measured again
+                chunk.append((path, quality))
+                measured += 1
+                if len(chunk) >= self._chunkSize:
+                    self.qualitiesReady.emit(chunk)
+                    self.progress.emit(measured, total)
+                    chunk = []
+            if len(chunk) > 0:
+                self.qualitiesReady.emit(chunk)
+            self.progress.emit(measured, total)
+        finally:
+            elapsed = max(time.time() - startTime, 1e-6)
+            print("Prescreened " + str(measured) + "/" + str(total) + " pictures in " + \
+                "{:.2f}s ({:.1f} pictures/s, {} unreadable){}".format(elapsed, \
+                    measured / elapsed, failed, self._cancelled.is_set() and ", cancelled" or ""))
+            self.finished.emit(measured - failed, failed)
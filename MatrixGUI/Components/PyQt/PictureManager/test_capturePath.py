@@ -0,0 +1,86 @@
+"""
+Tests of the capture path ordering and of its point grid. Run them from this folder:
+
+    python3 -m unittest test_capturePath
+"""
+import os, sys, random, time, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from capturePath import capturePathOrder, PointGrid, project
+
+class CapturePathOrderTest(unittest.TestCase):
+    def assertPermutation(self, order, count):
+        self.assertEqual(sorted(order), list(range(count)))
+
+    def test_orders_places_along_a_line(self):
+        generator = random.Random(0)
+        steps = list(range(50))
+        generator.shuffle(steps)
+        latitudes = [ 43.0 + step * 1e-4 for step in steps ]
+        longitudes = [ 1.25 ] * len(steps)
+        dates = [ 1425204672 + step for step in steps ]
+        order = capturePathOrder(latitudes, longitudes, dates)
+        self.assertEqual([ steps[p] for p in order ], list(range(50)))
+
+    def test_pictures_at_nearly_the_same_position(self):
+        # Places shot in bursts, with GPS noise of about a decimeter
+        generator = random.Random(0)
+        latitudes, longitudes = [], []
+        for place in range(generator.randint(4, 8)):
+            latitude = 48.7 + generator.random() * 0.01
+            longitude = 2.2 + generator.random() * 0.01
+            for shot in range(120):
+                latitudes.append(latitude + generator.gauss(0.0, 1e-6))
+                longitudes.append(longitude + generator.gauss(0.0, 1e-6))
+        dates = list(range(1, len(latitudes) + 1))
+        self.assertPermutation(capturePathOrder(latitudes, longitudes, dates), len(dates))
+
+    def test_collinear_places(self):
+        start = time.time()
+        self.assertEqual(capturePathOrder([48.7, 48.7], [2.2, 2.3], [1, 2]), [0, 1])
+        self.assertEqual(capturePathOrder([48.7, 48.8], [2.2, 2.2], [1, 2]), [0, 1])
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_distant_outlier(self):
+        generator = random.Random(0)
+        latitudes = [ 48.7 + generator.gauss(0.0, 1e-5) for _ in range(500) ] + [48.88]
+        longitudes = [ 2.2 + generator.gauss(0.0, 1e-5) for _ in range(500) ] + [2.2]
+        dates = list(range(1, len(latitudes) + 1))
+        start = time.time()
+        order = capturePathOrder(latitudes, longitudes, dates, timeLimit = 0.1)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertPermutation(order, len(dates))
+        self.assertEqual(order[-1], 500)
+
+    def test_unlocated_pictures_follow_by_date(self):
+        order = capturePathOrder([0.0, 43.0, 0.0, 43.001], [0.0, 1.25, 0.0, 1.25], \
+            [3, 1, 0, 2])
+        self.assertEqual(order, [1, 3, 0, 2])
+
+class PointGridTest(unittest.TestCase):
+    def test_nearest_among_bursts_sharing_a_position(self):
+        # Bursts of 20 shots sharing the GPS fix of their place, 50 meters apart
+        latitudes, longitudes = [], []
+        for place in range(43):
+            for shot in range(20):
+                latitudes.append(48.7 + (place % 7) * 4.5e-4)
+                longitudes.append(2.2 + (place // 7) * 6.8e-4)
+        xs, ys = project(latitudes, longitudes)
+        grid = PointGrid(xs, ys)
+        for p in range(len(xs)):
+            self.assertIn(p, grid.cells[grid.cell(p)])
+        for p in range(0, len(xs), 7):
+            nearest = grid.nearest(p, 25, 200.0)
+            self.assertEqual(len(nearest), 25)
+            self.assertNotIn(p, nearest)
+            self.assertEqual(set(nearest[:19]), set(range(p - p % 20, p - p % 20 + 20)) - {p})
+
+    def test_nearest_within_a_distance(self):
+        xs, ys = project([48.7, 48.7001, 48.71], [2.2, 2.2, 2.2])
+        grid = PointGrid(xs, ys)
+        self.assertEqual(grid.nearest(0, 2, 200.0), [1])
+        self.assertEqual(grid.nearest(0, 2), [1, 2])
+        self.assertEqual(grid.nearest(0, 2, accept = lambda p: p != 1), [2])
+
+if __name__ == "__main__":
+    unittest.main()
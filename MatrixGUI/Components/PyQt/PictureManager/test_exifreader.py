@@ -0,0 +1,44 @@
+"""
+Tests of the in-process EXIF reader. Run them from this folder:
+
+    python3 -m unittest test_exifreader
+"""
+import os, sys, shutil, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import exifreader
+
+# A JPEG header without EXIF data: a 32x16 frame header, then the end of the image
+FRAME = b"\xff\xd8" + b"\xff\xc0\x00\x0b\x08\x00\x10\x00\x20\x01\x01\x11\x00" + b"\xff\xd9"
+
+class ExifReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_reads_the_frame_size(self):
+        path = self.write("frame.jpg", FRAME)
+        tags = exifreader.read_exif(path)
+        self.assertEqual((tags["File:ImageWidth"], tags["File:ImageHeight"]), (32, 16))
+
+    def test_truncated_frame_header(self):
+        path = self.write("truncated.jpg", FRAME[:10])
+        self.assertRaises(exifreader.UnsupportedFormat, exifreader.read_exif, path)
+        result, unsupported = exifreader.get_tags_batch(["File:ImageWidth"], [path])
+        self.assertEqual((result, unsupported), ([], [path]))
+
+    def test_not_a_jpeg_file(self):
+        path = self.write("picture.png", b"\x89PNG\r\n\x1a\n")
+        result, unsupported = exifreader.get_tags_batch(["File:ImageWidth"], [path])
+        self.assertEqual((result, unsupported), ([], [path]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,315 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader, QTransform
+from PyQt5.QtQuick import QQuickAsyncImageProvider, QQuickImageResponse, QQuickTextureFactory
+from collections import OrderedDict
+import os, hashlib, threading
+import exifreader
+
+class ImageCache(object):
+    """
+    A thread safe cache of images, bounded by the number of bytes of the images it
+    holds. The least recently used images are dropped first.
+
+    Attributes:
+        maxBytes (int): The number of bytes beyond which images are dropped
+    """
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._images
+
+    def get(self, key):
+        """
+        Returns:
+            QImage: The image of a key, None if it is not cached
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image != None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """
+        Cache an image, dropping the least recently used ones if needed. Images bigger
+        than the cache are not cached.
+        """
+        size = image.sizeInBytes()
+        if size > self.maxBytes:
+            return
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous != None:
+                self._bytes -= previous.sizeInBytes()
+            self._images[key] = image
+            self._bytes += size
+            while self._bytes > self.maxBytes:
+                _, dropped = self._images.popitem(last=False)
+                self._bytes -= dropped.sizeInBytes()
+
+class _PreviewResponse(QQuickImageResponse):
+    """
+    The answer to an image request, finished once its job ran
+    """
+    def __init__(self):
+        super(_PreviewResponse, self).__init__()
+        self.image = QImage()
+        self.error = ""
+        self.cancelled = False
+
+    def textureFactory(self):
+        return QQuickTextureFactory.textureFactoryForImage(self.image)
+
+    def errorString(self):
+        return self.error
+
+    def cancel(self):
+        # The job does not load the preview if it did not start yet
+        self.cancelled = True
+
+class _PreviewJob(QRunnable):
+    """
+    Load a preview in a thread of the pool of the provider
+    """
+    def __init__(self, provider, response, path, size):
+        super(_PreviewJob, self).__init__()
+        self.provider, self.response, self.path, self.size = provider, response, path, size
+
+    def run(self):
+        try:
+            if not self.response.cancelled:
+                self.response.image = self.provider.preview(self.path, self.size)
+        except Exception as e:
+            self.response.error = "Can not load a preview of " + self.path + ": " + str(e)
+        try:
+            self.response.finished.emit()
+        except RuntimeError:
+            # The response has been deleted after being cancelled
+            pass
+
+class ThumbnailProvider(QQuickAsyncImageProvider):
+    """
+    Serve previews of pictures to QML, as ``image://thumbs/<path of the picture>``, the
+    requested size being the sourceSize of the Image element. Previews are loaded on a
+    pool of threads, so that the GUI thread never decodes a picture, from the first of:
+
+    - a cache of the latest previews, in memory
+    - the JPEG thumbnail embedded in the EXIF data, when it is large enough
+    - the previews persisted on disk, under the thumbnails directory of the scene
+    - a decode of the picture scaled down by the JPEG decoder itself, which is then
+      persisted on disk
+
+    Requested sizes are rounded up to SIZE_STEP pixels, so that slightly different
+    sizes share their previews.
+    """
+    # Size of the previews when none is requested
+    DEFAULT_SIZE = 1024
+    SIZE_STEP = 256
+    # Bytes of previews kept in memory
+    MEMORY_CACHE_SIZE = 128 * 1024 * 1024
+    # Sub directory of the cache directory holding the previews
+    PREVIEWS_DIR = "previews"
+    JPEG_QUALITY = 90
+
+    def __init__(self, cacheDirectory = None):
+        """
+        Args:
+            cacheDirectory (str): The directory to persist previews in, None to keep\
+                    them in memory only
+        """
+        super(ThumbnailProvider, self).__init__()
+        self._cacheDirectory = None
+        self.setCacheDirectory(cacheDirectory)
+        self.cache = ImageCache(self.MEMORY_CACHE_SIZE)
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, QThread.idealThreadCount() - 1))
+
+    def setCacheDirectory(self, cacheDirectory):
+        """
+        Persist previews in another directory, usually the thumbnails directory of the
+        current scene
+
+        Args:
+            cacheDirectory (str): The directory, None to keep previews in memory only
+        """
+        if cacheDirectory != None:
+            cacheDirectory = os.path.join(cacheDirectory, self.PREVIEWS_DIR)
+        self._cacheDirectory = cacheDirectory
+
+    def requestImageResponse(self, id, requestedSize):
+        """
+        Start loading a preview. Previews found in memory go first in the pool.
+
+        Args:
+            id            (str): The path of the picture
+            requestedSize (QSize): The sourceSize of the Image element, invalid if not set
+
+        Returns:
+            QQuickImageResponse: The response, finished once the preview is loaded
+        """
+        path = QUrl.fromPercentEncoding(id.encode("utf-8"))
+        size = self._target(requestedSize)
+        response = _PreviewResponse()
+        priority = 1 if self.isCached(path, size) else 0
+        self.pool.start(_PreviewJob(self, response, path, size), priority)
+        return response
+
+    def isCached(self, path, size):
+        """
+        Returns:
+            bool: True if the preview of a picture for a size is in memory
+        """
+        return (path, size) in self.cache or (path, self._rounded(size)) in self.cache
+
+    def _target(self, requestedSize):
+        """
+        Returns:
+            (int, int): The size the preview must cover, 0 if not constrained
+        """
+        width, height = max(requestedSize.width(), 0), max(requestedSize.height(), 0)
+        if width == 0 and height == 0:
+            return (self.DEFAULT_SIZE, 0)
+        return (width, height)
+
+    def _rounded(self, size):
+        """
+        Returns:
+            (int, int): A size rounded up to SIZE_STEP pixels, so that previews are shared\
+                    between close sizes
+        """
+        return tuple(-(-side // self.SIZE_STEP) * self.SIZE_STEP for side in size)
+
+    def preview(self, path, size):
+        """
+        Load the preview of a picture, see the class documentation for the order
+
+        Args:
+            path (str): The path of the picture
+            size (int, int): The size the preview must cover, 0 if not constrained
+
+        Returns:
+            QImage: The preview, a null image if the picture can not be read
+        """
+        image = self.cache.get((path, size))
+        if image != None:
+            return image
+        image = self._exifThumbnail(path, size)
+        if image == None:
+            size = self._rounded(size)
+            image = self.cache.get((path, size))
+            if image != None:
+                return image
+            cachePath = self._cachePath(path, size)
+            if cachePath != None and os.path.exists(cachePath):
+                image = QImage(cachePath)
+            if image == None or image.isNull():
+                image = self._decode(path, size)
+                self._persist(image, cachePath)
+        if not image.isNull():
+            self.cache.put((path, size), image)
+        return image
+
+    @staticmethod
+    def _scale(width, height, size):
+        """
+        Returns:
+            float: The factor that scales an image down to a size, at most 1
+        """
+        factors = [ target / float(side) for target, side in zip(size, (width, height)) \
+            if target > 0 and side > 0 ]
+        return min(factors + [1.0])
+
+    @staticmethod
+    def _orient(image, orientation):
+        """
+        Apply an EXIF orientation to an image
+
+        Returns:
+            QImage: The image, as it is meant to be seen
+        """
+        if orientation in (2, 4, 5, 7):
+            image = image.mirrored(orientation != 4, orientation == 4)
+        rotation = {3: 180, 5: 270, 6: 90, 7: 90, 8: 270}.get(orientation)
+        if rotation != None:
+            image = image.transformed(QTransform().rotate(rotation))
+        return image
+
+    def _exifThumbnail(self, path, size):
+        """
+        Returns:
+            QImage: The thumbnail embedded in a picture, None if there is none or if it\
+                    is smaller than the requested size
+        """
+        try:
+            data, orientation = exifreader.read_thumbnail(path)
+        except (exifreader.UnsupportedFormat, OSError, ValueError):
+            return None
+        if data == None:
+            return None
+        image = self._orient(QImage.fromData(data, "JPG"), orientation)
+        if image.isNull() or any(target > side for target, side in \
+            zip(size, (image.width(), image.height()))):
+            return None
+        return image
+
+    def _decode(self, path, size):
+        """
+        Decode a picture scaled down to a size. The JPEG decoder skips the details it
+        does not need, which is much faster than decoding the whole picture.
+
+        Returns:
+            QImage: The scaled picture, a null image if it can not be read
+        """
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        original = reader.size()
+        if original.isValid():
+            width, height = original.width(), original.height()
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                # The picture is turned once decoded
+                width, height = height, width
+            factor = self._scale(width, height, size)
+            if factor < 1.0:
+                reader.setScaledSize(QSize(max(1, int(original.width() * factor)), \
+                    max(1, int(original.height() * factor))))
+        image = reader.read()
+        if image.isNull():
+            print("Can not decode " + path + ": " + reader.errorString())
+        return image
+
+    def _cachePath(self, path, size):
+        """
+        Returns:
+            str: The file of the preview of a picture on disk, None if previews are not\
+                    persisted or if the picture can not be read. The file changes with\
+                    the size and modification time of the picture.
+        """
+        if self._cacheDirectory == None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = "{}|{}|{}".format(path, stat.st_size, stat.st_mtime)
+        name = "{}_{}x{}.jpg".format(hashlib.sha1(key.encode("utf-8")).hexdigest(), *size)
+        return os.path.join(self._cacheDirectory, name)
+
+    def _persist(self, image, cachePath):
+        """
+        Save a preview on disk, through a temporary file so that readers never see a
+        partial file
+        """
+        if cachePath == None or image.isNull():
+            return
+        try:
+            os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+            temporary = cachePath + ".tmp" + str(threading.get_ident())
+            if image.save(temporary, "JPG", self.JPEG_QUALITY):
+                os.replace(temporary, cachePath)
+        except OSError as e:
+            print("Can not persist the preview " + cachePath + ": " + str(e))
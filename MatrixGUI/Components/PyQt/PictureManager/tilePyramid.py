@@ -0,0 +1,333 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader
+from PyQt5.QtQuick import QQuickAsyncImageProvider
+from thumbnailProvider import ImageCache, _PreviewResponse
+from functools import partial
+import os, math, hashlib, threading
+
+class TilePyramid(QObject):
+    """
+    Cut pictures into pyramids of tiles, so that a view zoomed on a picture only
+    decodes the few tiles it shows. Level 0 is the picture at full resolution, and each
+    level halves the size of the previous one, down to a level held in a single tile.
+    Tiles are TILE_SIZE pixels wide, except on the right and bottom edges.
+
+    Pyramids are built lazily, the first time a tile of a level is asked for: the
+    picture is decoded once at the size of that level, the JPEG decoder skipping the
+    details it does not need, then this level and the coarser ones missing are cut
+    into tiles and persisted under the thumbnails directory of the scene. Finer levels
+    are only built when asked for. Tiles are then read from disk, the latest ones
+    being kept in memory.
+
+    Attributes:
+        cache (ImageCache): The latest tiles
+        pool  (QThreadPool): The threads building pyramids and reading tiles
+    """
+    TILE_SIZE = 256
+    # Sub directory of the cache directory holding the pyramids
+    TILES_DIR = "tiles"
+    # File written in the directory of a level once all its tiles are persisted
+    COMPLETE = "complete"
+    MEMORY_CACHE_SIZE = 64 * 1024 * 1024
+    JPEG_QUALITY = 90
+
+    def __init__(self, cacheDirectory = None, parent = None):
+        """
+        Args:
+            cacheDirectory (str): The directory to persist pyramids in, None to use a\
+                    temporary directory
+            parent         (QObject): Parent Element
+        """
+        super(TilePyramid, self).__init__(parent)
+        self._cacheDirectory = None
+        self._temporary = None
+        self.setCacheDirectory(cacheDirectory)
+        self.cache = ImageCache(self.MEMORY_CACHE_SIZE)
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, QThread.idealThreadCount() - 1))
+        # Size and number of levels of the pictures, by path
+        self._levels = dict()
+        # Lock of each level being built, by pyramid directory and level
+        self._building = dict()
+        # Tiles of the levels being persisted, by pyramid directory and level
+        self._fresh = dict()
+        self._lock = threading.Lock()
+
+    def setCacheDirectory(self, cacheDirectory):
+        """
+        Persist pyramids in another directory, usually the thumbnails directory of the
+        current scene
+
+        Args:
+            cacheDirectory (str): The directory, None to use a temporary directory
+        """
+        if cacheDirectory != None:
+            cacheDirectory = os.path.join(cacheDirectory, self.TILES_DIR)
+        self._cacheDirectory = cacheDirectory
+
+    def _directory(self, path):
+        """
+        Returns:
+            str: The directory of the pyramid of a picture, None if the picture can not\
+                    be read. It changes with the size and modification time of the\
+                    picture.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        directory = self._cacheDirectory
+        if directory == None:
+            if self._temporary == None:
+                self._temporary = QTemporaryDir()
+            directory = self._temporary.path()
+        key = "{}|{}|{}".format(path, stat.st_size, stat.st_mtime)
+        return os.path.join(directory, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def levels(self, path):
+        """
+        Read the size of a picture from its header
+
+        Returns:
+            (int, int, int): The width and height of the picture as it is meant to be\
+                    seen, and the number of levels of its pyramid, 0 if the picture can\
+                    not be read
+        """
+        levels = self._levels.get(path)
+        if levels == None:
+            reader = QImageReader(path)
+            reader.setAutoTransform(True)
+            size = reader.size()
+            if not size.isValid():
+                return (0, 0, 0)
+            width, height = size.width(), size.height()
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                width, height = height, width
+            count = 1 + max(0, int(math.ceil(math.log2(max(width, height) / \
+                float(self.TILE_SIZE)))))
+            levels = self._levels[path] = (width, height, count)
+        return levels
+
+    @pyqtSlot(str, result=QVariant)
+    def describe(self, path):
+        """
+        Describe the pyramid of a picture to QML, without building it
+
+        Args:
+            path (str): The path of the picture
+
+        Returns:
+            dict<str, int>: The width, the height, the number of levels and the size of\
+                    the tiles, the number of levels being 0 if the picture can not be read
+        """
+        width, height, levels = self.levels(path)
+        return { "width": width, "height": height, "levels": levels, \
+            "tileSize": self.TILE_SIZE }
+
+    @staticmethod
+    def levelSize(width, height, level):
+        """
+        Returns:
+            (int, int): The size of a picture at a level of its pyramid
+        """
+        scale = 1 << level
+        return (max(1, -(-width // scale)), max(1, -(-height // scale)))
+
+    def tile(self, path, level, x, y):
+        """
+        Load a tile, building its level of the pyramid if needed
+
+        Args:
+            path  (str): The path of the picture
+            level (int): The level of the tile, 0 being the full resolution
+            x     (int): The column of the tile
+            y     (int): The line of the tile
+
+        Returns:
+            QImage: The tile, a null image if the picture can not be read or if the tile\
+                    is out of the picture
+        """
+        key = (path, level, x, y)
+        image = self.cache.get(key)
+        if image != None:
+            return image
+        directory = self._directory(path)
+        width, height, levels = self.levels(path)
+        if directory == None or not 0 <= level < levels:
+            return QImage()
+        levelWidth, levelHeight = self.levelSize(width, height, level)
+        if not (0 <= x * self.TILE_SIZE < levelWidth and 0 <= y * self.TILE_SIZE < levelHeight):
+            return QImage()
+        tilePath = os.path.join(directory, str(level), "{}_{}.jpg".format(x, y))
+        image = QImage(tilePath) if os.path.exists(tilePath) else QImage()
+        if image.isNull():
+            image = self._buildTile(path, directory, level, x, y, tilePath)
+        if not image.isNull():
+            self.cache.put(key, image)
+        return image
+
+    def _levelLock(self, directory, level):
+        """
+        Returns:
+            threading.Lock: The lock of a level of a pyramid, so that it is built once
+        """
+        with self._lock:
+            return self._building.setdefault((directory, level), threading.Lock())
+
+    def _buildTile(self, path, directory, level, x, y, tilePath):
+        """
+        Load a tile not persisted yet. The first thread asking for a tile of a level
+        decodes the picture and cuts the level, the other threads waiting for it. Tiles
+        are then served from memory while the pyramid is persisted in the background.
+
+        Returns:
+            QImage: The tile, a null image if the picture can not be decoded
+        """
+        built = None
+        with self._levelLock(directory, level):
+            tiles = self._fresh.get((directory, level))
+            if tiles == None and os.path.exists(tilePath):
+                # Persisted while waiting for the lock
+                return QImage(tilePath)
+            if tiles == None:
+                built = self._decode(path, level)
+                tiles = dict() if built.isNull() else self._cut(built)
+                self._fresh[(directory, level)] = tiles
+        if built != None:
+            if built.isNull():
+                with self._lock:
+                    del self._fresh[(directory, level)]
+            else:
+                # After the tiles requested meanwhile
+                self.pool.start(partial(self._build, built, tiles, path, directory, level), -1)
+        return tiles.get((x, y), QImage())
+
+    def _decode(self, path, level):
+        """
+        Decode a picture at the size of a level of its pyramid
+
+        Returns:
+            QImage: The picture, a null image if it can not be decoded
+        """
+        width, height, levels = self.levels(path)
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        if level > 0:
+            levelWidth, levelHeight = self.levelSize(width, height, level)
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                # The picture is turned once decoded
+                levelWidth, levelHeight = levelHeight, levelWidth
+            reader.setScaledSize(QSize(levelWidth, levelHeight))
+        image = reader.read()
+        if image.isNull():
+            print("Can not decode " + path + ": " + reader.errorString())
+        return image
+
+    def _build(self, image, tiles, path, directory, level):
+        """
+        Persist the tiles of a level, then halve the picture to persist the coarser
+        levels not built yet. The tiles of the level are served from disk from then on.
+
+        Args:
+            image (QImage): The picture at the size of the level
+            tiles (dict<(int, int), QImage>): The tiles of the level
+        """
+        width, height, levels = self.levels(path)
+        try:
+            self._persist(tiles, os.path.join(directory, str(level)))
+        finally:
+            with self._lock:
+                del self._fresh[(directory, level)]
+        for current in range(level + 1, levels):
+            levelDirectory = os.path.join(directory, str(current))
+            if os.path.exists(os.path.join(levelDirectory, self.COMPLETE)):
+                # Coarser levels were built along with this one
+                break
+            image = image.scaled(*self.levelSize(width, height, current), \
+                transformMode=Qt.SmoothTransformation)
+            self._persist(self._cut(image), levelDirectory)
+
+    def _cut(self, image):
+        """
+        Returns:
+            dict<(int, int), QImage>: The tiles of an image, by column and line
+        """
+        size = self.TILE_SIZE
+        return dict(((x, y), image.copy(x * size, y * size, min(size, image.width() - x * size), \
+            min(size, image.height() - y * size))) \
+            for x in range(-(-image.width() // size)) for y in range(-(-image.height() // size)))
+
+    def _persist(self, tiles, levelDirectory):
+        """
+        Save the tiles of a level through temporary files, so that readers never see a
+        partial tile, then mark the level as complete
+        """
+        try:
+            os.makedirs(levelDirectory, exist_ok=True)
+            suffix = ".tmp" + str(threading.get_ident())
+            for (x, y), tile in tiles.items():
+                tilePath = os.path.join(levelDirectory, "{}_{}.jpg".format(x, y))
+                if tile.save(tilePath + suffix, "JPG", self.JPEG_QUALITY):
+                    os.replace(tilePath + suffix, tilePath)
+            open(os.path.join(levelDirectory, self.COMPLETE), "w").close()
+        except OSError as e:
+            print("Can not persist the tiles of " + levelDirectory + ": " + str(e))
+
+class _TileJob(QRunnable):
+    """
+    Load a tile in a thread of the pool of the pyramid
+    """
+    def __init__(self, pyramid, response, path, level, x, y):
+        super(_TileJob, self).__init__()
+        self.pyramid, self.response = pyramid, response
+        self.path, self.level, self.x, self.y = path, level, x, y
+
+    def run(self):
+        try:
+            if not self.response.cancelled:
+                self.response.image = self.pyramid.tile(self.path, self.level, self.x, self.y)
+        except Exception as e:
+            self.response.error = "Can not load a tile of " + self.path + ": " + str(e)
+        try:
+            self.response.finished.emit()
+        except RuntimeError:
+            # The response has been deleted after being cancelled
+            pass
+
+class TileProvider(QQuickAsyncImageProvider):
+    """
+    Serve the tiles of a TilePyramid to QML, as
+    ``image://tiles/<level>/<column>/<line>/<path of the picture>``
+    """
+    def __init__(self, pyramid):
+        """
+        Args:
+            pyramid (TilePyramid): The pyramids to serve tiles from
+        """
+        super(TileProvider, self).__init__()
+        self.pyramid = pyramid
+
+    def requestImageResponse(self, id, requestedSize):
+        """
+        Start loading a tile. Tiles found in memory go first in the pool.
+
+        Args:
+            id            (str): The level, column and line of the tile, then the path of\
+                    the picture
+            requestedSize (QSize): Ignored, tiles have a fixed size
+
+        Returns:
+            QQuickImageResponse: The response, finished once the tile is loaded
+        """
+        response = _PreviewResponse()
+        try:
+            level, x, y, path = id.split("/", 3)
+            level, x, y = int(level), int(x), int(y)
+        except ValueError:
+            response.error = "Invalid tile " + id
+            QTimer.singleShot(0, response.finished.emit)
+            return response
+        path = QUrl.fromPercentEncoding(path.encode("utf-8"))
+        priority = 1 if (path, level, x, y) in self.pyramid.cache else 0
+        self.pyramid.pool.start(_TileJob(self.pyramid, response, path, level, x, y), priority)
+        return response
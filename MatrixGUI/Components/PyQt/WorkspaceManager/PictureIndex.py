@@ -0,0 +1,175 @@
+import os, hashlib, sqlite3, threading
+from concurrent.futures import ThreadPoolExecutor
+
+class PictureIndex():
+    """ An index of the pictures files of a scene by content, used to detect duplicates.
+
+    Files are compared by size first, and only files sharing their size with another
+    one are hashed: most pictures have a unique size, hence are never read. Hashes are
+    computed chunk by chunk in a thread pool, and stored in an SQLite database in the
+    scene directory along with the size and the modification time they are valid for.
+
+    Attributes:
+        directory (str): The directory holding the indexed pictures.
+        path (str): The path of the database file.
+    """
+    TABLE = "pictures"
+    # Number of bytes read at once when hashing a file
+    CHUNK_SIZE = 1024 * 1024
+    # Maximum number of parameters bound to a single SQLite query
+    QUERY_SIZE = 500
+
+    def __init__(self, directory, index_path):
+        """ Open (or create) the index of a directory.
+
+        Args:
+            directory (str): The directory holding the indexed pictures.
+            index_path (str): The path of the database file.
+        """
+        self.directory = directory
+        self.path = index_path
+        # Hashes computed for files which are not indexed yet, reused when adding them
+        self._hashes = dict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread = False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS " + self.TABLE +\
+                " (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS " + self.TABLE +\
+                "_size ON " + self.TABLE + " (size)")
+        self.refresh()
+
+    def close(self):
+        """ Close the underlying database.
+        """
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def content_hash(path, chunk_size = CHUNK_SIZE):
+        """ Hash the whole content of a file, chunk by chunk.
+
+        Args:
+            path (str): The path to the file.
+            chunk_size (int): The number of bytes read at once.
+
+        Returns:
+            str: The hexadecimal digest.
+        """
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    def refresh(self):
+        """ Synchronize the index with the files of the directory. Entries of removed or
+        modified files are dropped, new files are indexed by size only.
+        """
+        files = dict()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.path.isfile(path):
+                        files[path] = self._stat(path)
+                except OSError:
+                    continue
+        with self._lock, self._connection:
+            known = dict((path, (size, mtime)) for path, size, mtime in\
+                self._connection.execute("SELECT path, size, mtime FROM " + self.TABLE))
+            self._connection.executemany("DELETE FROM " + self.TABLE + " WHERE path = ?",\
+                [ (path,) for path in known if files.get(path) != known[path] ])
+            self._connection.executemany("INSERT INTO " + self.TABLE + " VALUES (?, ?, ?, NULL)",\
+                [ (path,) + stat for path, stat in files.items() if known.get(path) != stat ])
+
+    def _hash_all(self, paths):
+        """ Hash several files in parallel.
+
+        Returns:
+            dict<str, str>: The digest per path, unreadable files are missing.
+        """
+        def hash_file(path):
+            try:
+                return path, self.content_hash(path)
+            except OSError:
+                return path, None
+        with ThreadPoolExecutor(os.cpu_count() or 1) as executor:
+            return dict((path, digest) for path, digest in executor.map(hash_file, paths)\
+                if digest != None)
+
+    def duplicates(self, paths):
+        """ Find the files whose content is already in the index, or appears earlier in
+        paths.
+
+        Args:
+            paths (list<str>): The files about to be added.
+
+        Returns:
+            dict<str, str>: For each duplicated file, the path of the file it duplicates.
+        """
+        sizes = dict()
+        for path in paths:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                continue
+        wanted = list(set(sizes.values()))
+        with self._lock:
+            indexed = []
+            for first in range(0, len(wanted), self.QUERY_SIZE):
+                chunk = wanted[first:first + self.QUERY_SIZE]
+                indexed.extend(self._connection.execute(\
+                    "SELECT path, size, hash FROM " + self.TABLE + " WHERE size IN (" +\
+                    ",".join("?" * len(chunk)) + ")", chunk).fetchall())
+
+        # Only files of the same size may have the same content
+        count = dict()
+        for size in list(sizes.values()) + [ size for _, size, _ in indexed ]:
+            count[size] = count.get(size, 0) + 1
+        candidates = [ p for p in sizes if count[sizes[p]] > 1 ]
+        unhashed = [ path for path, size, digest in indexed if digest == None ]
+        hashes = self._hash_all([ p for p in candidates if not p in self._hashes ] + unhashed)
+        hashes.update((p, self._hashes[p]) for p in candidates if p in self._hashes)
+
+        with self._lock, self._connection:
+            self._connection.executemany("UPDATE " + self.TABLE + " SET hash = ? WHERE path = ?",\
+                [ (hashes[path], path) for path in unhashed if path in hashes ])
+        originals = dict()
+        for path, size, digest in indexed:
+            digest = digest or hashes.get(path)
+            if digest != None:
+                originals[(size, digest)] = path
+        duplicates = dict()
+        for path in paths:
+            if not path in hashes or not path in sizes:
+                continue
+            key = (sizes[path], hashes[path])
+            if key in originals and originals[key] != path:
+                duplicates[path] = originals[key]
+            else:
+                originals.setdefault(key, path)
+                self._hashes[path] = hashes[path]
+        return duplicates
+
+    def add(self, copies):
+        """ Index newly added files.
+
+        Args:
+            copies (dict<str, str>): The path of each added file, per path of the file it\
+                    has been copied from. Hashes computed for the original files are reused.
+        """
+        entries = []
+        for source, path in copies.items():
+            try:
+                entries.append((path,) + self._stat(path) + (self._hashes.pop(source, None),))
+            except OSError:
+                continue
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO " + self.TABLE +\
+                " VALUES (?, ?, ?, ?)", entries)
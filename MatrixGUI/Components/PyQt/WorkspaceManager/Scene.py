@@ -9,6 +9,10 @@ class Scene(DirectorySpace):
         RECONSTRUCTION_OUTPUT_DIR
         RECONSTRUCTION_TEMP_DIR
         RECONSTRUCTION_PICTURE_DIR
+        PICTURES_DIR
+        THUMBNAILS_DIR
+        METADATA_CACHE_FILE
+        PICTURES_INDEX_FILE
 
     Attributes:
         name (str): The name of the scene. It must be unique in the workspace.
@@ -23,6 +27,8 @@ class Scene(DirectorySpace):
     RECONSTRUCTION_PICTURE_DIR = "reconstruction_pictures"
     PICTURES_DIR               = "pictures_set"
     THUMBNAILS_DIR             = "thumbnails"
+    METADATA_CACHE_FILE        = "metadata.sqlite"
+    PICTURES_INDEX_FILE        = "pictures_index.sqlite"
 
     def __init__(self, name, base_path, relative_path=""):
         """ Initialize a scene in a workspace.
@@ -91,3 +97,11 @@ class Scene(DirectorySpace):
     def get_thumbnails_dir(self):
         return self.THUMBNAILS_DIR
 #=============================   end thumbnails   ===============================
+
+##############################   METADATA   ###################################
+    def get_metadata_cache_file(self):
+        return self.METADATA_CACHE_FILE
+
+    def get_pictures_index_file(self):
+        return self.PICTURES_INDEX_FILE
+#=============================   end metadata   ===============================
@@ -1,7 +1,10 @@
+import os
 from DirectorySpace import DirectorySpace
 from Scene import Scene
 from Utils import Utils                     # need the package import in __init__.py
 from pictureManager import PictureModel
+from metadataCache import MetadataCache
+from PictureIndex import PictureIndex
 
 class Workspace(DirectorySpace):
     """ A workspace containing its own configuration and scenes.
@@ -16,6 +19,8 @@ class Workspace(DirectorySpace):
         current_scene (str): The path of the current scene.
         qt_directory (QDir): The directory corresponding to that workspace.
         pictureModel (PictureModel): A model for the view.
+        pictures_index (PictureIndex): The content index of the current scene pictures.
+        metadata_cache (MetadataCache): The metadata cache of the current scene.
     """
 
     def __init__(self, name="", base_path="", relative_path=""):
@@ -34,6 +39,8 @@ class Workspace(DirectorySpace):
         self.scenes = dict()
         self.current_scene = ""
         self.pictureModel = None
+        self.pictures_index = None
+        self.metadata_cache = None
 
     def delete(self):
         """ Delete the workspace (and its contents).
@@ -106,6 +113,39 @@ class Workspace(DirectorySpace):
         """
         assert (scene_path in self.scenes), "That scene "+scene_path+" does not exist in this workspace."
         self.current_scene = scene_path
+        if self.pictures_index != None:
+            self.pictures_index.close()
+            self.pictures_index = None
+        self.open_metadata_cache()
+
+    def open_metadata_cache(self):
+        """ Give the metadata cache of the current scene to the picture model, closing
+        the cache of the previous scene.
+        """
+        if self.pictureModel == None or not self.current_scene:
+            return
+        if self.metadata_cache != None:
+            self.metadata_cache.close()
+        scene = self.get_current_scene()
+        self.metadata_cache = MetadataCache(scene.full_path(),\
+            PictureModel.METADATA_TAGS, scene.get_metadata_cache_file())
+        self.pictureModel.setMetadataCache(self.metadata_cache)
+
+    def get_pictures_index(self):
+        """ Get the content index of the current scene pictures, opened on first use.
+
+        Returns:
+            PictureIndex: The index of the current scene.
+
+        Raises:
+            AssertionError: If no current scene.
+        """
+        if self.pictures_index == None:
+            scene = self.get_current_scene()
+            self.pictures_index = PictureIndex(\
+                os.path.join(scene.full_path(), Scene.PICTURES_DIR),\
+                os.path.join(scene.full_path(), scene.get_pictures_index_file()))
+        return self.pictures_index
 
     def getPictureModel(self):
         return self.pictureModel
@@ -150,6 +190,12 @@ class Workspace(DirectorySpace):
         for scene in serial["scenes"]:
             workspace.scenes[scene] = Scene.deserialize(serial["scenes"][scene])
         workspace.current_scene = serial["current_scene"]
+        workspace.pictures_index = None
+        workspace.metadata_cache = None
         workspace.pictureModel = PictureModel.load(\
             workspace.get_current_scene().full_path(), "pictures")
+        workspace.open_metadata_cache()
+        # Only the pictures saved before their metadata were persisted are read again
+        pictureModel = workspace.pictureModel
+        pictureModel.refreshMetadata(pictureModel.picturesWithoutMetadata())
         return workspace
@@ -271,15 +271,28 @@ class WorkspaceManager():
 
     def import_pictures(self, picturesPath):
         """
-        Import pictures from an external location into the workspace
+        Import pictures from an external location into the workspace. Pictures whose
+        content is already in the scene (or earlier in picturesPath) are skipped.
+
         Args:
           picturesPath (list<str>): The list of path to import
+
+        Returns:
+          list<str>: The paths of the imported pictures, in the workspace
         """
-        newPaths = []
+        index = self.get_current_workspace().get_pictures_index()
+        duplicates = index.duplicates(picturesPath)
+        newPaths = []; copies = dict()
         for path in picturesPath:
+            if path in duplicates:
+                continue
             newDir = self.get_picture_dir() 
             shutil.copy(path, newDir) 
-            newPaths.append(os.path.join(newDir, os.path.basename(path)))
+            copies[path] = os.path.join(newDir, os.path.basename(path))
+            newPaths.append(copies[path])
+        index.add(copies)
+        if len(duplicates) > 0:
+            print("Skipped " + str(len(duplicates)) + " duplicated pictures")
         return newPaths
 
     def get_thumbnails_dir(self):
@@ -11,6 +11,8 @@ Item {
   property real centerLatitude
   property real centerLongitude
   property int focused
+  /* The cluster holding the focused picture, -1 if none */
+  property int focusedCluster: -1
 
   Map {
     id: map
@@ -24,45 +26,116 @@ Item {
 
     gesture.enabled: true
     Component.onCompleted: zoomLevel = 17
+    /* Only clusters around the viewport are exposed: follow pans, zooms and resizes */
+    onCenterChanged: viewportTimer.follow()
+    onZoomLevelChanged: viewportTimer.follow()
+    onWidthChanged: viewportTimer.follow()
+    onHeightChanged: viewportTimer.follow()
 
     MapItemView {
       id: itemView
-      model: pictures
+      model: []
       delegate: pin
     }
   }
 
+  /* Send the viewport at most once per interval while the map moves */
+  Timer {
+    id: viewportTimer
+    interval: 30
+    onTriggered: updateViewport()
+    function follow(){ if (!running) start(); }
+  }
+
+  /* The cluster rows change when clusters are emptied or recomputed */
+  Connections {
+    target: itemView.model
+    ignoreUnknownSignals: true
+    onRowsRemoved: updateFocusedCluster()
+    onModelReset: updateFocusedCluster()
+  }
+
   Component {
     id: pin
-    MapCircle {
-      id: circle
-      property bool isFocused: mapViewer.focused == index
+    MapQuickItem {
+      property bool isFocused: mapViewer.focusedCluster == index
       property alias isHovered: mouseArea.containsMouse
-      border.width: 0
-      color: circleColor
-      center {
-        latitude: latitude
-        longitude: longitude
-      }
-      /* Quelle est donc cette sorcellerie O_o */
-      radius: 0.6 * Math.pow(2, (Math.max(1, 20 - map.zoomLevel))) * (isFocused || isHovered ? 2 : 1)
-      MouseArea {
-        id: mouseArea
-
-        anchors.fill: parent
-        hoverEnabled: true
-        onClicked: {
-          mapViewer.focused = index;
-          focusOnPicture(index);
+      anchorPoint.x: circle.width / 2
+      anchorPoint.y: circle.height / 2
+      coordinate: QtPositioning.coordinate(latitude, longitude)
+      sourceItem: Rectangle {
+        id: circle
+        /* Clusters grow with the logarithm of the number of their pictures */
+        width: (12 + 4 * Math.log(count) / Math.LN2) * (isFocused || isHovered ? 1.5 : 1)
+        height: width
+        radius: width / 2
+        border.width: 0
+        /* The color of the most frequent status of the pictures of the cluster */
+        color: circleColor
+        opacity: 0.85
+
+        Text {
+          anchors.centerIn: parent
+          color: "white"
+          font.pixelSize: 10
+          text: count
+          visible: count > 1
         }
 
-        cursorShape: (containsMouse ? Qt.PointingHandCursor : Qt.ArrowCursor);
+        MouseArea {
+          id: mouseArea
+
+          anchors.fill: parent
+          hoverEnabled: true
+          onClicked: {
+            /* Zoom in on clusters, until they hold a single picture */
+            if (itemView.model.canSplit(index)) {
+              mapViewer.centerLatitude = latitude;
+              mapViewer.centerLongitude = longitude;
+              map.zoomLevel = Math.min(Math.floor(map.zoomLevel) + 2, map.maximumZoomLevel);
+              return;
+            }
+            mapViewer.focused = itemView.model.pictureIndex(index);
+            focusOnPicture(mapViewer.focused);
+          }
+
+          cursorShape: (containsMouse ? Qt.PointingHandCursor : Qt.ArrowCursor);
+        }
       }
     }
   }
 
+  onFocusedChanged: updateFocusedCluster()
+
+  function updateFocusedCluster(){
+    focusedCluster = pictures ? pictures.clusters.clusterOf(focused) : -1;
+  }
+
+  /* Tell the clusters about the area shown by the map, splitting or merging them as
+  the integer part of the zoom level changes */
+  function updateViewport(){
+    if (!pictures) return;
+    var topLeft = map.toCoordinate(Qt.point(0, 0));
+    var bottomRight = map.toCoordinate(Qt.point(map.width, map.height));
+    /* Out of the world edges, coordinates are invalid and all clusters are shown */
+    pictures.clusters.setViewport(map.zoomLevel, topLeft.latitude, topLeft.longitude,
+      bottomRight.latitude, bottomRight.longitude);
+  }
+
   function refresh(){
-    itemView.model = pictures;
+    if (!pictures) return;
+    updateViewport();
+    itemView.model = pictures.clusters;
+    updateFocusedCluster();
+  }
+
+  /* Zoom the map on a bounding box, as given by PictureManager.computeBounds */
+  function fitBounds(bounds){
+    /* A single location keeps the zoom level, the center being set already */
+    if (bounds.north == bounds.south && bounds.east == bounds.west) return;
+    map.fitViewportToGeoShape(QtPositioning.rectangle(
+      QtPositioning.coordinate(bounds.north, bounds.west),
+      QtPositioning.coordinate(bounds.south, bounds.east)));
   }
 
   function reset(){
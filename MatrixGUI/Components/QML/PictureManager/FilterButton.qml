@@ -2,14 +2,36 @@ import QtQuick 2.0
 import QtQuick.Controls 1.3 
 
 ComboBox {
+  /* Number of pictures per status, displayed along each filter */
+  property variant counts: []
+
   model: ListModel {
-    ListElement { text: "All";            value: 101}
-    ListElement { text: "Discarded";      value: 102}
-    ListElement { text: "New";            value: 0 }
-    ListElement { text: "Processed";      value: 3 }
-    ListElement { text: "Reconstruction"; value: 1 }
-    ListElement { text: "Rejected";       value: 2 }
-    ListElement { text: "Thumbnails";     value: 4 }
-    ListElement { text: "Valid";          value: 103}
+    id: filters
+    ListElement { text: "All";            label: "All";            value: 101}
+    ListElement { text: "Discarded";      label: "Discarded";      value: 102}
+    ListElement { text: "New";            label: "New";            value: 0 }
+    ListElement { text: "Processed";      label: "Processed";      value: 3 }
+    ListElement { text: "Reconstruction"; label: "Reconstruction"; value: 1 }
+    ListElement { text: "Rejected";       label: "Rejected";       value: 2 }
+    ListElement { text: "Thumbnails";     label: "Thumbnails";     value: 4 }
+    ListElement { text: "Valid";          label: "Valid";          value: 103}
+  }
+
+  /* Number of pictures shown by a filter, the specials ones gather several statuses */
+  function countFor(value) {
+    var specials = { 101: [0, 1, 2, 3, 4, 5, 6], 102: [5, 6], 103: [0, 1, 3] };
+    var statuses = specials[value] || [value];
+    var total = 0;
+    for (var i = 0; i < statuses.length; i++) {
+      total += counts[statuses[i]] || 0;
+    }
+    return total;
+  }
+
+  onCountsChanged: {
+    for (var i = 0; i < filters.count; i++) {
+      var filter = filters.get(i);
+      filters.setProperty(i, "text", filter.label + " (" + countFor(filter.value) + ")");
+    }
   }
-}
\ No newline at end of file
+}
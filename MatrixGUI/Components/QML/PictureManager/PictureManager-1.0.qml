@@ -103,6 +103,8 @@ Rectangle {
         currentIndex: 0
         delegate: pictureDelegate
         model: []
+        /* Load the previews of the pictures around the focused one in the background */
+        onCurrentIndexChanged: prefetcher.focusOn(currentIndex, viewerWrapper.viewer.previewWidth, 0)
       }
     }
   }
@@ -334,6 +336,16 @@ Rectangle {
     width: pictureWidget.width
   }
 
+  /* The views follow the changes of the model by themselves. Only selected indexes have
+  to be dropped once rows are removed or moved */
+  Connections {
+    id: modelConnections
+    target: null
+    onRowsRemoved: picturesChanged()
+    onLayoutChanged: picturesChanged()
+    onModelReset: picturesChanged()
+  }
+
   /* Slots */
   function focusOnPictureMap(index) {
     listView.currentIndex = index
@@ -343,6 +355,8 @@ Rectangle {
     selectedPictures.model.clear();
     listView.model = []; // Force a repaint
     listView.model = pictures;
+    modelConnections.target = pictures;
+    filterButton.counts = Qt.binding(function() { return pictures.statusCounts });
     listView.currentIndex = 0;
     if(listView.currentItem){ 
       listView.currentItem.Component.completed();
@@ -350,4 +364,9 @@ Rectangle {
       viewerWrapper.viewer.source = "";
     }
   }
+
+  function picturesChanged(){
+    selectedPictures.model.clear();
+    viewerWrapper.viewer.source = listView.currentItem ? listView.currentItem.imagePath : "";
+  }
 }
@@ -0,0 +1,128 @@
+import QtQuick 2.0
+
+/* Zoomable view of a picture up to its full resolution. Only the tiles of the pyramid
+of the picture in view are loaded, at the level matching the zoom, over a preview of
+the whole picture. */
+Item {
+  id: tiledViewer
+
+  property string source
+  /* Width, height, number of levels and tile size of the pyramid of the picture */
+  property var pyramid: source == "" ? null : tilePyramid.describe(source)
+  property bool ready: pyramid != null && pyramid.levels > 0
+  /* Size of a picture pixel on screen, the picture fitting the view at first */
+  property real fitZoom: ready ? Math.min(1, width / pyramid.width, height / pyramid.height) : 1
+  property real maxZoom: 2
+  property real zoom: fitZoom
+  /* Level of the shown tiles: the finest level not larger than the screen */
+  property int level: ready ? Math.max(0, Math.min(pyramid.levels - 1,
+                                  Math.floor(-Math.log(zoom) / Math.LN2))) : 0
+
+  clip: true
+
+  onFitZoomChanged: if(zoom < fitZoom) zoom = fitZoom
+  onZoomChanged: tilesTimer.restart()
+  onWidthChanged: tilesTimer.restart()
+  onHeightChanged: tilesTimer.restart()
+  onPyramidChanged: {
+    /* A new picture fits the view until zoomed */
+    zoom = Qt.binding(function() { return fitZoom; });
+    tiles.clear();
+    tilesTimer.restart();
+  }
+
+  /* Zoom around a point of the view */
+  function zoomAt(newZoom, x, y) {
+    newZoom = Math.max(fitZoom, Math.min(maxZoom, newZoom));
+    var pictureX = (flickable.contentX + x) / zoom;
+    var pictureY = (flickable.contentY + y) / zoom;
+    zoom = newZoom;
+    flickable.contentX = pictureX * zoom - x;
+    flickable.contentY = pictureY * zoom - y;
+    flickable.returnToBounds();
+  }
+
+  /* Keep the tiles in view at the current level, leaving the others in place */
+  function updateTiles() {
+    if(!ready) return;
+    var step = pyramid.tileSize * Math.pow(2, level) * zoom;
+    var columns = Math.ceil(pyramid.width / (pyramid.tileSize * Math.pow(2, level)));
+    var lines = Math.ceil(pyramid.height / (pyramid.tileSize * Math.pow(2, level)));
+    var x0 = Math.max(0, Math.floor(flickable.contentX / step));
+    var x1 = Math.min(columns - 1, Math.floor((flickable.contentX + width) / step));
+    var y0 = Math.max(0, Math.floor(flickable.contentY / step));
+    var y1 = Math.min(lines - 1, Math.floor((flickable.contentY + height) / step));
+    var wanted = {};
+    for(var tx = x0; tx <= x1; tx++) {
+      for(var ty = y0; ty <= y1; ty++) {
+        wanted[level + "/" + tx + "/" + ty] = true;
+      }
+    }
+    for(var i = tiles.count - 1; i >= 0; i--) {
+      var key = tiles.get(i).key;
+      if(wanted[key]) {
+        delete wanted[key];
+      } else {
+        tiles.remove(i);
+      }
+    }
+    for(key in wanted) {
+      var parts = key.split("/");
+      tiles.append({"key": key, "tileLevel": parseInt(parts[0]),
+                    "column": parseInt(parts[1]), "line": parseInt(parts[2])});
+    }
+  }
+
+  ListModel { id: tiles }
+
+  /* Tiles are updated once per frame at most while flicking or zooming */
+  Timer {
+    id: tilesTimer
+    interval: 16
+    onTriggered: updateTiles()
+  }
+
+  Flickable {
+    id: flickable
+
+    anchors.fill: parent
+    boundsBehavior: Flickable.StopAtBounds
+    contentWidth: ready ? pyramid.width * zoom : 0
+    contentHeight: ready ? pyramid.height * zoom : 0
+    onContentXChanged: tilesTimer.restart()
+    onContentYChanged: tilesTimer.restart()
+
+    /* The whole picture, shown until the tiles are loaded */
+    Image {
+      width: flickable.contentWidth
+      height: flickable.contentHeight
+      source: ready ? "image://thumbs/" + encodeURIComponent(tiledViewer.source) : ""
+      sourceSize.width: 1024
+    }
+
+    Repeater {
+      model: tiles
+      delegate: Image {
+        property real step: pyramid.tileSize * Math.pow(2, tileLevel) * zoom
+        x: column * step
+        y: line * step
+        /* Edge tiles are smaller, the image keeps their size at this level */
+        width: sourceSize.width * Math.pow(2, tileLevel) * zoom
+        height: sourceSize.height * Math.pow(2, tileLevel) * zoom
+        smooth: zoom < 1
+        source: "image://tiles/" + tileLevel + "/" + column + "/" + line + "/" + encodeURIComponent(tiledViewer.source)
+      }
+    }
+
+    /* The wheel zooms around the cursor, a double click switches between the whole
+    picture and its full resolution */
+    MouseArea {
+      width: flickable.contentWidth
+      height: flickable.contentHeight
+      onWheel: zoomAt(zoom * Math.pow(1.25, wheel.angleDelta.y / 120),
+                      wheel.x - flickable.contentX, wheel.y - flickable.contentY)
+      onDoubleClicked: zoomAt(zoom < 1 ? 1 : fitZoom,
+                              mouse.x - flickable.contentX, mouse.y - flickable.contentY)
+    }
+  }
+}
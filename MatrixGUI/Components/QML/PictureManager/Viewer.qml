@@ -1,13 +1,55 @@
 import QtQuick 2.0
+import QtQuick.Window 2.2
 
 Rectangle {
   property alias viewer: _viewer
 
-  Image {
+  Item {
     id: _viewer
+    /* Path of the shown picture. Previews are decoded in the background by the thumbs
+    image provider, the GUI thread never reads the picture itself */
+    property string source
+    property string previewSource: source == "" ? "" : "image://thumbs/" + encodeURIComponent(source)
+    /* Width the previews are decoded at, also used to prefetch the next previews */
+    property int previewWidth: 2 * width
+
     anchors {fill: parent; centerIn: parent}
     clip: true
-    fillMode: Image.PreserveAspectCrop
-    sourceSize.width: 2 * parent.width
+
+    /* The thumbnail embedded in the picture, shown at once while the preview loads */
+    Image {
+      id: placeholder
+      anchors.fill: parent
+      fillMode: Image.PreserveAspectCrop
+      source: _viewer.previewSource
+      sourceSize.width: 160
+      visible: preview.status != Image.Ready
+    }
+
+    Image {
+      id: preview
+      anchors.fill: parent
+      fillMode: Image.PreserveAspectCrop
+      source: _viewer.previewSource
+      sourceSize.width: _viewer.previewWidth
+    }
+
+    /* A double click opens the picture at full resolution */
+    MouseArea {
+      anchors.fill: parent
+      onDoubleClicked: if(_viewer.source != "") inspector.show()
+    }
+  }
+
+  Window {
+    id: inspector
+    height: 768
+    title: _viewer.source
+    width: 1024
+
+    TiledViewer {
+      anchors.fill: parent
+      source: inspector.visible ? _viewer.source : ""
+    }
   }
-}
\ No newline at end of file
+}
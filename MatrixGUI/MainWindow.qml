@@ -36,13 +36,21 @@ ApplicationWindow {
   signal sig_discardPictures(variant indexes)
   signal sig_renewPictures(variant indexes)
   signal sig_filterPictures(int status)
+  /* Only called when the views have to be bound to another model (workspace or scene
+  switch). Otherwise, the views follow the row and data changes of the model */
   function slot_picturesUpdated(pictures) { 
     pictureManager.picturesUpdated(pictures);
     mapViewer.pictures = pictures;
-    var center = pictures.computeCenter();
+    fitMap();
+    mapViewer.refresh()
+  }
+  /* Center and zoom the map on the shown pictures */
+  function fitMap() {
+    if (!mapViewer.pictures) return;
+    var center = mapViewer.pictures.computeCenter();
     mapViewer.centerLatitude = center.latitude;
     mapViewer.centerLongitude = center.longitude;
-    mapViewer.refresh()
+    mapViewer.fitBounds(mapViewer.pictures.computeBounds());
   }
   /* RECONSTRUCTION COMPONENT SIGNALS/SLOTS */
   signal sig_launchReconstruction()
@@ -76,6 +84,25 @@ ApplicationWindow {
   signal sig_deleteScene(string path)
   signal sig_importThumbnails()
   signal sig_confirmThumbnails()
+  signal sig_cancelImport()
+  function slot_importProgress(done, total) {
+    importProgress.visible = true;
+    importProgress.text = "Importing pictures : " + done + " / " + total;
+  }
+  function slot_importFinished(imported, skipped) {
+    importProgress.visible = false;
+    fitMap();
+    if (skipped > 0) {
+      importReport.text = skipped + " pictures already in the scene were skipped";
+      importReportTimer.restart();
+    }
+  }
+  function slot_prescreenFinished(flagged, measured) {
+    if (flagged > 0) {
+      importReport.text = flagged + " / " + measured + " blurred, badly exposed or featureless pictures were discarded";
+      importReportTimer.restart();
+    }
+  }
 
   /* CAMERAINFO SIGNALS/SLOTS */
   function slot_cameraConnection(cameraConnected, name) { 
@@ -104,7 +131,10 @@ ApplicationWindow {
     onSig_menu_importPictures:  {pictureFetcher.open()}
     onSig_menu_importThumbnails: sig_importThumbnails()
     onSig_menu_launchReconstruction: sig_launchReconstruction()
-    onSig_menu_confirmThumbnails: sig_confirmThumbnails()
+    onSig_menu_confirmThumbnails: {
+      sig_confirmThumbnails();
+      fitMap();
+    }
   }
 
   FolderAndNameDialog { // create a new workspace
@@ -207,26 +237,14 @@ ApplicationWindow {
       Layout.rowSpan: 4
       Layout.fillHeight: true
       Layout.minimumWidth: 300
-      onMovePictures: {
-        mapViewer.reset();
-        sig_movePictures(indexes, indexTo);
-      }
+      onMovePictures: sig_movePictures(indexes, indexTo)
       onFilterPictures: {
-        mapViewer.reset();
         sig_filterPictures(status);
+        fitMap();
       }
-      onDiscardPictures: {
-        mapViewer.reset();
-        sig_discardPictures(indexes);
-      }
-      onDeletePictures: {
-        mapViewer.reset();
-        sig_deletePictures(indexes);
-      }
-      onRenewPictures: {
-        mapViewer.reset();
-        sig_renewPictures(indexes);
-      }
+      onDiscardPictures: sig_discardPictures(indexes)
+      onDeletePictures: sig_deletePictures(indexes)
+      onRenewPictures: sig_renewPictures(indexes)
       onFocusOnPicture: {
         mapViewer.centerLatitude = latitude
         mapViewer.centerLongitude = longitude
@@ -289,9 +307,32 @@ ApplicationWindow {
       color: "#666666"
       height: 40
       Text {
+        id: importReport
         anchors.centerIn: parent
         color: "#ffffff"
         text: ""
+        visible: !importProgress.visible
+      }
+      Timer {
+        id: importReportTimer
+        interval: 5000
+        onTriggered: importReport.text = ""
+      }
+      /* Progress of the running import, pictures appear in the list meanwhile */
+      RowLayout {
+        id: importProgress
+        property alias text: importProgressText.text
+        anchors.centerIn: parent
+        spacing: 10
+        visible: false
+        Text {
+          id: importProgressText
+          color: "#ffffff"
+        }
+        Button {
+          text: "Cancel"
+          onClicked: sig_cancelImport()
+        }
       }
     }
 
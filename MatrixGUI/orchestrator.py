@@ -9,6 +9,10 @@ from Components.PyQt.PictureManager.pictureManager import PictureModel
 from Components.PyQt.WorkspaceManager.WorkspaceManager import WorkspaceManager
 from Components.PyQt.PictureFetcher.pygphoto import *
 from Components.PyQt.ReconstructionManager.ReconstructionManager import ReconstructionManager
+from exiftoolPool import ExifToolPool # need the package import in __init__.py
+from thumbnailProvider import ThumbnailProvider
+from prefetcher import Prefetcher
+from tilePyramid import TilePyramid, TileProvider
 from orchestratorSlots import OrchestratorSlots
 
 class Orchestrator(OrchestratorSlots):
@@ -32,6 +36,17 @@ class Orchestrator(OrchestratorSlots):
         engine = QQmlApplicationEngine()
         engine.addImportPath(self.QML_PACKAGE)
         engine.addImportPath(self.QML_PLUGIN)
+        # Previews of the pictures, decoded in the background
+        self.thumbnailProvider = ThumbnailProvider()
+        engine.addImageProvider("thumbs", self.thumbnailProvider)
+        # Previews of the pictures around the one in the viewer, loaded ahead
+        self.prefetcher = Prefetcher(self.thumbnailProvider, self.pictureManager)
+        engine.rootContext().setContextProperty("prefetcher", self.prefetcher)
+        # Tiles of the pictures, to inspect them at full resolution
+        self.tilePyramid = TilePyramid()
+        self.tileProvider = TileProvider(self.tilePyramid)
+        engine.addImageProvider("tiles", self.tileProvider)
+        engine.rootContext().setContextProperty("tilePyramid", self.tilePyramid)
 
         # Initialization of some parameters in the view
         engine.rootContext().setContextProperty("mapViewerDefaultVisible", False)
@@ -51,6 +66,8 @@ class Orchestrator(OrchestratorSlots):
         # Let's have fun !
         self.root.show()
         self.app.exec_()
+        self.stopBackgroundTasks()
+        ExifToolPool.shutdown()
 
     def connectEverything(self):
         """
@@ -65,12 +82,18 @@ class Orchestrator(OrchestratorSlots):
         self.root.sig_renewPictures.connect(self.renewPictures)
 
         ######## Picture Widget Callbacks/Infos
+        self.picturesUpdated.connect(self.prefetcher.setManager)
         self.picturesUpdated.connect(self.root.slot_picturesUpdated)
 
         ######## Picture Fetcher Signals
         self.pictureFetcher.onCameraConnection.connect(self.cameraConnection)
+        self.pictureFetcher.onContentChanged.connect(self.newPictures)
         self.onCameraConnection.connect(self.root.slot_cameraConnection)
         self.root.sig_importThumbnails.connect(self.importThumbnails)
+        self.root.sig_cancelImport.connect(self.cancelImport)
+        self.importProgress.connect(self.root.slot_importProgress)
+        self.importFinished.connect(self.root.slot_importFinished)
+        self.prescreenFinished.connect(self.root.slot_prescreenFinished)
         
         ######## Reconstruction Signals
         self.root.sig_launchReconstruction.connect(self.launchReconstruction)  
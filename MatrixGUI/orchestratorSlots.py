@@ -1,10 +1,33 @@
-import sys, signal, os
+import sys, signal, os, time, functools
 from PyQt5.QtCore import *
 from Components.PyQt.PictureManager.pictureManager import PictureState
+from Components.PyQt.PictureManager.pictureImporter import PictureImporter
+from Components.PyQt.PictureManager.prescreen import Prescreener, THRESHOLDS
+
+# Set MATRIX_TIMED_UPDATES=1 to print how long the slots take to update the views
+TIMED_UPDATES = os.environ.get("MATRIX_TIMED_UPDATES", "0") not in ("", "0")
+
+def timedUpdate(slot):
+    """
+    Decorate a slot to print how long it takes to update the model and the views
+    bound to it, then until the next frame is displayed. The slot is left unchanged
+    unless TIMED_UPDATES is set.
+    """
+    if not TIMED_UPDATES:
+        return slot
+    @functools.wraps(slot)
+    def timed(self, *args):
+        start = time.perf_counter()
+        result = slot(self, *args)
+        self.reportUpdateTime(slot.__name__, start, time.perf_counter())
+        return result
+    return timed
 
 class OrchestratorSlots(QObject):
     # Define all sendable signals
-    # Send to inform view that picture model has been moved  
+    # Send when the views have to be bound to another picture model, i.e. when the
+    # workspace or the scene changes. Other changes reach the views through the
+    # signals of the model itself
     picturesUpdated = pyqtSignal(QVariant)
     # Send when an update about the status of the camera is available
     onCameraConnection = pyqtSignal(bool, str) 
@@ -12,9 +35,42 @@ class OrchestratorSlots(QObject):
     workspaceAvailable = pyqtSignal(bool)
     # Send when a new reconstruction is available
     reconstructionChanged = pyqtSignal(str)
+    # Send while importing pictures, with the number of handled files and the total
+    importProgress = pyqtSignal(int, int)
+    # Send when an import is over, with the number of imported and skipped pictures
+    importFinished = pyqtSignal(int, int)
+    # Send when a prescreening is over, with the number of discarded and measured pictures
+    prescreenFinished = pyqtSignal(int, int)
+
+    def __init__(self):
+        super(OrchestratorSlots, self).__init__()
+        # The running picture import, if any
+        self.importer = None
+        # The running measure of the quality of the pictures, if any
+        self.prescreener = None
+        # The quality below which the prescreening discards the pictures, see
+        # PictureModel.flagBelowThreshold
+        self.prescreenThresholds = dict(THRESHOLDS)
+
+    def reportUpdateTime(self, name, start, end):
+        """
+        Print the time spent by a slot, and the time until the next frame is displayed
+
+        Args:
+        name (str): The name of the slot
+        start (float): When the slot was called, from time.perf_counter
+        end (float): When the slot returned
+        """
+        def frameSwapped():
+            self.root.frameSwapped.disconnect(frameSwapped)
+            print("{}: {:.1f}ms in the slot, {:.1f}ms until displayed".format(name, \
+                1000 * (end - start), 1000 * (time.perf_counter() - start)))
+        self.root.frameSwapped.connect(frameSwapped)
+        self.root.update()
 
     # Define All Usable Slots
     @pyqtSlot(QVariant, int)
+    @timedUpdate
     def movePictures(self, indexes, startIndexTo):
         """
         A slot that handle the reorganization between pictures. If more than one 
@@ -25,21 +81,10 @@ class OrchestratorSlots(QObject):
         indexes (list<int>):  Indexes to be moved
         startIndexTo   (int):  The destination start index of all pictures
         """
-        offsetDown = 0; offsetUp = 0; 
-        state = True
-        indexes = indexes.toVariant()
-        indexes.sort()
-        for indexFrom in indexes:
-            indexFrom = max(0, indexFrom - offsetDown)
-            indexTo = min(self.pictureManager.rowCount() - 1, startIndexTo + offsetUp)
-            state = state and self.pictureManager.move( \
-                self.pictureManager.index(indexFrom, 0), \
-                self.pictureManager.index(indexTo, 0))
-            if(indexFrom < indexTo): offsetDown += 1
-            if(indexFrom > indexTo): offsetUp += 1
-        if state: self.picturesUpdated.emit(self.pictureManager)
+        self.pictureManager.moveAll(indexes.toVariant(), startIndexTo)
 
     @pyqtSlot(int)
+    @timedUpdate
     def filterPictures(self, status):
         """
         A slot that handle filtering within pictures
@@ -47,21 +92,19 @@ class OrchestratorSlots(QObject):
         Args:
           status  (int):  The status that should be filtered, according to PictureState
         """
-        regStr = str(status)
+        statuses = [status]
         if(status > 100):
             specials = {
-                101: "",
-                102: "5|6",
-                103: "0|1|3"
+                101: None,
+                102: [PictureState.THUMBNAIL_DISCARDED, PictureState.DISCARDED],
+                103: [PictureState.NEW, PictureState.RECONSTRUCTION, PictureState.PROCESSED]
             }
-            regStr = specials[status]
+            statuses = specials[status]
 
-        regExp = QRegExp(regStr)
-        #TODO handle non discarded status
-        self.pictureManager.setFilterRegExp(regExp)
-        self.picturesUpdated.emit(self.pictureManager)
+        self.pictureManager.setStatusFilter(statuses)
 
     @pyqtSlot(QVariant)
+    @timedUpdate
     def discardPictures(self, indexes):
         """
         A slot that handle picture discarding
@@ -69,11 +112,11 @@ class OrchestratorSlots(QObject):
         Args: 
           indexes (list<QVariant>): Indexes of pictures to discard
         """
-        state = self.pictureManager.discardAll(\
+        self.pictureManager.discardAll(\
           [ self.pictureManager.index(i, 0) for i in indexes.toVariant() ])
-        if(state): self.picturesUpdated.emit(self.pictureManager)
 
     @pyqtSlot(QVariant)
+    @timedUpdate
     def renewPictures(self, indexes):
         """
         A slot that handle picture renewing, i.e, that allow rejected or
@@ -82,11 +125,11 @@ class OrchestratorSlots(QObject):
         Args: 
           indexes (list<QVariant>): Indexes of pictures to renew
         """
-        state = self.pictureManager.renewAll(\
+        self.pictureManager.renewAll(\
           [ self.pictureManager.index(i, 0) for i in indexes.toVariant() ])
-        if(state): self.picturesUpdated.emit(self.pictureManager)
 
     @pyqtSlot(QVariant)
+    @timedUpdate
     def deletePictures(self, indexes):
         """
         A slot that handle picture deleting
@@ -94,24 +137,30 @@ class OrchestratorSlots(QObject):
         Args: 
           indexes (list<QVariant>): Indexes of pictures to delete
         """
-        state = self.pictureManager.deleteAll(\
+        self.pictureManager.deleteAll(\
           [ self.pictureManager.index(i, 0) for i in indexes.toVariant() ])
-        if(state): self.picturesUpdated.emit(self.pictureManager)
 
 
-    @pyqtSlot(QVariant, QVariant)
-    def newPictures(newPictures, deletedPictures):
+    @pyqtSlot(list, list)
+    def newPictures(self, newPictures, deletedPictures):
         """
-        Handle an update from the camera to manage new or deleted pictures.
+        Handle an update from the camera to manage new or deleted pictures. The
+        thumbnails of deleted pictures are removed, and the thumbnails of new pictures
+        not in the scene yet are downloaded.
 
         Args:
         newPictures (list<str>): A list of newly found pictures
         deletedPictures (list<str>): A list of all previously existing pictures 
         now deleted by user
         """
-        #self.pictureModel.deleteThumbnails(deletedPictures)
-        #self.workspaceManager.deleteThumbnails(deletedPictures)
-        print("TODO")    
+        model = self.pictureModel
+        thumbnails = [PictureState.THUMBNAIL, PictureState.THUMBNAIL_DISCARDED]
+        model.removeAll(model.rowsForNames(deletedPictures, thumbnails))
+        known = set(model.data(model.index(row), model.NAME_ROLE) \
+            for row in model.rowsForNames(newPictures))
+        newPictures = [ name for name in newPictures if not name in known ]
+        if len(newPictures) > 0:
+            self.importThumbnailFiles(newPictures)
 
     @pyqtSlot(QVariant)
     def importPictures(self, picturesFiles):
@@ -121,10 +170,155 @@ class OrchestratorSlots(QObject):
         Args:
         picturesFiles (list<QUrl>): The list of pictures to be imported
         """
-        newPaths = self.workspaceManager.import_pictures([ p.path() for p in picturesFiles ])
-        self.pictureModel.populate(newPaths)
-        self.pictureManager.setSourceModel(self.pictureModel)
-        self.picturesUpdated.emit(self.pictureManager)
+        self.startImport([ p.path() for p in picturesFiles ], PictureState.NEW, \
+            self.workspaceManager.import_pictures)
+
+    def startImport(self, files, status, prepare):
+        """
+        Import files in the background, the picture model is filled in chunk by chunk
+
+        Args:
+        files (list<str>): The files to import
+        status (int): The initial status of the pictures
+        prepare (function): Called in the background on each chunk of files, returns\
+                the paths of the files to add to the model
+        """
+        if self.importer != None:
+            print("An import is already running")
+            return
+        if self.pictureManager.sourceModel() != self.pictureModel:
+            self.pictureManager.setSourceModel(self.pictureModel)
+            self.picturesUpdated.emit(self.pictureManager)
+        self.importer = PictureImporter(self.pictureModel, files, status, prepare)
+        self.importer.picturesReady.connect(self.addPictures)
+        self.importer.progress.connect(self.importProgress)
+        self.importer.finished.connect(self.importOver)
+        self.importer.start()
+
+    @pyqtSlot(object)
+    def addPictures(self, pictures):
+        """
+        Add a chunk of imported pictures to the model they have been built for
+
+        Args:
+        pictures (list<Picture>): The imported pictures
+        """
+        if not self.isRunning(self.importer):
+            return
+        self.importer.model.addAll(pictures)
+
+    @pyqtSlot(int, int)
+    def importOver(self, imported, skipped):
+        """
+        Clean up a finished import, the pictures are already in the views
+
+        Args:
+        imported (int): The number of imported pictures
+        skipped (int): The number of files not imported, e.g. duplicates of pictures\
+                already in the scene
+        """
+        if not self.isRunning(self.importer):
+            return
+        self.importer.wait()
+        self.importer = None
+        self.importFinished.emit(imported, skipped)
+        if imported > 0:
+            self.startPrescreen()
+
+    def startPrescreen(self):
+        """
+        Measure in the background the image quality of the new pictures not measured
+        yet, the bad shots being discarded once all of them are measured
+        """
+        if self.prescreener != None:
+            print("A prescreening is already running")
+            return
+        model = self.pictureModel
+        sharpness = model._store.column('sharpness')
+        # Unknown qualities are NaN, the only values different from themselves. Pictures
+        # that could not be decoded have an UNREADABLE_QUALITY instead, and are skipped
+        paths = [ model._store.get(row, 'path') for row in \
+            model.rowsWithStatus([PictureState.NEW]) if sharpness[row] != sharpness[row] ]
+        if len(paths) == 0:
+            return
+        self.prescreener = Prescreener(model, paths)
+        self.prescreener.qualitiesReady.connect(self.setQualities)
+        self.prescreener.finished.connect(self.prescreenOver)
+        self.prescreener.start()
+
+    @pyqtSlot(object)
+    def setQualities(self, qualities):
+        """
+        Store the quality of a chunk of measured pictures in the model they have been
+        measured for
+
+        Args:
+        qualities (list<(str, dict<str, float>)>): The path and the quality of each picture
+        """
+        if not self.isRunning(self.prescreener):
+            return
+        self.prescreener.model.setQualities(qualities)
+
+    @pyqtSlot(int, int)
+    def prescreenOver(self, measured, failed):
+        """
+        Discard the measured pictures whose quality is below the thresholds
+
+        Args:
+        measured (int): The number of measured pictures
+        failed (int): The number of pictures that could not be decoded
+        """
+        if not self.isRunning(self.prescreener):
+            return
+        self.prescreener.wait()
+        model, paths = self.prescreener.model, self.prescreener.paths
+        self.prescreener = None
+        rows = [ row for row in map(model.rowForPath, paths) if row != None ]
+        flagged = model.flagBelowThreshold(self.prescreenThresholds, rows)
+        self.prescreenFinished.emit(flagged, measured)
+
+    @pyqtSlot()
+    def cancelImport(self):
+        """
+        A slot that stops the running import, if any
+        """
+        if self.importer != None:
+            self.importer.cancel()
+
+    def stopBackgroundTasks(self):
+        """
+        Cancel the running import and prescreening, if any, and wait for them, so that
+        their threads and processes are not left running when the application quits, and
+        that they do not use the metadata cache of a scene being closed
+        """
+        if self.importer != None:
+            self.importer.cancel()
+            self.importer.wait()
+            self.importer.picturesReady.disconnect(self.addPictures)
+            self.importer.progress.disconnect(self.importProgress)
+            self.importer.finished.disconnect(self.importOver)
+            self.importer = None
+        if self.prescreener != None:
+            self.prescreener.cancel()
+            self.prescreener.wait()
+            self.prescreener.qualitiesReady.disconnect(self.setQualities)
+            self.prescreener.finished.disconnect(self.prescreenOver)
+            self.prescreener = None
+
+    def isRunning(self, task):
+        """
+        Tell whether the sender of the signal being handled is the given running task.
+        The signals of a task are queued, and may still be delivered once the task has
+        been stopped, e.g. when the scene changes: they must then be ignored, the model
+        they are meant for being closed
+
+        Args:
+        task (QThread): The running import or prescreening, or None
+
+        Returns:
+        bool: True if the signal comes from the task
+        """
+        return task != None and self.sender() is task
 
     #### WORKSPACE MANAGER SLOTS
     @pyqtSlot("QString", "QString")
@@ -133,11 +327,13 @@ class OrchestratorSlots(QObject):
         self.workspaceAvailable.emit(True)
 
     @pyqtSlot("QString")
+    @timedUpdate
     def open_workspace(self, path):
         (directory_path,file_name) = os.path.split(path)
         self.workspaceManager.open_workspace(directory_path, file_name)
         self.pictureModel = self.workspaceManager.getPictureModel()
         self.pictureManager.setSourceModel(self.pictureModel)
+        self.updatePreviewsDirectory()
         self.picturesUpdated.emit(self.pictureManager)
         self.workspaceAvailable.emit(True)
 
@@ -147,10 +343,12 @@ class OrchestratorSlots(QObject):
         self.workspaceAvailable.emit(False)
 
     @pyqtSlot("QString")
+    @timedUpdate
     def change_workspace(self, path):
         self.workspaceManager.change_workspace(path)
         self.pictureModel = self.workspaceManager.getPictureModel()
         self.pictureManager.setSourceModel(self.pictureModel)
+        self.updatePreviewsDirectory()
         self.picturesUpdated.emit(self.pictureManager)
 
     @pyqtSlot()
@@ -164,14 +362,32 @@ class OrchestratorSlots(QObject):
 
     @pyqtSlot("QString")
     def new_scene(self, name):
+        self.stopBackgroundTasks()
         self.workspaceManager.new_scene(name)
 
     @pyqtSlot("QString")
+    @timedUpdate
     def change_scene(self, path):
+        # The metadata cache of the previous scene is closed
+        self.stopBackgroundTasks()
         self.workspaceManager.change_scene(path)
         self.pictureModel = self.workspaceManager.getPictureModel()
         self.pictureManager = self.pictureModel.instantiateManager()
+        self.updatePreviewsDirectory()
         self.picturesUpdated.emit(self.pictureManager)
+
+    def updatePreviewsDirectory(self):
+        """
+        Persist the previews and the tile pyramids of the pictures in the thumbnails
+        directory of the current scene. Without a current scene, previews are only kept
+        in memory and pyramids are persisted in a temporary directory.
+        """
+        try:
+            directory = self.workspaceManager.get_thumbnails_dir()
+        except (AssertionError, AttributeError):
+            directory = None
+        self.thumbnailProvider.setCacheDirectory(directory)
+        self.tilePyramid.setCacheDirectory(directory)
         
     @pyqtSlot("QString")
     def delete_scene(self, path):
@@ -185,32 +401,48 @@ class OrchestratorSlots(QObject):
 
     @pyqtSlot()
     def importThumbnails(self):
+        self.importThumbnailFiles(self.pictureFetcher.query_file_list())
+
+    def importThumbnailFiles(self, thumbnailsNames):
+        """
+        Download the thumbnails of camera files and add them to the model
+
+        Args:
+        thumbnailsNames (list<str>): The names of the files on the camera
+        """
         thumbnailsDir = self.workspaceManager.get_thumbnails_dir()
-        thumbnailsNames = self.pictureFetcher.query_file_list()
-        thumbnailsNames = self.pictureFetcher.download_files(thumbnailsNames, \
+        # Thumbnails are downloaded in the background, chunk by chunk
+        download = lambda names: self.pictureFetcher.download_files(names, \
             thumbnailsDir, thumbnail=True)
-        self.pictureModel.populate([ os.path.join(thumbnailsDir, n) for n in thumbnailsNames ], PictureState.THUMBNAIL)
-        self.pictureManager.setSourceModel(self.pictureModel)
-        self.picturesUpdated.emit(self.pictureManager)
+        self.startImport(thumbnailsNames, PictureState.THUMBNAIL, download)
 
     @pyqtSlot()
+    @timedUpdate
     def confirmThumbnails(self):
         destDir = self.workspaceManager.get_picture_dir()
-        for picture in self.pictureModel.thumbnails():
+        model = self.pictureModel
+        # Rows move when the model is kept sorted by size or status, pictures follow them
+        thumbnails = [ model.data(model.index(row), model.ITEM_ROLE) \
+            for row in model.rowsWithStatus([PictureState.THUMBNAIL]) ]
+        confirmed = []
+        for picture in thumbnails:
             filename = os.path.basename(picture.path)
             error = self.pictureFetcher.download_file(filename, destDir)
             if(error == 0):
-                picture.path = os.path.join(destDir, filename)
-                picture.status = PictureState.NEW
-        self.pictureModel.removeDiscardedThumbnails()
-        self.picturesUpdated.emit(self.pictureManager)
+                model.setData(model.index(model.rowOf(picture)), \
+                    os.path.join(destDir, filename), model.PATH_ROLE)
+                confirmed.append(picture)
+        model.setStatuses([ model.rowOf(picture) for picture in confirmed ], \
+            model.CONFIRM_THUMBNAIL)
+        # Thumbnails may lack the EXIF data of the full size pictures
+        model.refreshMetadata(confirmed)
+        model.removeDiscardedThumbnails()
 
     @pyqtSlot()
     def launchReconstruction(self):
         validFiles = self.pictureModel.validFiles()
         self.workspaceManager.prepare_reconstruction(validFiles)
-        for picture in validFiles:
-            picture.status = PictureState.RECONSTRUCTION
+        self.pictureModel.setStatuses(None, self.pictureModel.START_RECONSTRUCTION)
         crapDir = self.workspaceManager.get_scene_temp_output_dir()
         inDir = self.workspaceManager.get_selected_picture_dir()
         outDir = self.workspaceManager.get_scene_output_dir()
@@ -220,8 +452,7 @@ class OrchestratorSlots(QObject):
             self.OPENMVG_BUILD_DIR,\
             crapDir,\
             outDir)
-        for picture in validFiles:
-            picture.status = PictureState.PROCESSED
+        self.pictureModel.setStatuses(None, self.pictureModel.END_RECONSTRUCTION)
         self.reconstructionChanged.emit(os.path.join(\
             self.workspaceManager.get_current_scene().full_path(),\
             self.workspaceManager.get_current_scene().get_reconstruction_temp_dir(),\